@@ -1,3 +1,4 @@
+import argparse
 import json
 import os
 import time
@@ -6,17 +7,24 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
+from metrics_store import MetricsReader, ChangeNotifier
+from alert_rules import RuleEngine, DEFAULT_RULES_FILE
+from phase_timer import PhaseTimer, profiled
 
 class AlertMonitor:
-    def __init__(self, metrics_dir='monitoring_logs'):
+    def __init__(self, metrics_dir='monitoring_logs', rules_file='config/alert_rules.json'):
         self.metrics_dir = metrics_dir
-        self.thresholds = {
-            'slow_queries': 10,  # Alert if more than 10 slow queries
-            'threads_connected': 20,  # Alert if more than 20 connections
-            'query_time': 5,  # Alert if queries take more than 5 seconds
-            'table_rows': 1000000  # Alert if table has more than 1M rows
-        }
+        self.reader = MetricsReader(metrics_dir)
+        # Windowed rules from the config file; the shipped defaults if there is none
+        if not (rules_file and os.path.exists(rules_file)):
+            rules_file = DEFAULT_RULES_FILE
+        self.rules = RuleEngine.from_file(rules_file)
         self.alerts_log = os.path.join(metrics_dir, 'alerts.log')
+        # Position of the last evaluated sample, so restarts neither skip nor repeat samples
+        self.cursor_file = os.path.join(metrics_dir, '.alert_cursor.json')
+        # Per-phase timings of the loop, appended to timings_file after every batch of samples
+        self.timer = PhaseTimer()
+        self.timings_file = os.path.join(metrics_dir, 'alert_timings.jsonl')
         
         # Ensure alerts log directory exists
         os.makedirs(os.path.dirname(self.alerts_log), exist_ok=True)
@@ -33,31 +41,9 @@ class AlertMonitor:
                 for error in metrics['errors']:
                     alerts.append(f"Warning: {error}")
 
-            # Check global status metrics if available
-            global_status = metrics.get('global_status', {})
-            if global_status:  # Only check if we have global status data
-                try:
-                    slow_queries = int(global_status.get('Slow_queries', 0))
-                    threads_connected = int(global_status.get('Threads_connected', 0))
-
-                    if slow_queries > self.thresholds['slow_queries']:
-                        alerts.append(f"High number of slow queries: {slow_queries}")
-                    
-                    if threads_connected > self.thresholds['threads_connected']:
-                        alerts.append(f"High number of connections: {threads_connected}")
-                except ValueError as e:
-                    alerts.append(f"Error parsing global status values: {str(e)}")
-            
-            # Check table metrics if available
-            tables = metrics.get('tables', {})
-            if tables:  # Only check if we have table data
-                for table_name, table_metrics in tables.items():
-                    try:
-                        rows = table_metrics.get('rows', 0)
-                        if rows and rows > self.thresholds['table_rows']:
-                            alerts.append(f"Large table detected: {table_name} ({rows:,} rows)")
-                    except (ValueError, TypeError) as e:
-                        alerts.append(f"Error checking table metrics for {table_name}: {str(e)}")
+            # Placeholder zeros from a failed sample would look like a counter reset
+            if 'error' not in metrics:
+                alerts.extend(self.rules.evaluate(metrics))
             
             return alerts
 
@@ -99,44 +85,125 @@ class AlertMonitor:
         except Exception as e:
             print(f"Failed to send email alert: {e}")
 
-    def monitor(self):
+    def load_cursor(self):
+        try:
+            with open(self.cursor_file) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            print(f"Ignoring unreadable alert cursor {self.cursor_file}: {e}")
+            return None
+
+    def save_cursor(self, cursor):
+        # Write-then-rename so a crash never leaves a half-written cursor behind
+        tmp = self.cursor_file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(cursor, f)
+        os.replace(tmp, self.cursor_file)
+
+    def process_sample(self, metrics):
+        try:
+            # How far evaluation trails the sample; grows when the loop falls behind
+            sampled_at = datetime.fromisoformat(metrics['timestamp'])
+            self.timer.record('sample_lag', max((datetime.now() - sampled_at).total_seconds(), 0.0))
+        except (KeyError, TypeError, ValueError):
+            pass
+        try:
+            with self.timer.phase('evaluate'):
+                alerts = self.check_metrics(metrics)
+            if alerts:
+                with self.timer.phase('log'):
+                    for alert in alerts:
+                        print(f"ALERT: {alert}")
+                        self.log_alert(alert)
+                # Uncomment to enable email alerts
+                # self.send_email_alert(alerts)
+        except Exception as e:
+            print(f"Error processing metrics sample {metrics.get('timestamp')}: {e}")
+
+    def _read_samples(self, cursor):
+        """reader.follow(cursor), with the time spent reading and parsing recorded as phase 'read'"""
+        samples = self.reader.follow(cursor)
+        while True:
+            with self.timer.phase('read'):
+                item = next(samples, None)
+            if item is None:
+                return
+            yield item
+
+    def log_timings(self, samples):
+        """Append the timer snapshot for a batch of `samples` to timings_file"""
+        record = {'timestamp': datetime.now().isoformat(), 'samples': samples}
+        record.update(self.timer.snapshot())
+        try:
+            with open(self.timings_file, 'a') as f:
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+        except Exception as e:
+            print(f"Error writing alert timings: {e}")
+
+    def monitor(self, poll_interval=5, from_start=False):
+        """Evaluate every new sample exactly once, as soon as it is written.
+
+        Samples are read incrementally from the persisted cursor. With
+        watchdog installed the loop wakes on file-system events; otherwise it
+        polls every `poll_interval` seconds. A fresh monitor starts at the end
+        of the existing history unless `from_start` is set. After each batch
+        of new samples, the timings of its phases (read, evaluate, log,
+        cursor save) and how far samples trailed their timestamps are
+        appended to timings_file.
+        """
         print(f"Starting alert monitoring")
         print(f"Alert logs will be saved in: {os.path.abspath(self.alerts_log)}")
-        
-        while True:
-            try:
-                # Get the latest metrics file
-                metric_files = [f for f in os.listdir(self.metrics_dir) 
-                              if f.startswith('mysql_metrics_') and f.endswith('.json')]
-                
-                if metric_files:
-                    latest_file = max(metric_files, 
-                                    key=lambda x: os.path.getctime(os.path.join(self.metrics_dir, x)))
-                    
-                    try:
-                        with open(os.path.join(self.metrics_dir, latest_file)) as f:
-                            metrics = json.load(f)
-                        
-                        alerts = self.check_metrics(metrics)
-                        if alerts:
-                            for alert in alerts:
-                                print(f"ALERT: {alert}")
-                                self.log_alert(alert)
-                            # Uncomment to enable email alerts
-                            # self.send_email_alert(alerts)
-                    except json.JSONDecodeError as e:
-                        print(f"Error reading metrics file {latest_file}: {e}")
-                    except Exception as e:
-                        print(f"Error processing metrics file {latest_file}: {e}")
-                
-                time.sleep(30)  # Check every 30 seconds
-            except KeyboardInterrupt:
-                print("\nAlert monitoring stopped by user")
-                break
-            except Exception as e:
-                print(f"Error in alert monitoring: {e}")
-                time.sleep(30)
+
+        cursor = self.load_cursor()
+        if cursor is None and not from_start:
+            cursor = self.reader.end_cursor()
+        notifier = ChangeNotifier(self.metrics_dir)
+        print("Waiting for new samples via " +
+              ("file-system notifications" if notifier.native else f"polling every {poll_interval}s"))
+
+        try:
+            while True:
+                try:
+                    self.timer.begin()
+                    samples = 0
+                    for metrics, cursor in self._read_samples(cursor):
+                        self.process_sample(metrics)
+                        with self.timer.phase('cursor_save'):
+                            self.save_cursor(cursor)
+                        samples += 1
+                    if samples:
+                        self.timer.end()
+                        self.log_timings(samples)
+                    notifier.wait(poll_interval)
+                except KeyboardInterrupt:
+                    print("\nAlert monitoring stopped by user")
+                    break
+                except Exception as e:
+                    print(f"Error in alert monitoring: {e}")
+                    time.sleep(poll_interval)
+        finally:
+            notifier.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Raise alerts from collected MySQL metrics")
+    parser.add_argument('--metrics-dir', default='monitoring_logs')
+    parser.add_argument('--rules', default='config/alert_rules.json', help="JSON alert rules file")
+    parser.add_argument('--poll-interval', type=float, default=5,
+                        help="seconds between checks when file-system notifications are unavailable")
+    parser.add_argument('--from-start', action='store_true',
+                        help="evaluate the stored history when no cursor has been saved yet")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="run under cProfile and write a pstats file (for snakeviz/flameprof) on exit")
+    args = parser.parse_args()
+
+    monitor = AlertMonitor(metrics_dir=args.metrics_dir, rules_file=args.rules)
+    if args.profile:
+        with profiled(args.profile):
+            monitor.monitor(poll_interval=args.poll_interval, from_start=args.from_start)
+    else:
+        monitor.monitor(poll_interval=args.poll_interval, from_start=args.from_start)
 
 if __name__ == "__main__":
-    monitor = AlertMonitor()
-    monitor.monitor() 
\ No newline at end of file
+    main() 
\ No newline at end of file
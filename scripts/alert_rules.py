@@ -0,0 +1,203 @@
+import json
+import math
+import operator
+import os
+from datetime import datetime
+
+AGGREGATES = ('value', 'avg', 'min', 'max', 'percentile', 'rate', 'increase')
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne
+}
+
+# The rules shipped in config/; the only copy of the defaults, used when no
+# other rules file is given or the given one does not exist
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'config', 'alert_rules.json')
+
+
+class RingBuffer:
+    """Fixed-size buffer of (timestamp, value) pairs; memory never grows past `size`"""
+
+    def __init__(self, size):
+        self.size = size
+        self._times = [0.0] * size
+        self._values = [0.0] * size
+        self._next = 0
+        self._count = 0
+
+    def append(self, timestamp, value):
+        self._times[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+
+    def __len__(self):
+        return self._count
+
+    def items(self):
+        """Pairs in insertion order, oldest first"""
+        start = (self._next - self._count) % self.size
+        for i in range(self._count):
+            j = (start + i) % self.size
+            yield self._times[j], self._values[j]
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+
+def _counter_deltas(pairs):
+    """Positive (value delta, time delta) steps; a drop means the counter reset"""
+    steps = []
+    previous = None
+    for timestamp, value in pairs:
+        if previous is not None and value >= previous[1]:
+            steps.append((value - previous[1], timestamp - previous[0]))
+        previous = (timestamp, value)
+    return steps
+
+
+def aggregate(name, buffer, percentile=95):
+    """Reduce a window to one number, or None when there is not enough data"""
+    if not len(buffer):
+        return None
+    if name == 'value':
+        return buffer.values()[-1]
+    if name == 'avg':
+        values = buffer.values()
+        return sum(values) / len(values)
+    if name == 'min':
+        return min(buffer.values())
+    if name == 'max':
+        return max(buffer.values())
+    if name == 'percentile':
+        values = sorted(buffer.values())
+        rank = max(1, math.ceil(len(values) * percentile / 100))
+        return values[rank - 1]
+
+    steps = _counter_deltas(buffer.items())
+    if not steps:
+        return None
+    if name == 'increase':
+        return sum(delta for delta, _ in steps)
+    if name == 'rate':
+        seconds = sum(dt for _, dt in steps)
+        return sum(delta for delta, _ in steps) / seconds if seconds > 0 else None
+    raise ValueError(f"Unknown aggregate '{name}'")
+
+
+class Rule:
+    """One alert condition over a metric path such as 'global_status.Queries'.
+
+    A '*' path segment matches every key at that level ('tables.*.rows'), and
+    each match keeps its own window. The condition must hold for `for`
+    consecutive samples before the rule fires. It then fires once and reports
+    a resolution when the condition clears, instead of repeating every sample.
+    """
+
+    def __init__(self, name, metric, op, threshold, aggregate='value', window=1,
+                 percentile=95, message=None, **kwargs):
+        # 'for' is a keyword, so it can only arrive through kwargs; anything else is a typo
+        unknown = sorted(set(kwargs) - {'for'})
+        if unknown:
+            raise ValueError(f"Rule {name}: unknown keys {unknown}")
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Rule {name}: aggregate must be one of {AGGREGATES}")
+        if op not in OPERATORS:
+            raise ValueError(f"Rule {name}: op must be one of {list(OPERATORS)}")
+        self.name = name
+        self.metric = metric
+        self.path = metric.split('.')
+        self.op = op
+        self.threshold = threshold
+        self.aggregate = aggregate
+        # Rates need at least two samples to compare
+        self.window = max(window, 2) if aggregate in ('rate', 'increase') else max(window, 1)
+        self.percentile = percentile
+        self.consecutive = kwargs.get('for', 1)
+        self.message = message
+        self._series = {}
+
+    def _matches(self, node, path, prefix=()):
+        if not path:
+            yield '.'.join(prefix), node
+            return
+        if not isinstance(node, dict):
+            return
+        head, rest = path[0], path[1:]
+        if head == '*':
+            for key, child in node.items():
+                yield from self._matches(child, rest, prefix + (key,))
+        elif head in node:
+            yield from self._matches(node[head], rest, prefix)
+
+    def evaluate(self, metrics, timestamp):
+        """Feed one sample; return (series, value, state) for every change of state"""
+        changes = []
+        for series, raw in self._matches(metrics, self.path):
+            try:
+                value = float(raw)
+            except (TypeError, ValueError):
+                continue
+
+            state = self._series.get(series)
+            if state is None:
+                state = self._series[series] = {'buffer': RingBuffer(self.window),
+                                                 'streak': 0, 'firing': False}
+            state['buffer'].append(timestamp, value)
+
+            result = aggregate(self.aggregate, state['buffer'], self.percentile)
+            if result is None:
+                # Not enough data (e.g. right after a counter reset): keep the current state
+                continue
+            breached = OPERATORS[self.op](result, self.threshold)
+            state['streak'] = state['streak'] + 1 if breached else 0
+
+            if state['streak'] >= self.consecutive and not state['firing']:
+                state['firing'] = True
+                changes.append((series, result, 'firing'))
+            elif not breached and state['firing']:
+                state['firing'] = False
+                changes.append((series, result, 'resolved'))
+        return changes
+
+    def format(self, series, value, state):
+        fields = {'rule': self.name, 'series': series or self.metric, 'value': value,
+                  'threshold': self.threshold, 'window': self.window}
+        if state == 'resolved':
+            return f"Resolved: {self.name} ({fields['series']}) back to {value:g}"
+        if self.message:
+            return self.message.format(**fields)
+        return (f"{self.name}: {self.aggregate}({fields['series']}) = {value:g} "
+                f"{self.op} {self.threshold}")
+
+
+class RuleEngine:
+    """Evaluates a list of rules against each incoming sample"""
+
+    def __init__(self, rules):
+        self.rules = [Rule(**rule) for rule in rules]
+
+    @classmethod
+    def from_file(cls, path):
+        """Load rules from a JSON file holding {"rules": [...]}"""
+        with open(path) as f:
+            return cls(json.load(f)['rules'])
+
+    def evaluate(self, metrics):
+        """Return alert messages for every rule that started firing or resolved"""
+        try:
+            timestamp = datetime.fromisoformat(metrics['timestamp']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return ["Sample without a valid timestamp; rules not evaluated"]
+
+        alerts = []
+        for rule in self.rules:
+            for series, value, state in rule.evaluate(metrics, timestamp):
+                alerts.append(rule.format(series, value, state))
+        return alerts
@@ -0,0 +1,260 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from monitor_mysql import (MySQLMonitor, GLOBAL_STATUS_QUERY, PROCESSLIST_QUERY,
+                           TABLE_STATS_QUERY, new_metrics, error_metrics,
+                           table_metrics_from_catalog)
+
+try:
+    import aiomysql
+except ImportError:  # Optional: fall back to mysql-connector on worker threads
+    aiomysql = None
+
+
+class Target:
+    """One MySQL instance in the fleet plus its scheduling state"""
+
+    def __init__(self, name, config, metrics_dir):
+        self.name = name
+        self.config = config
+        self.monitor = MySQLMonitor(pool_size=1, config=config,
+                                    metrics_dir=os.path.join(metrics_dir, name))
+        self.pool = None  # aiomysql pool, created on first async sample
+        self.in_flight = False
+        self.thread_future = None  # blocking sample still running after a timeout
+        self.failures = 0
+        self.retry_at = 0.0
+
+
+def load_targets(path):
+    """Read the fleet definition.
+
+    The file holds a JSON list of objects with name, host, port, user,
+    database and either password or password_env (the name of an
+    environment variable holding the password).
+    """
+    with open(path) as f:
+        entries = json.load(f)
+
+    targets = []
+    for entry in entries:
+        entry = dict(entry)
+        name = entry.pop('name')
+        password_env = entry.pop('password_env', None)
+        if password_env:
+            entry['password'] = os.getenv(password_env, '')
+        targets.append((name, entry))
+    return targets
+
+
+class AsyncCollector:
+    """Samples many MySQL instances concurrently on one shared schedule.
+
+    Ticks are anchored to the collector's start time (start + k * interval),
+    so slow targets never push later ticks back. Each sample has its own
+    timeout. A target that fails or times out is skipped with exponential,
+    jittered backoff until `max_backoff`. A target whose previous sample is
+    still running is skipped for that tick rather than queued.
+    """
+
+    def __init__(self, targets, interval=30, timeout=10, concurrency=100,
+                 max_backoff=600, driver='auto', metrics_dir='monitoring_logs'):
+        if driver == 'auto':
+            driver = 'aiomysql' if aiomysql else 'thread'
+        if driver == 'aiomysql' and aiomysql is None:
+            raise RuntimeError("aiomysql is not installed; use driver='thread'")
+        self.driver = driver
+        self.interval = interval
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.max_backoff = max_backoff
+        self.targets = [Target(name, config, metrics_dir) for name, config in targets]
+        # Blocking samples and file writes; sized so hundreds of targets do not queue
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.stats = {'ticks': 0, 'missed_ticks': 0, 'samples': 0, 'failures': 0,
+                      'timeouts': 0, 'skipped_backoff': 0, 'skipped_in_flight': 0}
+
+    async def _sample_aiomysql(self, target):
+        """The core queries over aiomysql, timed like MySQLMonitor's.
+
+        The registered collector groups need a blocking connector cursor and
+        are not run here; each sample lists them as skipped for this driver,
+        and it has no connector pool stats under 'pool'.
+        """
+        timer = target.monitor.timer
+        checkout = time.perf_counter()
+        if target.pool is None:
+            config = target.config
+            target.pool = await aiomysql.create_pool(
+                host=config.get('host', 'localhost'), port=config.get('port', 3306),
+                user=config.get('user'), password=config.get('password', ''),
+                db=config.get('database'), minsize=1, maxsize=1, autocommit=True)
+
+        metrics = new_metrics()
+        async with target.pool.acquire() as conn:
+            timer.add('connect', time.perf_counter() - checkout)
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                try:
+                    started = time.perf_counter()
+                    await cursor.execute(GLOBAL_STATUS_QUERY)
+                    metrics['global_status'] = {row['Variable_name']: row['Value']
+                                                for row in await cursor.fetchall()}
+                    timer.add('global_status', time.perf_counter() - started)
+                except Exception as e:
+                    metrics['errors'] = metrics.get('errors', []) + [f"Global status error: {str(e)}"]
+
+                try:
+                    started = time.perf_counter()
+                    await cursor.execute(PROCESSLIST_QUERY)
+                    metrics['processes'] = {row['state']: row['count']
+                                            for row in await cursor.fetchall()}
+                    timer.add('processlist', time.perf_counter() - started)
+                except Exception as e:
+                    metrics['errors'] = metrics.get('errors', []) + [f"Process list error: {str(e)}"]
+
+                # Fleet mode only uses catalog estimates; exact counts stay with MySQLMonitor
+                try:
+                    started = time.perf_counter()
+                    try:
+                        await cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+                    except Exception:
+                        pass
+                    await cursor.execute(TABLE_STATS_QUERY, (target.config.get('database'),))
+                    for row in await cursor.fetchall():
+                        metrics['tables'][row['table_name']] = table_metrics_from_catalog(row)
+                    timer.add('table_stats', time.perf_counter() - started)
+                except Exception as e:
+                    metrics['errors'] = metrics.get('errors', []) + [f"Table metrics error: {str(e)}"]
+
+        groups = target.monitor.collectors.groups
+        metrics['collectors'] = {}
+        metrics['collection'] = {
+            'elapsed_ms': 0.0,
+            'ran': [],
+            'skipped': {group.name: 'aiomysql driver' for group in groups},
+            'intervals': {group.name: group.interval for group in groups}
+        }
+        return target.monitor.add_rates(metrics)
+
+    async def _sample_thread(self, target):
+        # A timed-out thread cannot be interrupted; keep a handle so the target
+        # is not sampled again until the blocking call has really finished
+        target.thread_future = self.executor.submit(target.monitor.get_performance_metrics)
+        return await asyncio.shield(asyncio.wrap_future(target.thread_future))
+
+    async def sample(self, target, semaphore):
+        """Take one sample from `target`, then record it and update its backoff"""
+        target.in_flight = True
+        timer = target.monitor.timer
+        timer.interval = self.interval
+        timer.begin()
+        try:
+            async with semaphore:
+                sampler = self._sample_aiomysql if self.driver == 'aiomysql' else self._sample_thread
+                try:
+                    metrics = await asyncio.wait_for(sampler(target), self.timeout)
+                except asyncio.TimeoutError:
+                    self.stats['timeouts'] += 1
+                    metrics = error_metrics(f"Sample timed out after {self.timeout}s")
+                except Exception as e:
+                    metrics = error_metrics(f"Failed to connect to MySQL: {e}")
+
+            metrics['target'] = target.name
+            if 'error' in metrics:
+                self.stats['failures'] += 1
+                target.failures += 1
+                backoff = min(self.max_backoff, self.interval * 2 ** (target.failures - 1))
+                target.retry_at = time.monotonic() + backoff * random.uniform(0.5, 1.0)
+            else:
+                self.stats['samples'] += 1
+                target.failures = 0
+                target.retry_at = 0.0
+
+            # File writes are blocking; keep them off the event loop
+            await asyncio.get_running_loop().run_in_executor(
+                self.executor, target.monitor.log_metrics, metrics, False)
+        finally:
+            timer.end()
+            target.in_flight = False
+
+    def _schedule_tick(self, semaphore):
+        now = time.monotonic()
+        tasks = []
+        for target in self.targets:
+            if target.in_flight or (target.thread_future and not target.thread_future.done()):
+                self.stats['skipped_in_flight'] += 1
+            elif target.retry_at > now:
+                self.stats['skipped_backoff'] += 1
+            else:
+                tasks.append(asyncio.ensure_future(self.sample(target, semaphore)))
+        return tasks
+
+    async def run(self, ticks=None):
+        """Collect until cancelled, or for `ticks` ticks"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending = set()
+        start = time.monotonic()
+        tick = 0
+
+        try:
+            while ticks is None or tick < ticks:
+                pending = {t for t in pending if not t.done()}
+                pending.update(self._schedule_tick(semaphore))
+                self.stats['ticks'] += 1
+                tick += 1
+
+                # Sleep to the next tick on the fixed grid; skip ticks we overran
+                next_tick = start + tick * self.interval
+                now = time.monotonic()
+                if now > next_tick:
+                    missed = int((now - next_tick) // self.interval) + 1
+                    self.stats['missed_ticks'] += missed
+                    tick += missed
+                    next_tick = start + tick * self.interval
+                if ticks is None or tick < ticks:
+                    await asyncio.sleep(next_tick - now)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            await self.close()
+
+    async def close(self):
+        for target in self.targets:
+            if target.pool is not None:
+                target.pool.close()
+                await target.pool.wait_closed()
+                target.pool = None
+        self.executor.shutdown(wait=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample a fleet of MySQL instances concurrently")
+    parser.add_argument('--targets', required=True, help="JSON file listing the instances to watch")
+    parser.add_argument('--interval', type=float, default=30)
+    parser.add_argument('--timeout', type=float, default=10, help="per-target sample timeout in seconds")
+    parser.add_argument('--concurrency', type=int, default=100, help="samples in flight at once")
+    parser.add_argument('--max-backoff', type=float, default=600)
+    parser.add_argument('--driver', choices=['auto', 'aiomysql', 'thread'], default='auto')
+    parser.add_argument('--metrics-dir', default='monitoring_logs')
+    args = parser.parse_args()
+
+    collector = AsyncCollector(load_targets(args.targets), interval=args.interval,
+                               timeout=args.timeout, concurrency=args.concurrency,
+                               max_backoff=args.max_backoff, driver=args.driver,
+                               metrics_dir=args.metrics_dir)
+    print(f"Collecting from {len(collector.targets)} targets every {args.interval}s "
+          f"using the {collector.driver} driver")
+    try:
+        asyncio.run(collector.run())
+    except KeyboardInterrupt:
+        print("\nCollection stopped by user")
+    print(f"Collector stats: {collector.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import argparse
+import csv
+import os
+import time
+from itertools import islice
+
+import mysql.connector
+from dotenv import load_dotenv
+from db_pool import get_pool
+
+CLIMATE_COLUMNS = ('location', 'record_date', 'temperature', 'precipitation', 'humidity')
+
+
+def load_db_config():
+    """Read connection settings from .secrets, same defaults as MySQLMonitor"""
+    load_dotenv('.secrets')
+    return {
+        'host': os.getenv('MYSQL_HOST', 'localhost'),
+        'user': os.getenv('MYSQL_USER', 'root'),
+        'password': os.getenv('MYSQL_PASSWORD', 'root'),
+        'database': os.getenv('MYSQL_DATABASE', 'project_db')
+    }
+
+
+class BulkInserter:
+    """Batched ingestion of climate readings into ClimateData.
+
+    Readings are consumed lazily from any iterable (tuples in CLIMATE_COLUMNS
+    order or dicts keyed by column name) and sent as multi-row INSERTs of
+    `batch_size` rows. A transaction is committed every `commit_every`
+    batches, so the fsync cost is paid once per commit instead of per row.
+    """
+
+    def __init__(self, pool, table='ClimateData', columns=CLIMATE_COLUMNS,
+                 batch_size=1000, commit_every=10):
+        if batch_size < 1 or commit_every < 1:
+            raise ValueError("batch_size and commit_every must be positive")
+        self.pool = pool
+        self.table = table
+        self.columns = tuple(columns)
+        self.batch_size = batch_size
+        self.commit_every = commit_every
+        column_list = ', '.join(f"`{c}`" for c in self.columns)
+        placeholders = ', '.join(['%s'] * len(self.columns))
+        # mysql-connector rewrites executemany() of this form into one multi-row INSERT
+        self.insert_query = f"INSERT INTO `{table}` ({column_list}) VALUES ({placeholders})"
+
+    def _as_row(self, reading):
+        if isinstance(reading, dict):
+            return tuple(reading[c] for c in self.columns)
+        return tuple(reading)
+
+    def _batches(self, readings):
+        rows = (self._as_row(r) for r in readings)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def insert(self, readings):
+        """Insert every reading and return ingestion stats"""
+        stats = {'rows': 0, 'batches': 0, 'commits': 0}
+        start = time.perf_counter()
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                pending = 0
+                for batch in self._batches(readings):
+                    cursor.executemany(self.insert_query, batch)
+                    stats['rows'] += len(batch)
+                    stats['batches'] += 1
+                    pending += 1
+                    if pending >= self.commit_every:
+                        conn.commit()
+                        stats['commits'] += 1
+                        pending = 0
+                if pending:
+                    conn.commit()
+                    stats['commits'] += 1
+            except Exception:
+                try:
+                    conn.rollback()
+                except mysql.connector.Error:
+                    pass  # The connection is dropped by the pool anyway
+                raise
+            finally:
+                cursor.close()
+
+        return self._finish(stats, start)
+
+    def load_file(self, path, delimiter=',', skip_header=True):
+        """Fast path for large CSV files using LOAD DATA LOCAL INFILE.
+
+        The server must run with local_infile=ON. The file's columns must be
+        in `self.columns` order. A dedicated connection is used because the
+        pooled ones are opened without local-infile permission.
+        """
+        path = os.path.abspath(path)
+        column_list = ', '.join(f"`{c}`" for c in self.columns)
+        query = (
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE `{self.table}` "
+            f"FIELDS TERMINATED BY %s OPTIONALLY ENCLOSED BY '\"' "
+            f"LINES TERMINATED BY '\\n' "
+            f"{'IGNORE 1 LINES ' if skip_header else ''}"
+            f"({column_list})"
+        )
+        stats = {'rows': 0, 'batches': 1, 'commits': 1}
+        start = time.perf_counter()
+
+        conn = mysql.connector.connect(**dict(self.pool.config, allow_local_infile=True))
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, (path, delimiter))
+            stats['rows'] = cursor.rowcount
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+
+        return self._finish(stats, start)
+
+    def _finish(self, stats, start):
+        elapsed = time.perf_counter() - start
+        stats['seconds'] = round(elapsed, 3)
+        stats['rows_per_sec'] = round(stats['rows'] / elapsed, 1) if elapsed > 0 else 0.0
+        return stats
+
+
+def read_csv_readings(path, delimiter=','):
+    """Stream readings from a CSV file with a CLIMATE_COLUMNS header"""
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f, delimiter=delimiter):
+            yield row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load climate readings into ClimateData")
+    parser.add_argument('file', help="CSV file with a location,record_date,temperature,precipitation,humidity header")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--commit-every', type=int, default=10, help="batches per transaction")
+    parser.add_argument('--local-infile', action='store_true',
+                        help="use LOAD DATA LOCAL INFILE instead of batched INSERTs")
+    args = parser.parse_args()
+
+    inserter = BulkInserter(get_pool(load_db_config(), size=1),
+                            batch_size=args.batch_size, commit_every=args.commit_every)
+    if args.local_infile:
+        stats = inserter.load_file(args.file)
+    else:
+        stats = inserter.insert(read_csv_readings(args.file))
+    print(f"Loaded {stats['rows']:,} rows in {stats['seconds']}s ({stats['rows_per_sec']:,} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import random
+import time
+
+import mysql.connector
+from mysql.connector import errorcode
+from bulk_insert import load_db_config
+from db_pool import get_pool
+
+# Errors after which the chunk is rolled back and tried again
+RETRYABLE_ERRORS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+# Lock time of this session's last UPDATE; includes InnoDB row lock waits on MySQL 8.0.28+
+LOCK_TIME_QUERY = """
+    SELECT LOCK_TIME / 1e9 AS lock_ms
+    FROM performance_schema.events_statements_history
+    WHERE THREAD_ID = PS_CURRENT_THREAD_ID() AND SQL_TEXT LIKE 'UPDATE%'
+    ORDER BY EVENT_ID DESC LIMIT 1
+"""
+
+STAT_SUMS = ('runs', 'chunks', 'rows', 'retries', 'deadlocks', 'lock_timeouts', 'lock_wait_ms')
+STAT_MAXES = ('max_chunk_ms', 'max_lock_wait_ms')
+
+
+def new_chunk_stats():
+    return dict({key: 0 for key in STAT_SUMS}, **{key: 0.0 for key in STAT_MAXES})
+
+
+def merge_chunk_stats(target, source):
+    for key in STAT_SUMS:
+        target[key] += source.get(key, 0)
+    for key in STAT_MAXES:
+        target[key] = max(target[key], source.get(key, 0.0))
+    target['lock_wait_ms'] = round(target['lock_wait_ms'], 3)
+    return target
+
+
+class ChunkedUpdater:
+    """Runs a large UPDATE as a walk over the primary key in bounded chunks.
+
+    Each chunk covers at most `chunk_size` consecutive keys and is its own
+    READ COMMITTED transaction. It therefore locks only the matching rows of
+    that key range, and only until the chunk commits. There are no gap
+    locks, so concurrent inserts at the end of the table are never blocked.
+    A chunk that hits a deadlock or lock-wait timeout is rolled back and
+    retried after a full-jitter exponential backoff. Keys are walked up to
+    the maximum that existed when the run started; rows inserted later are
+    not touched.
+    """
+
+    def __init__(self, table='ClimateData', key='record_id', chunk_size=1000, max_retries=5,
+                 base_delay=0.05, max_delay=2.0, lock_wait_timeout=5, pause=0.0, rng=None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        self.table = table
+        self.key = key
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock_wait_timeout = lock_wait_timeout
+        self.pause = pause
+        self.rng = rng or random.Random()
+        self._lock_time_available = True
+
+    def backoff(self, attempt):
+        """Full jitter: uniform in [0, min(max_delay, base_delay * 2^attempt)]"""
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _bounds(self, cursor, after):
+        """Last key of the chunk after `after`, or None when fewer than chunk_size keys remain"""
+        cursor.execute(f"SELECT `{self.key}` FROM `{self.table}` WHERE `{self.key}` > %s "
+                       f"ORDER BY `{self.key}` LIMIT 1 OFFSET %s", (after, self.chunk_size - 1))
+        row = cursor.fetchone()
+        cursor.fetchall()
+        return row[0] if row else None
+
+    def _lock_wait_ms(self, cursor):
+        if not self._lock_time_available:
+            return None
+        try:
+            cursor.execute(LOCK_TIME_QUERY)
+            row = cursor.fetchone()
+            cursor.fetchall()
+            return round(float(row[0]), 3) if row and row[0] is not None else None
+        except mysql.connector.Error:
+            # performance_schema off or too old: stop asking
+            self._lock_time_available = False
+            return None
+
+    def run(self, conn, set_clause, where_clause='1=1', params=(), on_chunk=None):
+        """UPDATE table SET <set_clause> WHERE <where_clause>, one key range at a time.
+
+        `params` fill the placeholders of set_clause and then where_clause.
+        on_chunk(info) is called after every committed chunk with its key
+        range, rows, elapsed_ms, lock_wait_ms and retries. Returns totals in
+        the new_chunk_stats() format.
+        """
+        stats = new_chunk_stats()
+        stats['runs'] = 1
+        statement = (f"UPDATE `{self.table}` SET {set_clause} "
+                     f"WHERE `{self.key}` > %s AND `{self.key}` <= %s AND ({where_clause})")
+        cursor = conn.cursor()
+        previous_timeout = None
+        try:
+            if conn.in_transaction:
+                conn.commit()
+            if self.lock_wait_timeout:
+                # Fail fast and retry instead of queueing behind a long lock
+                cursor.execute("SELECT @@SESSION.innodb_lock_wait_timeout")
+                previous_timeout = cursor.fetchone()[0]
+                cursor.fetchall()
+                cursor.execute("SET SESSION innodb_lock_wait_timeout = %s", (int(self.lock_wait_timeout),))
+            cursor.execute(f"SELECT COALESCE(MIN(`{self.key}`) - 1, 0), COALESCE(MAX(`{self.key}`), 0) "
+                           f"FROM `{self.table}`")
+            low, last = cursor.fetchone()
+            cursor.fetchall()
+
+            while low < last:
+                high = self._bounds(cursor, low)
+                high = last if high is None or high > last else high
+                # With autocommit off the reads above opened a transaction; the chunk needs its own
+                conn.commit()
+                rows, elapsed, retries = self._run_chunk(conn, cursor, statement, params, low, high, stats)
+                lock_wait = self._lock_wait_ms(cursor)
+                conn.commit()
+
+                stats['chunks'] += 1
+                stats['rows'] += rows
+                stats['retries'] += retries
+                stats['max_chunk_ms'] = max(stats['max_chunk_ms'], elapsed)
+                if lock_wait is not None:
+                    stats['lock_wait_ms'] = round(stats['lock_wait_ms'] + lock_wait, 3)
+                    stats['max_lock_wait_ms'] = max(stats['max_lock_wait_ms'], lock_wait)
+                if on_chunk:
+                    on_chunk({'from': low, 'to': high, 'rows': rows, 'elapsed_ms': elapsed,
+                              'lock_wait_ms': lock_wait, 'retries': retries})
+                low = high
+                if self.pause and low < last:
+                    time.sleep(self.pause)
+        finally:
+            try:
+                if previous_timeout is not None:
+                    # Pooled connections go back with the session as it was
+                    cursor.execute("SET SESSION innodb_lock_wait_timeout = %s", (int(previous_timeout),))
+            except mysql.connector.Error:
+                pass
+            cursor.close()
+        return stats
+
+    def _run_chunk(self, conn, cursor, statement, params, low, high, stats):
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                conn.start_transaction(isolation_level='READ COMMITTED')
+                cursor.execute(statement, tuple(params) + (low, high))
+                rows = cursor.rowcount
+                conn.commit()
+                return rows, round((time.perf_counter() - start) * 1000, 3), attempt
+            except mysql.connector.Error as err:
+                try:
+                    conn.rollback()
+                except mysql.connector.Error:
+                    pass
+                if err.errno not in RETRYABLE_ERRORS or attempt >= self.max_retries:
+                    raise
+                if err.errno == errorcode.ER_LOCK_DEADLOCK:
+                    stats['deadlocks'] += 1
+                else:
+                    stats['lock_timeouts'] += 1
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+
+
+def humidity_by_location(values):
+    """SET and WHERE clauses (with params) that give each location its own humidity in one pass"""
+    cases = ' '.join('WHEN %s THEN %s' for _ in values)
+    placeholders = ', '.join(['%s'] * len(values))
+    params = [item for pair in values.items() for item in pair] + list(values)
+    return f"humidity = CASE location {cases} END", f"location IN ({placeholders})", params
+
+
+def print_chunk(info):
+    lock_wait = f"{info['lock_wait_ms']:.1f}" if info['lock_wait_ms'] is not None else "n/a"
+    print(f"  keys {info['from'] + 1}-{info['to']}: {info['rows']} rows in {info['elapsed_ms']:.1f} ms, "
+          f"lock wait {lock_wait} ms" + (f", {info['retries']} retries" if info['retries'] else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update humidity per location in primary key chunks")
+    parser.add_argument('values', nargs='+', help="location=humidity pairs, e.g. Toronto=65.5")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="primary keys per transaction")
+    parser.add_argument('--max-retries', type=int, default=5, help="retries per chunk on deadlock/lock wait timeout")
+    parser.add_argument('--lock-wait-timeout', type=int, default=5,
+                        help="innodb_lock_wait_timeout for the update session, seconds")
+    parser.add_argument('--pause', type=float, default=0.0, help="seconds to sleep between chunks")
+    parser.add_argument('--quiet', action='store_true', help="only print the totals")
+    args = parser.parse_args()
+
+    values = {}
+    for pair in args.values:
+        location, _, humidity = pair.rpartition('=')
+        values[location] = float(humidity)
+
+    updater = ChunkedUpdater(chunk_size=args.chunk_size, max_retries=args.max_retries,
+                             lock_wait_timeout=args.lock_wait_timeout, pause=args.pause)
+    set_clause, where_clause, params = humidity_by_location(values)
+    try:
+        with get_pool(load_db_config(), size=1).connection() as conn:
+            stats = updater.run(conn, set_clause, where_clause, params,
+                                on_chunk=None if args.quiet else print_chunk)
+    except mysql.connector.Error as err:
+        print(f"Chunked update failed: {err}")
+        raise SystemExit(1)
+    print(f"Updated {stats['rows']} rows in {stats['chunks']} chunks; {stats['retries']} retries "
+          f"({stats['deadlocks']} deadlocks, {stats['lock_timeouts']} lock wait timeouts), "
+          f"lock wait {stats['lock_wait_ms']:.1f} ms total, {stats['max_lock_wait_ms']:.1f} ms max")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import time
+
+import mysql.connector
+
+# name -> MetricGroup subclass; register() adds to it
+COLLECTORS = {}
+
+
+def register(cls):
+    """Class decorator that makes a metric group available by name"""
+    COLLECTORS[cls.name] = cls
+    return cls
+
+
+def counter_delta(old, new):
+    """Increase of a cumulative counter; a drop means it was reset to zero"""
+    if old is None or new is None:
+        return None
+    return new if new < old else new - old
+
+
+def per_second(old, new, elapsed):
+    delta = counter_delta(old, new)
+    if delta is None or not elapsed or elapsed <= 0:
+        return None
+    return round(delta / elapsed, 3)
+
+
+class MetricGroup:
+    """One set of related metrics gathered by its own query on its own schedule.
+
+    `interval` is how often the group should run and `budget` how long one
+    run may take, both in seconds. A run that overshoots the budget (or
+    fails) doubles the group's interval, up to `max_backoff` times the base.
+    Cheap runs shrink it back. Costly groups therefore sample less often
+    without manual tuning.
+    """
+
+    name = None
+    interval = 30
+    budget = 0.1
+    max_backoff = 8
+
+    def __init__(self, interval=None, budget=None):
+        self.base_interval = interval if interval is not None else self.interval
+        self.interval = self.base_interval
+        if budget is not None:
+            self.budget = budget
+        self.last_run = None
+        self.expected_cost = 0.0  # moving average of measured run times
+
+    def overdue(self, now):
+        """How many intervals have passed since the last run (inf if never run)"""
+        if self.last_run is None:
+            return float('inf')
+        return (now - self.last_run) / self.interval
+
+    def record_run(self, now, cost, failed=False):
+        self.last_run = now
+        self.expected_cost = cost if not self.expected_cost else 0.7 * self.expected_cost + 0.3 * cost
+        if failed or cost > self.budget:
+            self.interval = min(self.interval * 2, self.base_interval * self.max_backoff)
+        elif cost <= self.budget / 2 and self.interval > self.base_interval:
+            self.interval = max(self.base_interval, self.interval / 2)
+
+    def collect(self, cursor, timeout_ms):
+        """Run the group's query and return a JSON-serializable dict"""
+        raise NotImplementedError
+
+
+class StatusGroup(MetricGroup):
+    """Metrics derived from a fixed set of SHOW GLOBAL STATUS variables"""
+
+    variables = ()
+
+    def __init__(self, interval=None, budget=None):
+        super().__init__(interval, budget)
+        self._previous = None
+        self._previous_time = None
+
+    def collect(self, cursor, timeout_ms):
+        placeholders = ', '.join(['%s'] * len(self.variables))
+        cursor.execute(f"SHOW GLOBAL STATUS WHERE Variable_name IN ({placeholders})",
+                       tuple(self.variables))
+        values = {}
+        for row in cursor.fetchall():
+            try:
+                values[row['Variable_name']] = int(row['Value'])
+            except (TypeError, ValueError):
+                pass
+
+        now = time.monotonic()
+        previous = self._previous or {}
+        elapsed = now - self._previous_time if self._previous_time is not None else None
+        self._previous, self._previous_time = values, now
+        return self.derive(values, previous, elapsed)
+
+    def derive(self, values, previous, elapsed):
+        """Turn raw counters into the published metrics; previous is {} on the first run"""
+        raise NotImplementedError
+
+
+@register
+class BufferPoolGroup(StatusGroup):
+    name = 'innodb_buffer_pool'
+    variables = ('Innodb_buffer_pool_read_requests', 'Innodb_buffer_pool_reads',
+                 'Innodb_buffer_pool_pages_total', 'Innodb_buffer_pool_pages_free',
+                 'Innodb_buffer_pool_pages_dirty')
+
+    def derive(self, values, previous, elapsed):
+        requests = counter_delta(previous.get('Innodb_buffer_pool_read_requests'),
+                                 values.get('Innodb_buffer_pool_read_requests'))
+        reads = counter_delta(previous.get('Innodb_buffer_pool_reads'),
+                              values.get('Innodb_buffer_pool_reads'))
+        total = values.get('Innodb_buffer_pool_pages_total') or 0
+        free = values.get('Innodb_buffer_pool_pages_free', 0)
+        dirty = values.get('Innodb_buffer_pool_pages_dirty', 0)
+        return {
+            # Share of page requests served from memory since the last run
+            'hit_ratio': round(1 - reads / requests, 5) if requests and reads is not None else None,
+            'disk_reads_per_sec': per_second(previous.get('Innodb_buffer_pool_reads'),
+                                             values.get('Innodb_buffer_pool_reads'), elapsed),
+            'pages_used_pct': round((total - free) / total * 100, 2) if total else None,
+            'pages_dirty_pct': round(dirty / total * 100, 2) if total else None
+        }
+
+
+@register
+class RowLockGroup(StatusGroup):
+    name = 'innodb_row_locks'
+    variables = ('Innodb_row_lock_waits', 'Innodb_row_lock_time', 'Innodb_row_lock_current_waits')
+
+    def derive(self, values, previous, elapsed):
+        waits = counter_delta(previous.get('Innodb_row_lock_waits'), values.get('Innodb_row_lock_waits'))
+        wait_time = counter_delta(previous.get('Innodb_row_lock_time'), values.get('Innodb_row_lock_time'))
+        return {
+            'waits_per_sec': per_second(previous.get('Innodb_row_lock_waits'),
+                                        values.get('Innodb_row_lock_waits'), elapsed),
+            'current_waits': values.get('Innodb_row_lock_current_waits'),
+            # Innodb_row_lock_time is in milliseconds
+            'avg_wait_ms': round(wait_time / waits, 3) if waits and wait_time is not None else None
+        }
+
+
+@register
+class RowOperationsGroup(StatusGroup):
+    name = 'innodb_rows'
+    variables = ('Innodb_rows_read', 'Innodb_rows_inserted', 'Innodb_rows_updated', 'Innodb_rows_deleted')
+
+    def derive(self, values, previous, elapsed):
+        return {
+            f"{variable[len('Innodb_rows_'):]}_per_sec": per_second(previous.get(variable),
+                                                                     values.get(variable), elapsed)
+            for variable in self.variables
+        }
+
+
+@register
+class TempTableGroup(StatusGroup):
+    name = 'temp_tables'
+    interval = 60
+    variables = ('Created_tmp_tables', 'Created_tmp_disk_tables', 'Created_tmp_files')
+
+    def derive(self, values, previous, elapsed):
+        tables = counter_delta(previous.get('Created_tmp_tables'), values.get('Created_tmp_tables'))
+        disk = counter_delta(previous.get('Created_tmp_disk_tables'), values.get('Created_tmp_disk_tables'))
+        return {
+            'tmp_tables_per_sec': per_second(previous.get('Created_tmp_tables'),
+                                             values.get('Created_tmp_tables'), elapsed),
+            'tmp_disk_tables_per_sec': per_second(previous.get('Created_tmp_disk_tables'),
+                                                  values.get('Created_tmp_disk_tables'), elapsed),
+            'tmp_files_per_sec': per_second(previous.get('Created_tmp_files'),
+                                            values.get('Created_tmp_files'), elapsed),
+            # Internal temp tables that spilled from memory to disk
+            'disk_spill_pct': round(disk / tables * 100, 2) if tables and disk is not None else None
+        }
+
+
+@register
+class StatementDigestGroup(MetricGroup):
+    """Top statements by total latency since the digest table was last truncated"""
+
+    name = 'statement_digests'
+    interval = 300
+    budget = 0.5
+    limit = 10
+
+    # Timer columns are in picoseconds
+    QUERY = """
+        SELECT /*+ MAX_EXECUTION_TIME({timeout_ms}) */
+            DIGEST AS digest,
+            SCHEMA_NAME AS schema_name,
+            LEFT(DIGEST_TEXT, 200) AS query,
+            COUNT_STAR AS calls,
+            SUM_TIMER_WAIT / 1e9 AS total_latency_ms,
+            AVG_TIMER_WAIT / 1e9 AS avg_latency_ms,
+            MAX_TIMER_WAIT / 1e9 AS max_latency_ms,
+            SUM_ROWS_EXAMINED AS rows_examined,
+            SUM_ROWS_SENT AS rows_sent,
+            SUM_CREATED_TMP_DISK_TABLES AS tmp_disk_tables,
+            SUM_NO_INDEX_USED AS no_index_used
+        FROM performance_schema.events_statements_summary_by_digest
+        WHERE DIGEST IS NOT NULL
+        ORDER BY SUM_TIMER_WAIT DESC
+        LIMIT {limit}
+    """
+
+    def collect(self, cursor, timeout_ms):
+        # performance_schema reads are SELECTs, so the server enforces the budget itself
+        cursor.execute(self.QUERY.format(timeout_ms=int(timeout_ms), limit=int(self.limit)))
+        top = []
+        for row in cursor.fetchall():
+            entry = {}
+            for key, value in row.items():
+                if key in ('digest', 'schema_name', 'query'):
+                    entry[key] = value
+                elif key.endswith('_ms'):
+                    entry[key] = round(float(value or 0), 3)
+                else:
+                    entry[key] = int(value or 0)
+            top.append(entry)
+        return {'top': top}
+
+
+def build_collectors(names=None, time_budget=5.0, intervals=None):
+    """CollectorScheduler for the named groups (all registered groups when names is None)"""
+    names = list(COLLECTORS) if names is None else names
+    unknown = [name for name in names if name not in COLLECTORS]
+    if unknown:
+        raise ValueError(f"Unknown collectors {unknown}; available: {sorted(COLLECTORS)}")
+    intervals = intervals or {}
+    return CollectorScheduler([COLLECTORS[name](interval=intervals.get(name)) for name in names],
+                              time_budget=time_budget)
+
+
+class CollectorScheduler:
+    """Runs the metric groups that are due, within a time budget per sample.
+
+    The most overdue groups go first. A group whose expected cost no longer
+    fits in the remaining budget is skipped. It stays due, so it is first
+    in line on the next sample. A group that fails, for whatever reason, is
+    backed off like a slow one. The budget only governs these optional
+    groups; time the caller already spent before `deadline` counts against it.
+    """
+
+    def __init__(self, groups, time_budget=5.0):
+        self.groups = groups
+        self.time_budget = time_budget
+
+    def run(self, cursor, metrics, deadline=None, timer=None):
+        """Add metrics['collectors'] and metrics['collection'] for every group run now.
+
+        With a phase_timer.PhaseTimer, each group's run is also recorded as
+        phase 'collector:<name>'.
+        """
+        start = time.perf_counter()
+        deadline = start + self.time_budget if deadline is None else deadline
+        now = time.monotonic()
+
+        due = [group for group in self.groups if group.overdue(now) >= 1]
+        due.sort(key=lambda group: group.overdue(now), reverse=True)
+
+        results = {}
+        skipped = {}
+        for group in due:
+            remaining = deadline - time.perf_counter()
+            # A run never takes much longer than its budget, which also caps
+            # its statement timeout, so a slow history cannot starve a group
+            if remaining <= 0 or min(group.expected_cost, group.budget) > remaining:
+                skipped[group.name] = 'time budget'
+                continue
+            began = time.perf_counter()
+            failed = False
+            try:
+                results[group.name] = group.collect(cursor, max(1, min(group.budget, remaining) * 1000))
+            except mysql.connector.Error as e:
+                failed = True
+                metrics['errors'] = metrics.get('errors', []) + [f"Collector {group.name} error: {str(e)}"]
+            except Exception as e:
+                # A bug in one group's derivation must not cost the rest of the sample
+                failed = True
+                metrics['errors'] = metrics.get('errors', []) + [
+                    f"Collector {group.name} error: {type(e).__name__}: {e}"]
+            cost = time.perf_counter() - began
+            group.record_run(time.monotonic(), cost, failed)
+            if timer is not None:
+                timer.add(f"collector:{group.name}", cost)
+
+        metrics['collectors'] = results
+        metrics['collection'] = {
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3),
+            'ran': list(results),
+            'skipped': skipped,
+            'intervals': {group.name: group.interval for group in self.groups}
+        }
+        return metrics
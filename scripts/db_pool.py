@@ -0,0 +1,226 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import errors as mysql_errors
+
+# Errors that mean the socket is gone and the connection must not be reused
+BROKEN_CONNECTION_ERRORS = (mysql_errors.InterfaceError, mysql_errors.OperationalError)
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Bounded pool of reusable MySQL connections.
+
+    Connections are created lazily up to `size`. Every checkout pings the
+    connection and reconnects it if the socket was dropped, so callers never
+    see a stale handle from an idle period or a server restart. Waiters are
+    woken both when a connection is returned and when a discarded one frees
+    a slot for a new connection.
+    """
+
+    def __init__(self, config, size=5, timeout=30, reconnect_attempts=3, reconnect_delay=1):
+        self.config = dict(config)
+        self.size = size
+        self.timeout = timeout
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+        # LIFO keeps the most recently used connections warm
+        self._idle = []
+        self._lock = threading.Lock()
+        # Signalled whenever a connection is returned or a slot is freed
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._in_use = 0
+        self._stats = {
+            'checkouts': 0,
+            'connects': 0,
+            'reconnects': 0,
+            'health_check_failures': 0,
+            'discarded': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0
+        }
+
+    def _new_connection(self):
+        conn = mysql.connector.connect(**self.config)
+        with self._lock:
+            self._stats['connects'] += 1
+        return conn
+
+    def _ensure_healthy(self, conn):
+        """Ping a checked-out connection and repair it if the socket is broken"""
+        try:
+            conn.ping(reconnect=False)
+            return conn
+        except mysql.connector.Error:
+            with self._lock:
+                self._stats['health_check_failures'] += 1
+
+        try:
+            conn.reconnect(attempts=self.reconnect_attempts, delay=self.reconnect_delay)
+            with self._lock:
+                self._stats['reconnects'] += 1
+            return conn
+        except mysql.connector.Error:
+            self._close_quietly(conn)
+
+        # The old handle could not be revived, replace it with a fresh one
+        conn = self._new_connection()
+        with self._lock:
+            self._stats['reconnects'] += 1
+        return conn
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """Check out a healthy connection, waiting up to `timeout` seconds"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = start + timeout
+
+        conn = None
+        with self._available:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    # Reserve the slot; the connection is opened outside the lock
+                    self._created += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolExhaustedError(
+                        f"No connection available after {timeout}s (pool size {self.size})"
+                    )
+                self._available.wait(remaining)
+
+        if conn is None:
+            try:
+                conn = self._new_connection()
+            except Exception:
+                self._free_slot()
+                raise
+        else:
+            conn = self._checked(conn)
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+            self._stats['wait_time_total'] += waited
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], waited)
+        return conn
+
+    def _checked(self, conn):
+        try:
+            return self._ensure_healthy(conn)
+        except Exception:
+            self._free_slot()
+            raise
+
+    def _free_slot(self):
+        """Forget a connection that is gone, letting a waiter open a new one"""
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def release(self, conn, broken=False):
+        """Return a connection to the pool, discarding it if it is unusable"""
+        if not broken:
+            try:
+                # Never hand the next caller an open transaction or its locks
+                if conn.in_transaction:
+                    conn.rollback()
+            except mysql.connector.Error:
+                broken = True
+
+        with self._available:
+            self._in_use -= 1
+            if broken:
+                self._created -= 1
+                self._stats['discarded'] += 1
+            else:
+                self._idle.append(conn)
+            self._available.notify()
+
+        if broken:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that checks a connection out and always returns it"""
+        conn = self.acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except BROKEN_CONNECTION_ERRORS:
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def stats(self):
+        """Snapshot of pool counters, safe to serialize into a metrics sample"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['open'] = self._created
+            stats['in_use'] = self._in_use
+        checkouts = stats['checkouts']
+        stats['wait_time_avg_ms'] = round(stats['wait_time_total'] / checkouts * 1000, 3) if checkouts else 0.0
+        stats['wait_time_max_ms'] = round(stats.pop('wait_time_max') * 1000, 3)
+        stats['wait_time_total_ms'] = round(stats.pop('wait_time_total') * 1000, 3)
+        return stats
+
+    def close(self):
+        """Close every idle connection; checked-out ones are closed on release"""
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._available.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(config, size=5, **kwargs):
+    """Return the shared pool for a server/user/database, creating it on first use.
+
+    All scripts in one process asking for the same target get the same pool,
+    so the monitor and the load workers never open duplicate connections.
+    """
+    key = (config.get('host'), config.get('port', 3306), config.get('user'), config.get('database'))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(config, size=size, **kwargs)
+            _pools[key] = pool
+        elif size > pool.size:
+            # A later caller needs more concurrency than the first one asked for
+            with pool._available:
+                pool.size = size
+                pool._available.notify_all()
+        return pool
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,210 @@
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from bulk_insert import CLIMATE_COLUMNS, BulkInserter, load_db_config
+from db_pool import get_pool
+
+# name: (mean temperature °C, seasonal amplitude °C, mean humidity %, yearly precipitation mm)
+STATIONS = {
+    'Toronto': (9.4, 13.0, 70.0, 830),
+    'Vancouver': (11.0, 7.5, 79.0, 1190),
+    'Montreal': (7.4, 15.5, 70.0, 1000),
+    'Calgary': (4.4, 12.0, 56.0, 420),
+    'Halifax': (7.5, 11.0, 77.0, 1450),
+    'Ottawa': (6.6, 15.5, 71.0, 920),
+    'Winnipeg': (3.0, 18.5, 68.0, 520),
+    'Edmonton': (4.2, 14.0, 64.0, 460),
+    'Quebec City': (4.7, 15.5, 74.0, 1190),
+    "St. John's": (5.6, 10.0, 82.0, 1530),
+    'Regina': (3.1, 17.5, 66.0, 390),
+    'Saskatoon': (3.3, 18.0, 66.0, 350),
+    'Victoria': (10.6, 6.5, 76.0, 610),
+    'Charlottetown': (6.0, 12.5, 78.0, 1160),
+    'Fredericton': (5.6, 14.5, 74.0, 1100),
+    'Thunder Bay': (2.9, 15.5, 71.0, 710),
+    'Kelowna': (8.3, 12.0, 66.0, 380),
+    'Whitehorse': (-0.1, 15.0, 63.0, 270),
+    'Yellowknife': (-4.3, 21.0, 70.0, 290),
+    'Iqaluit': (-9.3, 15.5, 77.0, 400)
+}
+
+# Day of year of the seasonal temperature peak (late July)
+WARMEST_DAY = 200
+
+# Day-to-day persistence of weather anomalies (AR(1) coefficient) and their size
+ANOMALY_PERSISTENCE = 0.7
+ANOMALY_STD = 3.0
+
+
+def station_table(count, rng):
+    """Parameters for `count` stations: the real cities first, then jittered copies of them"""
+    cities = list(STATIONS)
+    names = list(cities)
+    params = [STATIONS[name] for name in cities]
+    for i in range(len(cities), count):
+        city = cities[i % len(cities)]
+        mean, amplitude, humidity, precipitation = STATIONS[city]
+        names.append(f"{city} {i // len(cities) + 1}")
+        params.append((mean + rng.normal(0, 1.5), amplitude * rng.uniform(0.85, 1.15),
+                       float(np.clip(humidity + rng.normal(0, 4), 35, 90)),
+                       precipitation * rng.uniform(0.7, 1.3)))
+    stations = pd.DataFrame(params[:count], columns=['mean_temp', 'amplitude', 'humidity', 'precipitation'])
+    stations.insert(0, 'location', names[:count])
+    return stations
+
+
+class ClimateGenerator:
+    """Vectorized, reproducible daily climate readings.
+
+    Every station gets `per_day` readings per day from start to end. The
+    temperature follows an annual cosine with a persistent AR(1) weather
+    anomaly. Humidity runs opposite to the seasonal and daily temperature
+    anomaly. Precipitation falls on wet days, which are more likely in
+    humid weather, in gamma-distributed amounts. Data is produced one year
+    at a time with a random generator seeded from (seed, year), so the
+    output does not depend on the sink or chunking.
+    """
+
+    def __init__(self, locations=20, start=date(2015, 1, 1), end=date(2024, 12, 31), per_day=1, seed=42):
+        if locations < 1 or per_day < 1 or end < start:
+            raise ValueError("need at least one location and reading per day, and start <= end")
+        self.start = start
+        self.end = end
+        self.per_day = per_day
+        self.seed = seed
+        self.stations = station_table(locations, np.random.default_rng([seed, 0]))
+
+    @property
+    def total_rows(self):
+        return ((self.end - self.start).days + 1) * len(self.stations) * self.per_day
+
+    def chunks(self):
+        """Yield one DataFrame with CLIMATE_COLUMNS per calendar year"""
+        stations = self.stations
+        n = len(stations)
+        mean = stations['mean_temp'].to_numpy()
+        amplitude = stations['amplitude'].to_numpy()
+        base_humidity = stations['humidity'].to_numpy()
+        # Average amount on a wet day, assuming about one wet day in three
+        wet_amount = stations['precipitation'].to_numpy() / 365.25 * 3
+        names = stations['location'].to_numpy(dtype=object)
+        anomaly = np.zeros(n)
+
+        for year in range(self.start.year, self.end.year + 1):
+            first = max(self.start, date(year, 1, 1))
+            last = min(self.end, date(year, 12, 31))
+            days = pd.date_range(first, last, freq='D')
+            rng = np.random.default_rng([self.seed, year])
+
+            # Weather anomaly: AR(1) along time, all stations at once
+            shocks = rng.normal(0, ANOMALY_STD * np.sqrt(1 - ANOMALY_PERSISTENCE ** 2), (len(days), n))
+            anomalies = np.empty_like(shocks)
+            for i in range(len(days)):
+                anomaly = ANOMALY_PERSISTENCE * anomaly + shocks[i]
+                anomalies[i] = anomaly
+
+            season = np.cos(2 * np.pi * (days.dayofyear.to_numpy() - WARMEST_DAY) / 365.25)[:, None]
+            daily_temp = mean + amplitude * season + anomalies
+
+            shape = (len(days), n, self.per_day)
+            # Readings within a day scatter around the daily value
+            temperature = daily_temp[:, :, None] + rng.normal(0, 1.2, shape)
+            # Drier in summer and in warm spells
+            humidity = (base_humidity - 6 * season - 1.5 * anomalies)[:, :, None] + rng.normal(0, 5, shape)
+            humidity = np.clip(humidity, 15, 100)
+
+            wet_probability = np.clip(0.33 + (humidity - base_humidity[None, :, None]) / 60, 0.05, 0.9)
+            wet = rng.random(shape) < wet_probability
+            precipitation = np.where(wet, rng.gamma(0.8, wet_amount[None, :, None] / 0.8, shape), 0.0)
+
+            yield pd.DataFrame({
+                'location': np.broadcast_to(names[None, :, None], shape).ravel(),
+                'record_date': np.repeat(days.strftime('%Y-%m-%d').to_numpy(), n * self.per_day),
+                'temperature': np.round(temperature, 1).ravel(),
+                'precipitation': np.round(precipitation, 1).ravel(),
+                'humidity': np.round(humidity, 1).ravel()
+            }, columns=list(CLIMATE_COLUMNS))
+
+    def write_csv(self, path, header_lines=()):
+        """Write CSV with a CLIMATE_COLUMNS header (the format bulk_insert.py and LOAD DATA read)"""
+        with open(path, 'w', newline='') as f:
+            for line in header_lines:
+                f.write(line + '\n')
+            rows = 0
+            for i, chunk in enumerate(self.chunks()):
+                chunk.to_csv(f, header=(i == 0), index=False, lineterminator='\n')
+                rows += len(chunk)
+        return rows
+
+    def write_jsonl(self, path):
+        rows = 0
+        with open(path, 'w') as f:
+            for chunk in self.chunks():
+                text = chunk.to_json(orient='records', lines=True, force_ascii=False)
+                f.write(text if text.endswith('\n') else text + '\n')
+                rows += len(chunk)
+        return rows
+
+    def load(self, inserter, local_infile=False):
+        """Insert into the database; returns the combined BulkInserter stats"""
+        if local_infile:
+            # LOAD DATA is fastest, but needs the rows in a file
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'climate.csv')
+                self.write_csv(path)
+                return inserter.load_file(path)
+        rows = (row for chunk in self.chunks()
+                for row in zip(*(chunk[column].tolist() for column in CLIMATE_COLUMNS)))
+        return inserter.insert(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic ClimateData readings")
+    parser.add_argument('--locations', type=int, default=20,
+                        help=f"stations; the first {len(STATIONS)} are real cities, the rest variations of them")
+    parser.add_argument('--start', type=date.fromisoformat, default=date(2015, 1, 1))
+    parser.add_argument('--end', type=date.fromisoformat, default=date(2024, 12, 31))
+    parser.add_argument('--per-day', type=int, default=1, help="readings per station and day")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="write to a .csv or .jsonl file instead of the database")
+    parser.add_argument('--migration-depends',
+                        help="prefix the CSV with '# depends:' / '# table:' lines so it can be "
+                             "placed in sql/ as a migrate.py seed")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--commit-every', type=int, default=10, help="batches per transaction")
+    parser.add_argument('--local-infile', action='store_true',
+                        help="load through a temporary CSV and LOAD DATA LOCAL INFILE")
+    args = parser.parse_args()
+    if args.migration_depends and not (args.output or '').endswith('.csv'):
+        parser.error("--migration-depends needs a .csv --output (migration seeds are CSV files)")
+
+    generator = ClimateGenerator(args.locations, args.start, args.end, args.per_day, args.seed)
+    print(f"Generating {generator.total_rows:,} readings for {args.locations} locations "
+          f"from {args.start} to {args.end} (seed {args.seed})")
+    start = time.perf_counter()
+
+    if args.output:
+        if args.output.endswith('.jsonl'):
+            rows = generator.write_jsonl(args.output)
+        else:
+            header = ([f"# depends: {args.migration_depends}", "# table: ClimateData"]
+                      if args.migration_depends else [])
+            rows = generator.write_csv(args.output, header)
+        elapsed = time.perf_counter() - start
+        print(f"Wrote {rows:,} rows to {args.output} in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+        return
+
+    inserter = BulkInserter(get_pool(load_db_config(), size=1),
+                            batch_size=args.batch_size, commit_every=args.commit_every)
+    stats = generator.load(inserter, args.local_infile)
+    print(f"Loaded {stats['rows']:,} rows in {stats['seconds']}s ({stats['rows_per_sec']:,} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,208 @@
+import argparse
+import io
 import json
 import os
-import glob
+import pickle
+import time
 import pandas as pd
 import matplotlib.pyplot as plt
-from datetime import datetime
 import seaborn as sns
+from metrics_store import MetricsReader
+from query_profiler import DIGESTS_FILE
+from rollups import STATUS_COLUMNS, RATE_COLUMNS, RollupStore, frame_from_samples, lttb
+
+FIGURE_SIZE = (20, 15)
+
+# Bump when the cached frame layout changes; older caches are then rebuilt
+CACHE_VERSION = 3
+
+# Rewrite the cached rows as one chunk once they are spread over this many
+CACHE_COMPACT_CHUNKS = 100
 
 class MetricsDashboard:
-    def __init__(self, logs_dir='monitoring_logs'):
+    def __init__(self, logs_dir='monitoring_logs', cache_file=None, rollups_dir=None):
+        """
+        With a cache_file, the parsed frame and the reader cursor (the
+        watermark) are saved between runs. Only samples written since the
+        last run are then read and parsed, and only their rows are appended
+        to the cache (see save_cache). With a rollups_dir, the 5min/1h/1d
+        rollup tiers are kept up to date and long ranges are drawn from them.
+        """
         self.logs_dir = logs_dir
-        self.metrics_data = []
+        self.cache_file = cache_file
+        self.rollups = RollupStore(rollups_dir) if rollups_dir else None
+        self.frame = pd.DataFrame(columns=STATUS_COLUMNS + RATE_COLUMNS + ['table_size'])
+        self.latest = None
+        self.cursor = None
+        self.rows_file = cache_file + '.rows' if cache_file else None
+        # Bytes of rows_file covered by the saved cursor, and the chunks in them
+        self._rows_bytes = 0
+        self._rows_chunks = 0
+        # Parsed frames not yet appended to rows_file
+        self._unsaved = []
+        self.view = ('raw', self.frame)
+        self.max_points = None
+        if cache_file:
+            self.load_cache()
         self.load_metrics()
+        if cache_file:
+            self.save_cache()
+
+    def load_cache(self):
+        """Restore the frame and watermark saved by a previous run, if compatible"""
+        try:
+            with open(self.cache_file, 'rb') as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Ignoring unreadable dashboard cache {self.cache_file}: {e}")
+            return
+        if (state.get('version') != CACHE_VERSION
+                or state.get('logs_dir') != os.path.abspath(self.logs_dir)):
+            print("Dashboard cache is from another version or logs directory; rebuilding")
+            return
+        try:
+            with open(self.rows_file, 'rb') as f:
+                data = f.read(state['rows_bytes'])
+        except OSError as e:
+            print(f"Ignoring unreadable dashboard cache {self.rows_file}: {e}")
+            return
+        if len(data) < state['rows_bytes']:
+            print("Dashboard cache rows are incomplete; rebuilding")
+            return
+        chunks = []
+        stream = io.BytesIO(data)
+        while stream.tell() < len(data):
+            chunks.append(pickle.load(stream))
+        if chunks:
+            self.frame = pd.concat(chunks)
+            if not self.frame.index.is_monotonic_increasing:
+                self.frame = self.frame.sort_index()
+        self.latest = state['latest']
+        self.cursor = state['cursor']
+        self._rows_bytes = state['rows_bytes']
+        self._rows_chunks = len(chunks)
+
+    def save_cache(self):
+        """Append the rows parsed since the last save, then commit the new cursor.
+
+        The rows live in rows_file as a sequence of pickled frames. The small
+        cache_file holds the cursor and how many bytes of rows_file belong to
+        it, and is replaced atomically. A crash between the two steps leaves
+        a tail that the next save truncates, so no row is cached twice.
+        """
+        directory = os.path.dirname(self.cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        compact = self._rows_chunks + len(self._unsaved) > CACHE_COMPACT_CHUNKS
+        chunks = [self.frame] if compact else self._unsaved
+        with open(self.rows_file, 'wb' if compact or not os.path.exists(self.rows_file) else 'r+b') as f:
+            f.truncate(0 if compact else self._rows_bytes)
+            f.seek(0, os.SEEK_END)
+            for chunk in chunks:
+                pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+            rows_bytes = f.tell()
+
+        state = {
+            'version': CACHE_VERSION,
+            'logs_dir': os.path.abspath(self.logs_dir),
+            'cursor': self.cursor,
+            'latest': self.latest,
+            'rows_bytes': rows_bytes
+        }
+        tmp = self.cache_file + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.cache_file)
+        self._rows_bytes = rows_bytes
+        self._rows_chunks = 1 if compact else self._rows_chunks + len(chunks)
+        self._unsaved = []
         
     def load_metrics(self):
-        """Load all metrics JSON files and parse them into a list"""
-        json_files = glob.glob(os.path.join(self.logs_dir, 'mysql_metrics_*.json'))
-        for file in json_files:
-            try:
-                with open(file, 'r') as f:
-                    data = json.load(f)
-                    # Skip incomplete or invalid metrics
-                    if not all(key in data for key in ['timestamp', 'global_status', 'processes', 'tables']):
-                        continue
-                    data['timestamp'] = datetime.fromisoformat(data['timestamp'])
-                    self.metrics_data.append(data)
-            except Exception as e:
-                print(f"Error loading {file}: {str(e)}")
-        
-        # Sort by timestamp
-        self.metrics_data.sort(key=lambda x: x['timestamp'])
+        """Append every sample stored after self.cursor to one typed, time-indexed DataFrame.
+
+        Samples are walked once to collect raw column values. Type conversion
+        and sorting then happen column-wise in pandas (see
+        rollups.frame_from_samples). The plots and the summary read from
+        self.frame. self.latest keeps the newest raw sample for its per-table
+        details. Returns the number of new samples.
+        """
+        reader = MetricsReader(self.logs_dir)
+        if self.rollups is not None:
+            self.rollups.sync(reader)
+
+        def samples():
+            for data, cursor in reader.follow(self.cursor):
+                self.cursor = cursor
+                yield data
+
+        frame, latest = frame_from_samples(samples())
+        if frame is None:
+            return 0
+        if self.latest is None or latest['timestamp'] >= self.latest['timestamp']:
+            self.latest = latest
+        self._unsaved.append(frame)
+
+        if self.frame.empty:
+            self.frame = frame
+        elif frame.index[0] >= self.frame.index[-1]:
+            self.frame = pd.concat([self.frame, frame])
+        else:
+            # Late samples (e.g. another writer's segment); only then pay for a full sort
+            self.frame = pd.concat([self.frame, frame]).sort_index()
+        return len(frame)
+
+    def refresh(self):
+        """Ingest samples written since the last load, updating the cache"""
+        added = self.load_metrics()
+        if self.cache_file and added:
+            self.save_cache()
+        return added
         
-    def create_performance_dashboard(self, output_dir='dashboard'):
+    def select_view(self, start=None, end=None, max_points=None):
+        """Choose the data drawn for [start, end]: raw samples or a rollup tier.
+
+        The finest tier with at most `max_points` points in the range wins.
+        By default that is the pixel width of one subplot, so nothing is
+        plotted that the image cannot show.
+        """
+        if max_points is None:
+            max_points = int(FIGURE_SIZE[0] * plt.rcParams['figure.dpi'] / 2)
+        self.max_points = max_points
+        if self.rollups is not None:
+            self.view = self.rollups.select(self.frame, start, end, max_points)
+        else:
+            self.view = ('raw', self.frame.loc[start:end])
+        return self.view
+
+    def plot_series(self, ax, column, label, color):
+        """Plot one metric from the selected view.
+
+        Rollup tiers draw the bucket average with a min/max band. Anything
+        still denser than max_points is thinned with LTTB.
+        """
+        tier, frame = self.view
+        name = column if tier == 'raw' else f"{column}_avg"
+        if name not in frame:
+            return  # e.g. rate columns in a tier written before they existed
+        line = frame[name].dropna()
+        if tier != 'raw':
+            band = frame[[f"{column}_min", f"{column}_max"]].dropna()
+            ax.fill_between(band.index, band.iloc[:, 0], band.iloc[:, 1], color=color, alpha=0.2)
+        if self.max_points and len(line) > self.max_points:
+            keep = lttb(line.index.asi8, line.values, self.max_points)
+            line = line.iloc[keep]
+        ax.plot(line.index, line.values, label=label, color=color)
+
+    def create_performance_dashboard(self, output_dir='dashboard', start=None, end=None, max_points=None):
         """Create performance dashboard with multiple plots"""
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
             
-        if not self.metrics_data:
+        if self.frame.empty:
             print("No valid metrics data found!")
             return
             
@@ -43,9 +210,14 @@ class MetricsDashboard:
         plt.style.use('dark_background')
         sns.set_style("darkgrid")
         
+        tier, _ = self.select_view(start, end, max_points)
+
         # Create a 2x2 subplot figure
-        fig = plt.figure(figsize=(20, 15))
-        fig.suptitle('MySQL Performance Dashboard', fontsize=16)
+        fig = plt.figure(figsize=FIGURE_SIZE)
+        title = 'MySQL Performance Dashboard'
+        if tier != 'raw':
+            title += f' ({tier} rollups: average with min/max band)'
+        fig.suptitle(title, fontsize=16)
         
         # 1. Query Performance Plot
         ax1 = plt.subplot(2, 2, 1)
@@ -72,131 +244,157 @@ class MetricsDashboard:
         
     def plot_query_metrics(self, ax):
         """Plot query-related metrics"""
-        timestamps = []
-        queries = []
-        slow_queries = []
-        
-        for d in self.metrics_data:
-            try:
-                timestamps.append(d['timestamp'])
-                queries.append(int(d['global_status'].get('Queries', 0)))
-                slow_queries.append(int(d['global_status'].get('Slow_queries', 0)))
-            except (KeyError, ValueError) as e:
-                print(f"Error processing query metrics: {str(e)}")
-                continue
-        
-        if timestamps:
-            ax.plot(timestamps, queries, label='Total Queries', color='#00ff00')
-            ax.plot(timestamps, slow_queries, label='Slow Queries', color='#ff0000')
-            ax.set_title('Query Performance')
-            ax.set_xlabel('Time')
-            ax.set_ylabel('Count')
-            ax.legend()
-            ax.tick_params(axis='x', rotation=45)
+        self.plot_series(ax, 'queries_per_sec', 'Queries/s', '#00ff00')
+        # Slow queries are orders of magnitude rarer; give them their own scale
+        slow_ax = ax.twinx()
+        self.plot_series(slow_ax, 'slow_queries_per_sec', 'Slow Queries/s', '#ff0000')
+        slow_ax.set_ylabel('Slow queries/s')
+        slow_ax.grid(False)
+        ax.set_title('Query Performance')
+        ax.set_xlabel('Time')
+        ax.set_ylabel('Queries/s')
+        lines, labels = ax.get_legend_handles_labels()
+        slow_lines, slow_labels = slow_ax.get_legend_handles_labels()
+        ax.legend(lines + slow_lines, labels + slow_labels)
+        ax.tick_params(axis='x', rotation=45)
         
     def plot_network_metrics(self, ax):
         """Plot network traffic metrics"""
-        timestamps = []
-        bytes_received = []
-        bytes_sent = []
-        
-        for d in self.metrics_data:
-            try:
-                timestamps.append(d['timestamp'])
-                bytes_received.append(int(d['global_status'].get('Bytes_received', 0)))
-                bytes_sent.append(int(d['global_status'].get('Bytes_sent', 0)))
-            except (KeyError, ValueError) as e:
-                print(f"Error processing network metrics: {str(e)}")
-                continue
-        
-        if timestamps:
-            ax.plot(timestamps, bytes_received, label='Bytes Received', color='#00ffff')
-            ax.plot(timestamps, bytes_sent, label='Bytes Sent', color='#ff00ff')
-            ax.set_title('Network Traffic')
-            ax.set_xlabel('Time')
-            ax.set_ylabel('Bytes')
-            ax.legend()
-            ax.tick_params(axis='x', rotation=45)
+        self.plot_series(ax, 'bytes_received_per_sec', 'Bytes Received/s', '#00ffff')
+        self.plot_series(ax, 'bytes_sent_per_sec', 'Bytes Sent/s', '#ff00ff')
+        ax.set_title('Network Traffic')
+        ax.set_xlabel('Time')
+        ax.set_ylabel('Bytes/s')
+        ax.legend()
+        ax.tick_params(axis='x', rotation=45)
         
     def plot_connection_metrics(self, ax):
         """Plot connection metrics"""
-        timestamps = []
-        connections = []
-        
-        for d in self.metrics_data:
-            try:
-                timestamps.append(d['timestamp'])
-                connections.append(int(d['global_status'].get('Threads_connected', 0)))
-            except (KeyError, ValueError) as e:
-                print(f"Error processing connection metrics: {str(e)}")
-                continue
-        
-        if timestamps:
-            ax.plot(timestamps, connections, label='Active Connections', color='#ffff00')
-            ax.set_title('Connection Status')
-            ax.set_xlabel('Time')
-            ax.set_ylabel('Count')
-            ax.legend()
-            ax.tick_params(axis='x', rotation=45)
+        self.plot_series(ax, 'Threads_connected', 'Active Connections', '#ffff00')
+        ax.set_title('Connection Status')
+        ax.set_xlabel('Time')
+        ax.set_ylabel('Count')
+        ax.legend()
+        ax.tick_params(axis='x', rotation=45)
         
     def plot_table_metrics(self, ax):
         """Plot table metrics"""
-        timestamps = []
-        table_sizes = []
-        
-        for d in self.metrics_data:
-            try:
-                timestamps.append(d['timestamp'])
-                total_size = sum(
-                    table_info.get('data_size', 0) + table_info.get('index_size', 0)
-                    for table_info in d['tables'].values()
-                )
-                table_sizes.append(total_size)
-            except (KeyError, ValueError) as e:
-                print(f"Error processing table metrics: {str(e)}")
-                continue
-        
-        if timestamps:
-            ax.plot(timestamps, table_sizes, label='Total Table Size', color='#ff8c00')
-            ax.set_title('Table Metrics')
-            ax.set_xlabel('Time')
-            ax.set_ylabel('Size (bytes)')
-            ax.legend()
-            ax.tick_params(axis='x', rotation=45)
+        self.plot_series(ax, 'table_size', 'Total Table Size', '#ff8c00')
+        ax.set_title('Table Metrics')
+        ax.set_xlabel('Time')
+        ax.set_ylabel('Size (bytes)')
+        ax.legend()
+        ax.tick_params(axis='x', rotation=45)
             
+    def load_query_digests(self):
+        """Profile saved by multi_thread_queries.py --profile-queries, or None"""
+        try:
+            with open(os.path.join(self.logs_dir, DIGESTS_FILE)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
     def generate_summary_report(self, output_dir):
         """Generate a summary report of the metrics"""
         report_file = os.path.join(output_dir, 'metrics_summary.txt')
+        frame = self.frame
+        latest = frame.iloc[-1]
+
+        def latest_value(name, fmt='.0f'):
+            value = latest[name]
+            return 'N/A' if pd.isna(value) else f"{value:{fmt}}"
+
+        def rate_stats(name, fmt):
+            rates = frame[name].dropna()
+            if rates.empty:
+                return 'N/A'
+            return f"avg {rates.mean():{fmt}}, peak {rates.max():{fmt}}"
         
         with open(report_file, 'w') as f:
             f.write("MySQL Monitoring Summary Report\n")
             f.write("=============================\n\n")
             
             # Monitoring period
-            start_time = min(d['timestamp'] for d in self.metrics_data)
-            end_time = max(d['timestamp'] for d in self.metrics_data)
-            f.write(f"Monitoring Period: {start_time} to {end_time}\n")
-            f.write(f"Total Samples: {len(self.metrics_data)}\n\n")
+            f.write(f"Monitoring Period: {frame.index[0]} to {frame.index[-1]}\n")
+            f.write(f"Total Samples: {len(frame)}\n\n")
             
             # Latest metrics
-            latest = self.metrics_data[-1]
             f.write("Latest Metrics:\n")
-            f.write(f"- Total Queries: {latest['global_status'].get('Queries', 'N/A')}\n")
-            f.write(f"- Slow Queries: {latest['global_status'].get('Slow_queries', 'N/A')}\n")
-            f.write(f"- Active Connections: {latest['global_status'].get('Threads_connected', 'N/A')}\n")
-            f.write(f"- Bytes Received: {latest['global_status'].get('Bytes_received', 'N/A')}\n")
-            f.write(f"- Bytes Sent: {latest['global_status'].get('Bytes_sent', 'N/A')}\n\n")
+            f.write(f"- Total Queries: {latest_value('Queries')}\n")
+            f.write(f"- Slow Queries: {latest_value('Slow_queries')}\n")
+            f.write(f"- Active Connections: {latest_value('Threads_connected')}\n")
+            f.write(f"- Bytes Received: {latest_value('Bytes_received')}\n")
+            f.write(f"- Bytes Sent: {latest_value('Bytes_sent')}\n")
+            f.write(f"- Queries/s: {latest_value('queries_per_sec', '.1f')}\n")
+            f.write(f"- Slow Queries/s: {latest_value('slow_queries_per_sec', '.3f')}\n")
+            f.write(f"- Bytes Received/s: {latest_value('bytes_received_per_sec')}\n")
+            f.write(f"- Bytes Sent/s: {latest_value('bytes_sent_per_sec')}\n\n")
+
+            # Throughput over the whole period
+            f.write("Throughput:\n")
+            f.write(f"- Queries/s: {rate_stats('queries_per_sec', '.1f')}\n")
+            f.write(f"- Slow Queries/s: {rate_stats('slow_queries_per_sec', '.3f')}\n")
+            f.write(f"- Bytes Received/s: {rate_stats('bytes_received_per_sec', '.0f')}\n")
+            f.write(f"- Bytes Sent/s: {rate_stats('bytes_sent_per_sec', '.0f')}\n\n")
             
             # Table statistics
             f.write("Table Statistics:\n")
-            for table_name, table_info in latest['tables'].items():
+            for table_name, table_info in self.latest['tables'].items():
                 f.write(f"- {table_name}:\n")
                 f.write(f"  * Rows: {table_info.get('rows', 'N/A')}\n")
                 f.write(f"  * Data Size: {table_info.get('data_size', 'N/A')} bytes\n")
                 f.write(f"  * Index Size: {table_info.get('index_size', 'N/A')} bytes\n")
 
-if __name__ == "__main__":
+            # Slowest statements from the client-side query profiler
+            digests = self.load_query_digests()
+            if digests:
+                f.write(f"\nTop Query Digests (profiled {digests['generated_at']}):\n")
+                for entry in list(digests['digests'].values())[:10]:
+                    summary = entry['summary']
+                    f.write(f"- {entry['query'][:120]}\n")
+                    f.write(f"  * Calls: {entry['calls']} ({entry['errors']} errors), Rows: {entry['rows']}\n")
+                    f.write(f"  * Total: {entry['total_ms']:.1f} ms, p50 {summary['p50_ms']} ms, "
+                            f"p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms\n")
+                    for table in entry.get('plan_tables') or []:
+                        f.write(f"  * Plan: {table['table']} {table['access_type']} "
+                                f"(key {table['key']}, ~{table['rows_examined_per_scan']} rows/scan)\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the MySQL performance dashboard")
+    parser.add_argument('--logs-dir', default='monitoring_logs')
+    parser.add_argument('--output-dir', default='dashboard')
+    parser.add_argument('--incremental', action='store_true',
+                        help="keep parsed samples in a cache and only read new ones on each run")
+    parser.add_argument('--cache', default=os.path.join('dashboard', '.dashboard_cache.pkl'),
+                        help="cache file for --incremental")
+    parser.add_argument('--every', type=float,
+                        help="keep running and refresh the dashboard every N seconds")
+    parser.add_argument('--rollups', action='store_true',
+                        help="maintain 5min/1h/1d rollups in <logs-dir>/rollups and plot from them")
+    parser.add_argument('--last', help="only plot this trailing range, e.g. 6h, 7d, 90d")
+    parser.add_argument('--max-points', type=int, help="points per line (default: subplot width in pixels)")
+    args = parser.parse_args()
+
     # Create dashboard
-    dashboard = MetricsDashboard()
-    dashboard.create_performance_dashboard()
-    print("Dashboard generated successfully in the 'dashboard' directory!") 
\ No newline at end of file
+    dashboard = MetricsDashboard(args.logs_dir, cache_file=args.cache if args.incremental else None,
+                                 rollups_dir=os.path.join(args.logs_dir, 'rollups') if args.rollups else None)
+
+    def render():
+        start = dashboard.frame.index[-1] - pd.Timedelta(args.last) if args.last and not dashboard.frame.empty else None
+        dashboard.create_performance_dashboard(args.output_dir, start=start, max_points=args.max_points)
+
+    render()
+    print(f"Dashboard generated successfully in the '{args.output_dir}' directory!")
+
+    try:
+        while args.every:
+            time.sleep(args.every)
+            added = dashboard.refresh()
+            if added:
+                render()
+                print(f"Dashboard refreshed with {added} new samples")
+    except KeyboardInterrupt:
+        print("\nDashboard refresh stopped by user")
+
+if __name__ == "__main__":
+    main() 
\ No newline at end of file
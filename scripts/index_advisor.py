@@ -0,0 +1,479 @@
+import argparse
+import json
+import os
+import re
+from datetime import datetime
+
+import mysql.connector
+from bulk_insert import load_db_config
+from db_pool import get_pool
+from query_profiler import DIGESTS_FILE, normalize_sql
+
+# Longest index a recommendation may have; wider covering indexes cost more on writes than they save
+MAX_INDEX_COLUMNS = 4
+
+# Access types that read every row (or every index entry) of the table
+SCAN_ACCESS_TYPES = ('ALL', 'index')
+
+SCHEMA_QUERY = """
+    SELECT s.TABLE_NAME AS table_name, s.INDEX_NAME AS index_name, s.NON_UNIQUE AS non_unique,
+           s.SEQ_IN_INDEX AS seq, s.COLUMN_NAME AS column_name
+    FROM information_schema.STATISTICS s
+    WHERE s.TABLE_SCHEMA = DATABASE()
+    ORDER BY s.TABLE_NAME, s.INDEX_NAME, s.SEQ_IN_INDEX
+"""
+
+COLUMNS_QUERY = """
+    SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name, TABLE_ROWS AS table_rows
+    FROM information_schema.COLUMNS c
+    JOIN information_schema.TABLES t USING (TABLE_SCHEMA, TABLE_NAME)
+    WHERE c.TABLE_SCHEMA = DATABASE() AND t.TABLE_TYPE = 'BASE TABLE'
+    ORDER BY TABLE_NAME, ORDINAL_POSITION
+"""
+
+# Reads per index since server start; an index with none is a candidate for removal
+INDEX_USAGE_QUERY = """
+    SELECT OBJECT_NAME AS table_name, INDEX_NAME AS index_name, COUNT_STAR AS uses
+    FROM performance_schema.table_io_waits_summary_by_index_usage
+    WHERE OBJECT_SCHEMA = DATABASE() AND INDEX_NAME IS NOT NULL
+"""
+
+SERVER_DIGESTS_QUERY = """
+    SELECT DIGEST_TEXT AS query, COUNT_STAR AS calls, SUM_TIMER_WAIT / 1e9 AS total_ms,
+           SUM_ROWS_EXAMINED AS rows_examined, SUM_ROWS_SENT AS rows_sent
+    FROM performance_schema.events_statements_summary_by_digest
+    WHERE SCHEMA_NAME = DATABASE() AND DIGEST_TEXT IS NOT NULL
+"""
+
+_CLAUSE_END = r"(?=\bGROUP BY\b|\bORDER BY\b|\bHAVING\b|\bLIMIT\b|\bFOR UPDATE\b|$)"
+_SELECT = re.compile(r"^SELECT (?P<select>.+?) FROM (?P<table>\w+)(?: (?:AS )?(?P<alias>(?!WHERE|GROUP|ORDER|LIMIT)\w+))?"
+                     r"(?P<rest>.*)$", re.I)
+_UPDATE = re.compile(r"^UPDATE (?P<table>\w+) SET (?P<set>.+?)(?P<rest> WHERE .*|$)", re.I)
+_DELETE = re.compile(r"^DELETE FROM (?P<table>\w+)(?P<rest>.*)$", re.I)
+_INSERT = re.compile(r"^(?:INSERT|REPLACE)(?: IGNORE)? INTO (?P<table>\w+)", re.I)
+_WHERE = re.compile(r"\bWHERE (?P<where>.+?)" + _CLAUSE_END, re.I)
+_GROUP = re.compile(r"\bGROUP BY (?P<cols>.+?)(?=\bHAVING\b|\bORDER BY\b|\bLIMIT\b|$)", re.I)
+_ORDER = re.compile(r"\bORDER BY (?P<cols>.+?)(?=\bLIMIT\b|\bFOR UPDATE\b|$)", re.I)
+_EQUALITY = re.compile(r"^(?:\w+\.)?(\w+) (?:= \?|<=> \?|IN \(\.\.\.\)|IN \( \? \)|IS NULL)$", re.I)
+_RANGE = re.compile(r"^(?:\w+\.)?(\w+) (?:[<>]=? \?|BETWEEN \? AND \?|LIKE \?)$", re.I)
+_IDENTIFIER = re.compile(r"\b[A-Za-z_]\w*\b")
+
+
+def _canonical(sql):
+    """Digest text in one spelling: no backticks, single spaces around punctuation"""
+    text = normalize_sql(sql).replace('`', '')
+    text = re.sub(r"\s*([(),=<>])\s*", r" \1 ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    text = text.replace("< = >", "<=>").replace("< >", "<>").replace("! =", "!=")
+    text = re.sub(r"([<>]) =", r"\1=", text)
+    return text.replace("( ... )", "(...)")
+
+
+def _columns_in(text, columns):
+    """Known column names referenced in a fragment, in order of first appearance"""
+    found = []
+    for token in _IDENTIFIER.findall(text):
+        name = token.lower()
+        if name in columns and columns[name] not in found:
+            found.append(columns[name])
+    return found
+
+
+def parse_statement(sql, schema):
+    """Describe how a single-table statement uses columns, or None if it cannot be analysed.
+
+    Returns {'kind', 'table', 'equality', 'range', 'group', 'order',
+    'referenced', 'select_all', 'unsargable'}. Only AND-ed simple
+    predicates are understood; joins, ORs and subqueries are skipped.
+    """
+    text = _canonical(sql)
+    upper = text.upper()
+    if ' JOIN ' in upper or upper.count('SELECT') > 1:
+        return None
+
+    insert = _INSERT.match(text)
+    if insert:
+        table = _table_name(insert.group('table'), schema)
+        return {'kind': 'insert', 'table': table} if table else None
+
+    match = _SELECT.match(text) or _UPDATE.match(text) or _DELETE.match(text)
+    if not match:
+        return None
+    table = _table_name(match.group('table'), schema)
+    if table is None:
+        return None
+    columns = {name.lower(): name for name in schema[table]['columns']}
+    kind = upper.split(' ', 1)[0].lower()
+    rest = match.group('rest')
+
+    info = {'kind': kind, 'table': table, 'equality': [], 'range': [], 'group': [], 'order': [],
+            'referenced': [], 'select_all': False, 'unsargable': []}
+    where = _WHERE.search(rest)
+    if where:
+        predicates = re.sub(r"BETWEEN \? AND \?", "BETWEEN ?_AND_?", where.group('where'), flags=re.I)
+        if re.search(r"\bOR\b", predicates, re.I):
+            return None
+        for predicate in re.split(r"\bAND\b", predicates, flags=re.I):
+            predicate = predicate.replace('?_AND_?', '? AND ?').strip()
+            while predicate.startswith('( ') and predicate.endswith(' )'):
+                predicate = predicate[2:-2]
+            equality = _EQUALITY.match(predicate)
+            ranged = _RANGE.match(predicate)
+            if equality and equality.group(1).lower() in columns:
+                info['equality'].append(columns[equality.group(1).lower()])
+            elif ranged and ranged.group(1).lower() in columns:
+                info['range'].append(columns[ranged.group(1).lower()])
+            else:
+                # e.g. DATE_FORMAT(record_date, ...) = ?: no index can serve it
+                info['unsargable'].extend(_columns_in(predicate, columns))
+    group = _GROUP.search(rest)
+    if group:
+        info['group'] = _columns_in(group.group('cols'), columns)
+    order = _ORDER.search(rest)
+    if order:
+        info['order'] = _columns_in(order.group('cols'), columns)
+
+    if kind == 'select':
+        select = match.group('select')
+        info['select_all'] = bool(re.search(r"(^|, )(\w+\.)?\*( ,|$)", select))
+        info['referenced'] = _columns_in(select, columns)
+    elif kind == 'update':
+        info['referenced'] = _columns_in(match.group('set'), columns)
+    for key in ('equality', 'range', 'group', 'order', 'unsargable'):
+        for name in info[key]:
+            if name not in info['referenced']:
+                info['referenced'].append(name)
+    return info
+
+
+def _table_name(name, schema):
+    for table in schema:
+        if table.lower() == name.lower():
+            return table
+    return None
+
+
+def candidate_index(info, schema):
+    """Index that would serve a parsed read, as (columns, covering) or None.
+
+    Equality columns come first, then GROUP BY / ORDER BY columns when there
+    is no range predicate (so the index delivers rows pre-sorted), then one
+    range column. For SELECTs the remaining referenced columns are appended
+    when the result stays within MAX_INDEX_COLUMNS, so the query is answered
+    from the index alone. InnoDB secondary indexes already carry the primary
+    key, so primary key columns are never appended.
+    """
+    if info['kind'] == 'insert':
+        return None
+    key = list(dict.fromkeys(info['equality']))
+    if not info['range']:
+        key += [name for name in info['group'] + info['order'] if name not in key]
+    if info['range']:
+        key += [name for name in info['range'][:1] if name not in key]
+    if not key:
+        return None
+
+    covering = False
+    if info['kind'] == 'select' and not info['select_all']:
+        primary = schema[info['table']]['primary']
+        extra = [name for name in info['referenced'] if name not in key and name not in primary]
+        if len(key) + len(extra) <= MAX_INDEX_COLUMNS:
+            key += extra
+            covering = True
+    return key[:MAX_INDEX_COLUMNS], covering
+
+
+def _served_by(candidate, covering, indexes, primary):
+    """Name of an existing index that already serves the candidate, else None"""
+    for name, index in indexes.items():
+        columns = index['columns']
+        if covering:
+            if columns[:len(candidate)] == candidate:
+                return name
+        elif columns[:len(candidate)] == candidate or (name == 'PRIMARY' and primary[:len(candidate)] == candidate):
+            return name
+    return None
+
+
+def index_name(columns):
+    return ('idx_' + '_'.join(name.lower() for name in columns))[:64]
+
+
+def load_profile_workload(path):
+    """Workload entries from a query_profiler JSON profile"""
+    with open(path) as f:
+        data = json.load(f)
+    workload = []
+    for entry in data['digests'].values():
+        plan = entry.get('plan_tables') or []
+        workload.append({
+            'query': entry['query'],
+            'calls': entry['calls'],
+            'total_ms': entry['total_ms'],
+            'rows_sent': entry.get('rows'),
+            # Estimate from the captured plan; the client cannot see rows examined
+            'rows_examined_per_call': max((t.get('rows_examined_per_scan') or 0 for t in plan), default=None),
+            'access_types': sorted({t['access_type'] for t in plan}),
+            'source': 'profile'
+        })
+    return workload
+
+
+def fetch_server_workload(cursor):
+    """Workload entries from performance_schema statement digests of this schema"""
+    cursor.execute(SERVER_DIGESTS_QUERY)
+    workload = []
+    for row in cursor.fetchall():
+        calls = int(row['calls'] or 0)
+        workload.append({
+            'query': row['query'],
+            'calls': calls,
+            'total_ms': round(float(row['total_ms'] or 0), 3),
+            'rows_sent': int(row['rows_sent'] or 0),
+            'rows_examined_per_call': int(row['rows_examined'] or 0) // calls if calls else None,
+            'access_types': [],
+            'source': 'performance_schema'
+        })
+    return workload
+
+
+def fetch_schema(cursor):
+    """{table: {'columns': [...], 'rows': n, 'primary': [...], 'indexes': {name: {'columns', 'unique'}}}}"""
+    schema = {}
+    cursor.execute(COLUMNS_QUERY)
+    for row in cursor.fetchall():
+        table = schema.setdefault(row['table_name'], {'columns': [], 'rows': int(row['table_rows'] or 0),
+                                                      'primary': [], 'indexes': {}})
+        table['columns'].append(row['column_name'])
+    cursor.execute(SCHEMA_QUERY)
+    for row in cursor.fetchall():
+        table = schema.get(row['table_name'])
+        if table is None:
+            continue
+        index = table['indexes'].setdefault(row['index_name'], {'columns': [], 'unique': not row['non_unique']})
+        index['columns'].append(row['column_name'])
+        if row['index_name'] == 'PRIMARY':
+            table['primary'].append(row['column_name'])
+    return schema
+
+
+def fetch_index_usage(cursor):
+    """{(table, index): reads since server start}; empty if performance_schema is off"""
+    try:
+        cursor.execute(INDEX_USAGE_QUERY)
+    except mysql.connector.Error as err:
+        print(f"Index usage unavailable: {err}")
+        return {}
+    return {(row['table_name'], row['index_name']): int(row['uses'] or 0) for row in cursor.fetchall()}
+
+
+def analyze(workload, schema, usage=None):
+    """Recommend missing indexes and flag redundant and unused ones"""
+    total_ms = sum(entry['total_ms'] for entry in workload) or 1.0
+    recommendations = {}
+    skipped = []
+    writes = {}
+
+    for entry in workload:
+        info = parse_statement(entry['query'], schema)
+        if info is None:
+            skipped.append(entry['query'])
+            continue
+        table = info['table']
+        if info['kind'] in ('insert', 'update', 'delete'):
+            writes[table] = writes.get(table, 0) + entry['calls']
+        candidate = candidate_index(info, schema)
+        if candidate is None:
+            continue
+        columns, covering = candidate
+        existing = _served_by(columns, covering, schema[table]['indexes'], schema[table]['primary'])
+        if existing:
+            continue
+        key = (table, tuple(columns))
+        rec = recommendations.setdefault(key, {
+            'table': table, 'name': index_name(columns), 'columns': columns, 'covering': covering,
+            'queries': [], 'calls': 0, 'total_ms': 0.0, 'rows_examined_per_call': None,
+            'access_types': set(), 'unsargable': set()
+        })
+        rec['queries'].append(entry['query'])
+        rec['calls'] += entry['calls']
+        rec['total_ms'] += entry['total_ms']
+        if entry['rows_examined_per_call'] is not None:
+            rec['rows_examined_per_call'] = max(rec['rows_examined_per_call'] or 0, entry['rows_examined_per_call'])
+        rec['access_types'].update(entry['access_types'])
+        rec['unsargable'].update(info['unsargable'])
+
+    results = []
+    for rec in recommendations.values():
+        share = rec['total_ms'] / total_ms
+        table_rows = schema[rec['table']]['rows']
+        examined = rec['rows_examined_per_call']
+        full_scan = bool(rec['access_types'] & set(SCAN_ACCESS_TYPES)) or (
+            examined is not None and table_rows and examined >= 0.5 * table_rows)
+        if full_scan and share >= 0.1:
+            benefit = 'high'
+        elif full_scan or (rec['covering'] and share >= 0.1):
+            benefit = 'medium'
+        else:
+            benefit = 'low'
+        rec.update(share_of_time=round(share, 4), total_ms=round(rec['total_ms'], 3), benefit=benefit,
+                   full_scan=full_scan, access_types=sorted(rec['access_types']),
+                   unsargable=sorted(rec['unsargable']), writes_per_profile=writes.get(rec['table'], 0))
+        results.append(rec)
+    order = {'high': 0, 'medium': 1, 'low': 2}
+    results.sort(key=lambda rec: (order[rec['benefit']], -rec['total_ms']))
+
+    redundant = []
+    for table, info in schema.items():
+        indexes = info['indexes']
+        planned = [rec['columns'] for rec in results if rec['table'] == table]
+        for name, index in indexes.items():
+            if name == 'PRIMARY' or index['unique']:
+                continue
+            columns = index['columns']
+            for other, other_index in indexes.items():
+                if other == name:
+                    continue
+                longer = other_index['columns']
+                # Identical indexes: keep the alphabetically first one
+                if columns == longer and name < other:
+                    continue
+                if longer[:len(columns)] == columns:
+                    redundant.append({'table': table, 'name': name, 'columns': columns,
+                                      'covered_by': other, 'after_recommendations': False})
+                    break
+            else:
+                for columns_planned in planned:
+                    if columns_planned[:len(columns)] == columns and columns_planned != columns:
+                        redundant.append({'table': table, 'name': name, 'columns': columns,
+                                          'covered_by': index_name(columns_planned),
+                                          'after_recommendations': True})
+                        break
+
+    unused = []
+    flagged = {(index['table'], index['name']) for index in redundant}
+    for (table, name), uses in sorted((usage or {}).items()):
+        index = schema.get(table, {}).get('indexes', {}).get(name)
+        if uses == 0 and name != 'PRIMARY' and index and not index['unique'] and (table, name) not in flagged:
+            unused.append({'table': table, 'name': name, 'columns': index['columns']})
+
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'profiled_ms': round(total_ms, 3),
+        'recommendations': results,
+        'redundant': redundant,
+        'unused': unused,
+        'skipped_queries': skipped
+    }
+
+
+def _guarded(table, name, statement, exists):
+    """02_add_humidity_column.sql-style statement that only runs if the index (does not) exist"""
+    return "\n".join([
+        "SET @preparedStatement = (SELECT IF(",
+        "  (",
+        "    SELECT COUNT(*)",
+        "    FROM INFORMATION_SCHEMA.STATISTICS",
+        "    WHERE",
+        "      TABLE_SCHEMA = @dbname",
+        f"      AND TABLE_NAME = '{table}'",
+        f"      AND INDEX_NAME = '{name}'",
+        f"  ) {'>' if exists else '='} 0,",
+        f'  "{statement}",',
+        '  "SELECT 1"',
+        "));",
+        "PREPARE indexStatement FROM @preparedStatement;",
+        "EXECUTE indexStatement;",
+        "DEALLOCATE PREPARE indexStatement;"
+    ])
+
+
+def render_migration(report, include_drops=False):
+    """Idempotent SQL for the recommendations; drops are commented out unless include_drops"""
+    lines = [f"-- Generated by scripts/index_advisor.py on {report['generated_at'][:19]}",
+             "USE project_db;", "", "SET @dbname = DATABASE();"]
+    for rec in report['recommendations']:
+        columns = ', '.join(rec['columns'])
+        lines += ["", f"-- {rec['benefit']} benefit: {rec['calls']} calls, "
+                      f"{rec['share_of_time']:.0%} of profiled time"
+                      + (", covering" if rec['covering'] else ""),
+                  _guarded(rec['table'], rec['name'],
+                           f"CREATE INDEX {rec['name']} ON {rec['table']} ({columns})", exists=False)]
+    for index in report['redundant'] + report['unused']:
+        reason = (f"redundant with {index['covered_by']}" if 'covered_by' in index
+                  else "unused since server start")
+        drop = _guarded(index['table'], index['name'],
+                        f"DROP INDEX {index['name']} ON {index['table']}", exists=True)
+        if not include_drops:
+            drop = "\n".join("-- " + line for line in drop.split("\n"))
+        lines += ["", f"-- {index['name']} ({', '.join(index['columns'])}): {reason}", drop]
+    return "\n".join(lines) + "\n"
+
+
+def print_report(report):
+    print(f"\nIndex advice for {report['profiled_ms']:.0f} ms of profiled statements")
+    if not report['recommendations']:
+        print("- No missing indexes found")
+    for rec in report['recommendations']:
+        examined = rec['rows_examined_per_call']
+        print(f"- [{rec['benefit']}] CREATE INDEX {rec['name']} ON {rec['table']} ({', '.join(rec['columns'])})"
+              + (" -- covering" if rec['covering'] else ""))
+        print(f"    serves {rec['calls']} calls, {rec['total_ms']:.1f} ms ({rec['share_of_time']:.0%} of time)"
+              + (f", now ~{examined} rows examined per call" if examined is not None else "")
+              + (f", plan: {'/'.join(rec['access_types'])}" if rec['access_types'] else ""))
+        if rec['writes_per_profile']:
+            print(f"    cost: maintained by {rec['writes_per_profile']} profiled writes to {rec['table']}")
+        if rec['unsargable']:
+            print(f"    note: predicates on {', '.join(rec['unsargable'])} wrap the column and cannot use an index")
+    for index in report['redundant']:
+        when = " once the recommendations are applied" if index['after_recommendations'] else ""
+        print(f"- Redundant: {index['name']} ({', '.join(index['columns'])}) is a prefix of "
+              f"{index['covered_by']}{when}")
+    for index in report['unused']:
+        print(f"- Unused since server start: {index['name']} on {index['table']}")
+    if report['skipped_queries']:
+        print(f"- {len(report['skipped_queries'])} statements not analysed (joins, OR or unparsed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suggest indexes for the captured query workload")
+    parser.add_argument('--digests', default=os.path.join('monitoring_logs', DIGESTS_FILE),
+                        help="query_profiler profile to read (multi_thread_queries.py --profile-queries)")
+    parser.add_argument('--server-digests', action='store_true',
+                        help="also use performance_schema statement digests of this schema")
+    parser.add_argument('--output', help="write the full report as JSON")
+    parser.add_argument('--sql', help="write idempotent migration SQL, e.g. sql/07_index_advisor.sql")
+    parser.add_argument('--include-drops', action='store_true',
+                        help="emit DROP INDEX for redundant/unused indexes instead of commenting them out")
+    args = parser.parse_args()
+
+    workload = []
+    if os.path.exists(args.digests):
+        workload += load_profile_workload(args.digests)
+    elif not args.server_digests:
+        print(f"No profile at {args.digests}; run multi_thread_queries.py --profile-queries "
+              "--explain-top 5 or pass --server-digests")
+        raise SystemExit(1)
+
+    with get_pool(load_db_config(), size=1).connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        schema = fetch_schema(cursor)
+        usage = fetch_index_usage(cursor)
+        if args.server_digests:
+            workload += fetch_server_workload(cursor)
+        cursor.close()
+
+    report = analyze(workload, schema, usage)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if args.sql:
+        with open(args.sql, 'w') as f:
+            f.write(render_migration(report, args.include_drops))
+        print(f"Migration written to {args.sql}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import math
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram.
+
+    Bucket boundaries grow geometrically by `precision` (1% by default), so
+    percentiles are accurate to about that relative error while memory stays
+    bounded by the dynamic range rather than the number of samples. Histograms
+    from different workers or processes merge by adding bucket counts.
+    """
+
+    def __init__(self, precision=0.01):
+        self.precision = precision
+        self._log_base = math.log(1 + precision)
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def _bucket(self, seconds):
+        # Buckets are indexed in microseconds; everything under 1us lands in bucket 0
+        return int(math.log(max(seconds * 1e6, 1.0)) / self._log_base)
+
+    def _bucket_value(self, index):
+        # Geometric midpoint of the bucket, in seconds
+        return math.exp((index + 0.5) * self._log_base) / 1e6
+
+    def record(self, seconds):
+        index = self._bucket(seconds)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge histograms with different precision")
+        for index, n in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, p):
+        """Latency in seconds at percentile p (0-100)"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self):
+        """Count and latency percentiles in milliseconds"""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.mean() * 1000, 3),
+            'min_ms': round((self.min or 0.0) * 1000, 3),
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p95_ms': round(self.percentile(95) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3)
+        }
+
+    def to_dict(self):
+        return {
+            'precision': self.precision,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'buckets': {str(index): n for index, n in sorted(self.buckets.items())}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls(precision=data['precision'])
+        hist.buckets = {int(index): n for index, n in data['buckets'].items()}
+        hist.count = data['count']
+        hist.total = data['total']
+        hist.min = data['min']
+        hist.max = data['max']
+        return hist
@@ -0,0 +1,256 @@
+import json
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Cumulative SHOW GLOBAL STATUS counters: status name -> (family, help)
+STATUS_COUNTERS = {
+    'Queries': ('mysql_queries', "Statements executed by the server"),
+    'Slow_queries': ('mysql_slow_queries', "Statements slower than long_query_time"),
+    'Bytes_received': ('mysql_received_bytes', "Bytes received from all clients"),
+    'Bytes_sent': ('mysql_sent_bytes', "Bytes sent to all clients")
+}
+
+STATUS_GAUGES = {
+    'Threads_connected': ('mysql_threads_connected', "Currently open connections"),
+    'Uptime': ('mysql_uptime_seconds', "Seconds since the server started")
+}
+
+TABLE_GAUGES = {
+    'rows': ('mysql_table_rows', "Rows per table (exact or estimated, see rows_source)"),
+    'data_size': ('mysql_table_data_bytes', "Data size per table"),
+    'index_size': ('mysql_table_index_bytes', "Index size per table")
+}
+
+
+def _name(*parts):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', '_'.join(parts)).lower()
+
+
+def _number(value):
+    """int or float for numeric values (including numeric strings), else None"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+
+def metric_families(metrics):
+    """Flatten one monitor sample into {family: {'type', 'help', 'samples': [(labels, value)]}}"""
+    families = {}
+
+    def add(name, kind, help_text, value, labels=None):
+        value = _number(value)
+        if value is None:
+            return
+        family = families.setdefault(name, {'type': kind, 'help': help_text, 'samples': []})
+        family['samples'].append((labels or {}, value))
+
+    add('mysql_up', 'gauge', "1 if the last sample reached the server", 0 if 'error' in metrics else 1)
+    try:
+        sampled_at = datetime.fromisoformat(metrics['timestamp']).timestamp()
+        add('mysql_monitor_sample_timestamp_seconds', 'gauge', "When the last sample was taken", sampled_at)
+    except (KeyError, TypeError, ValueError):
+        pass
+
+    # The monitor's own cost, also for failed samples
+    timings = metrics.get('timings', {})
+    for phase, ms in timings.get('phases_ms', {}).items():
+        add('mysql_monitor_phase_seconds', 'gauge', "Time the last sample spent in each phase",
+            round(ms / 1000, 6), {'phase': phase})
+    for phase, summary in timings.get('histograms', {}).items():
+        add('mysql_monitor_phase_p95_seconds', 'gauge', "95th percentile time of each phase since start",
+            round(summary['p95_ms'] / 1000, 6), {'phase': phase})
+    if timings:
+        add('mysql_monitor_tick_overruns', 'counter', "Samples that took longer than the interval",
+            timings.get('overruns'))
+    if 'error' in metrics:
+        # Placeholder zeros would look like a counter reset to the scraper
+        return families
+
+    status = metrics.get('global_status', {})
+    for variable, (name, help_text) in STATUS_COUNTERS.items():
+        add(name, 'counter', help_text, status.get(variable))
+    for variable, (name, help_text) in STATUS_GAUGES.items():
+        add(name, 'gauge', help_text, status.get(variable))
+
+    rates = metrics.get('rates', {})
+    for key, value in rates.items():
+        if key.endswith('_per_sec'):
+            add(_name('mysql', key[:-len('_per_sec')], 'per_second'), 'gauge',
+                "Per-second rate over the last sample interval", value)
+    if rates:
+        add('mysql_rate_interval_seconds', 'gauge', "Length of the interval the rates cover",
+            rates.get('interval'))
+        add('mysql_counter_reset', 'gauge', "1 if counters were reset during the last interval",
+            rates.get('counter_reset'))
+
+    for state, count in metrics.get('processes', {}).items():
+        add('mysql_processlist_threads', 'gauge', "Threads per processlist state", count,
+            {'state': state or ''})
+
+    for table, info in metrics.get('tables', {}).items():
+        for key, (name, help_text) in TABLE_GAUGES.items():
+            add(name, 'gauge', help_text, info.get(key), {'table': table})
+
+    for key, value in metrics.get('pool', {}).items():
+        add(_name('mysql_monitor_pool', key), 'gauge', "Monitor connection pool statistic", value)
+
+    for group, values in metrics.get('collectors', {}).items():
+        for key, value in values.items():
+            if key == 'top':
+                # statement_digests: one labelled series per digest
+                for entry in value:
+                    labels = {'digest': entry.get('digest') or '', 'schema': entry.get('schema_name') or ''}
+                    for field, number in entry.items():
+                        if field not in ('digest', 'schema_name', 'query'):
+                            add(_name('mysql', group, field), 'gauge',
+                                f"{field} of the top statements by latency", number, labels)
+            else:
+                add(_name('mysql', group, key), 'gauge', f"{group} {key}", value)
+    return families
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_openmetrics(families):
+    lines = []
+    for name, family in families.items():
+        lines.append(f"# TYPE {name} {family['type']}")
+        lines.append(f"# HELP {name} {_escape(family['help'])}")
+        sample_name = f"{name}_total" if family['type'] == 'counter' else name
+        for labels, value in family['samples']:
+            label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f"{sample_name}{{{label_text}}} {value}" if label_text else f"{sample_name} {value}")
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """In-process HTTP endpoint serving the latest sample at /metrics in OpenMetrics format.
+
+    update() renders the sample once. Scrapes then only copy bytes from
+    memory, so they are fast however often they come and never touch the
+    metrics files or the database. Port 0 picks a free port (see .port).
+    """
+
+    def __init__(self, host='127.0.0.1', port=9104):
+        self._body = b'# EOF\n'
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                with server._lock:
+                    body = server._body
+                self.send_response(200)
+                self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the monitor's output
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.host, self.port = self.httpd.server_address[:2]
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def update(self, metrics):
+        body = render_openmetrics(metric_families(metrics)).encode('utf-8')
+        with self._lock:
+            self._body = body
+
+    def close(self):
+        if self._thread is not None:
+            self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class OtlpPusher:
+    """Pushes each sample to an OTLP/HTTP collector (e.g. SigNoz on port 4318) as JSON.
+
+    Uses the JSON encoding of the OTLP protocol, so no OpenTelemetry SDK is
+    needed. A failed push is reported and dropped. The next sample carries
+    the current totals anyway.
+    """
+
+    def __init__(self, endpoint, headers=None, timeout=2, service_name='mysql-monitor'):
+        endpoint = endpoint.rstrip('/')
+        self.url = endpoint if endpoint.endswith('/v1/metrics') else endpoint + '/v1/metrics'
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.service_name = service_name
+        self.started_ns = time.time_ns()
+
+    def payload(self, metrics):
+        now_ns = time.time_ns()
+        uptime = _number(metrics.get('global_status', {}).get('Uptime'))
+        # Cumulative sums count from the server start when it is known
+        start_ns = now_ns - int(uptime * 1e9) if uptime else self.started_ns
+
+        otlp_metrics = []
+        for name, family in metric_families(metrics).items():
+            points = []
+            for labels, value in family['samples']:
+                point = {'timeUnixNano': str(now_ns),
+                         'attributes': [{'key': key, 'value': {'stringValue': str(val)}}
+                                        for key, val in labels.items()]}
+                if isinstance(value, int):
+                    point['asInt'] = str(value)
+                else:
+                    point['asDouble'] = value
+                if family['type'] == 'counter':
+                    point['startTimeUnixNano'] = str(start_ns)
+                points.append(point)
+            metric = {'name': name, 'description': family['help']}
+            if family['type'] == 'counter':
+                metric['sum'] = {'dataPoints': points, 'aggregationTemporality': 2, 'isMonotonic': True}
+            else:
+                metric['gauge'] = {'dataPoints': points}
+            otlp_metrics.append(metric)
+
+        return {'resourceMetrics': [{
+            'resource': {'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': self.service_name}},
+                {'key': 'mysql.target', 'value': {'stringValue': str(metrics.get('target', ''))}}
+            ]},
+            'scopeMetrics': [{'scope': {'name': 'monitor_mysql'}, 'metrics': otlp_metrics}]
+        }]}
+
+    def update(self, metrics):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(self.payload(metrics)).encode('utf-8'),
+            headers=dict(self.headers, **{'Content-Type': 'application/json'}), method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except (urllib.error.URLError, OSError) as e:
+            print(f"OTLP push to {self.url} failed: {e}")
+
+    def close(self):
+        pass
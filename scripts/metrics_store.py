@@ -0,0 +1,455 @@
+import glob
+import gzip
+import io
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd compression of closed segments
+    zstandard = None
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Optional: inotify/FSEvents/kqueue change notification
+    Observer = None
+
+FILE_PREFIX = 'mysql_metrics_'
+STORE_BACKENDS = ('json', 'jsonl', 'columnar')
+COMPRESSION_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def _phase(timer, name):
+    """timer.phase(name) of a phase_timer.PhaseTimer, or a no-op without one"""
+    return timer.phase(name) if timer is not None else nullcontext()
+
+
+def _new_file_path(directory, extension):
+    """Timestamped file name that sorts in write order, alongside legacy files"""
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(directory, f"{FILE_PREFIX}{stamp}{extension}")
+    n = 1
+    while glob.glob(path + '*'):
+        path = os.path.join(directory, f"{FILE_PREFIX}{stamp}_{n}{extension}")
+        n += 1
+    return path
+
+
+class JsonFileStore:
+    """Original layout: one pretty-printed JSON file per sample"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, metrics, timer=None):
+        with _phase(timer, 'serialize'):
+            text = json.dumps(metrics, indent=2)
+        with _phase(timer, 'write'):
+            with open(_new_file_path(self.directory, '.json'), 'w') as f:
+                f.write(text)
+
+    def close(self):
+        pass
+
+
+class SegmentedLogStore:
+    """Append-only JSON Lines segments.
+
+    One compact JSON record per line, flushed after every append. The active
+    segment is rotated once it grows past `max_segment_bytes` or gets older
+    than `max_segment_age` seconds. Closed segments are compressed with gzip
+    or zstd when `compression` is set. A torn last line after a crash is
+    skipped by the reader.
+    """
+
+    def __init__(self, directory, max_segment_bytes=64 * 1024 * 1024,
+                 max_segment_age=24 * 3600, compression=None):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"compression must be one of {list(COMPRESSION_SUFFIXES)}")
+        if compression == 'zstd' and zstandard is None:
+            raise RuntimeError("zstd compression requires the zstandard package")
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.compression = compression
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_segment(self):
+        self._path = _new_file_path(self.directory, '.jsonl')
+        self._file = open(self._path, 'a', encoding='utf-8')
+        self._opened_at = time.time()
+
+    def _should_rotate(self):
+        return (self._file.tell() >= self.max_segment_bytes
+                or time.time() - self._opened_at >= self.max_segment_age)
+
+    def rotate(self):
+        """Close the active segment (compressing it if configured)"""
+        if self._file is None:
+            return
+        self._file.close()
+        path, self._file, self._path = self._path, None, None
+        if self.compression:
+            compress_segment(path, self.compression)
+
+    def append(self, metrics, timer=None):
+        with _phase(timer, 'serialize'):
+            line = json.dumps(metrics, separators=(',', ':')) + '\n'
+        with _phase(timer, 'write'):
+            if self._file is not None and self._should_rotate():
+                self.rotate()
+            if self._file is None:
+                self._open_segment()
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        self.rotate()
+
+
+def compress_segment(path, compression):
+    """Compress a closed .jsonl segment in place of the original.
+
+    The archive is written under a temporary name and renamed into place, so
+    readers never see a half-written one; until the segment is removed they
+    see both files, which MetricsReader.files() collapses into one.
+    """
+    target = path + COMPRESSION_SUFFIXES[compression]
+    tmp = target + '.tmp'
+    with open(path, 'rb') as src:
+        if compression == 'gzip':
+            with gzip.open(tmp, 'wb') as dst:
+                dst.writelines(src)
+        else:
+            with open(tmp, 'wb') as dst:
+                zstandard.ZstdCompressor().copy_stream(src, dst)
+    os.replace(tmp, target)
+    os.remove(path)
+    return target
+
+
+def _flatten(value, prefix=''):
+    flat = {}
+    for key, item in value.items():
+        name = f"{prefix}{key}"
+        if isinstance(item, dict) and item:
+            flat.update(_flatten(item, name + '.'))
+        elif isinstance(item, (dict, list)):
+            flat[name] = json.dumps(item)
+        else:
+            flat[name] = item
+    return flat
+
+
+def _unflatten(row):
+    nested = {}
+    for name, item in row.items():
+        if item is None or (isinstance(item, float) and item != item):
+            continue  # Column absent in this sample
+        if isinstance(item, str) and item[:1] in '[{':
+            try:
+                item = json.loads(item)
+            except ValueError:
+                pass
+        parts = name.split('.')
+        node = nested
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = item
+    return nested
+
+
+class ColumnarStore:
+    """Parquet part files for long retention (requires pandas and pyarrow).
+
+    Samples are buffered and written as one part file per `flush_every`
+    samples. Nested keys are flattened into dotted column names. Anything
+    still buffered when the process dies is lost, so keep `flush_every`
+    small relative to how much history you can afford to miss.
+    """
+
+    def __init__(self, directory, flush_every=120):
+        import pandas  # noqa: F401  fail early if the optional dependency is missing
+        self.directory = directory
+        self.flush_every = flush_every
+        self._buffer = []
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, metrics, timer=None):
+        with _phase(timer, 'serialize'):
+            self._buffer.append(_flatten(metrics))
+        if len(self._buffer) >= self.flush_every:
+            with _phase(timer, 'write'):
+                self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        import pandas as pd
+        frame = pd.DataFrame(self._buffer)
+        # Status values arrive as strings; keep the column types stable across parts
+        frame = frame.astype({c: 'string' for c in frame.columns if frame[c].dtype == object})
+        frame.to_parquet(_new_file_path(self.directory, '.parquet'), index=False)
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+
+
+def open_store(directory, backend='jsonl', **options):
+    """Create the storage backend used by MySQLMonitor.log_metrics"""
+    if backend == 'json':
+        return JsonFileStore(directory)
+    if backend == 'jsonl':
+        return SegmentedLogStore(directory, **options)
+    if backend == 'columnar':
+        return ColumnarStore(directory, **options)
+    raise ValueError(f"Unknown metrics store '{backend}', expected one of {STORE_BACKENDS}")
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"Cannot read {path}: the zstandard package is not installed")
+        raw = open(path, 'rb')
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True),
+                                encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+class MetricsReader:
+    """Reads samples from a metrics directory whatever backend wrote them.
+
+    Legacy per-sample JSON files, JSON Lines segments (plain, gzip or zstd)
+    and parquet parts can be mixed in one directory. Files are visited in
+    name order, which is creation order.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def files(self):
+        paths = glob.glob(os.path.join(self.directory, f"{FILE_PREFIX}*"))
+        by_stem = {}
+        for path in sorted(p for p in paths if self._kind(p)):
+            # A segment and its archive coexist briefly while it is compressed; the
+            # archive is complete once it has its final name, and outlives the segment
+            stem = self._stem(path)
+            if stem not in by_stem or by_stem[stem].endswith('.jsonl'):
+                by_stem[stem] = path
+        return [by_stem[stem] for stem in sorted(by_stem)]
+
+    @staticmethod
+    def _stem(path):
+        """File name without its compression suffix; stable across segment rotation"""
+        name = os.path.basename(path)
+        for suffix in ('.gz', '.zst'):
+            if name.endswith(suffix):
+                return name[:-len(suffix)]
+        return name
+
+    @staticmethod
+    def _kind(path):
+        if path.endswith('.json'):
+            return 'json'
+        if path.endswith(('.jsonl', '.jsonl.gz', '.jsonl.zst')):
+            return 'jsonl'
+        if path.endswith('.parquet'):
+            return 'columnar'
+        return None
+
+    def read_file(self, path):
+        """Yield every sample stored in one file"""
+        kind = self._kind(path)
+        try:
+            if kind == 'json':
+                with open(path) as f:
+                    yield json.load(f)
+            elif kind == 'jsonl':
+                with _open_text(path) as f:
+                    for line in f:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue  # Torn write at the end of a crashed segment
+            elif kind == 'columnar':
+                import pandas as pd
+                frame = pd.read_parquet(path).astype(object)
+                for row in frame.where(frame.notna(), None).to_dict('records'):
+                    yield _unflatten(row)
+        except (OSError, ValueError, EOFError) as e:
+            print(f"Error loading {path}: {str(e)}")
+
+    def read(self):
+        """Yield every stored sample"""
+        for path in self.files():
+            yield from self.read_file(path)
+
+    def latest(self):
+        """Most recent sample, reading only the newest file"""
+        files = self.files()
+        if not files:
+            return None
+        latest = None
+        for latest in self.read_file(files[-1]):
+            pass
+        return latest
+
+    def follow(self, cursor=None):
+        """Yield (sample, cursor) for every sample stored after `cursor`.
+
+        A cursor is a small JSON-serializable dict naming the file (by its
+        stem, so it survives compression of a rotated segment), how many
+        records of that file were consumed and, for a plain segment, the byte
+        offset to seek to. Persisting the cursor yielded with each sample
+        gives exactly-once processing across restarts. A line still being
+        written, or a JSON file that does not parse yet because it is the
+        newest one, is left for the next call.
+        """
+        files = self.files()
+        for path in files:
+            stem = self._stem(path)
+            if cursor and stem < cursor['file']:
+                continue
+            same_file = bool(cursor) and stem == cursor['file']
+            records = cursor['records'] if same_file else 0
+            is_newest = path == files[-1]
+
+            if path.endswith('.jsonl'):
+                offset = cursor.get('offset') if same_file else None
+                if not (yield from self._follow_segment(path, stem, records, offset)):
+                    # Rotated and compressed since the file list was taken. Going on to
+                    # newer files would skip its tail; the next call reads the archive
+                    return
+                continue
+
+            if self._kind(path) == 'json':
+                if records:
+                    continue
+                try:
+                    with open(path) as f:
+                        sample = json.load(f)
+                except ValueError as e:
+                    if is_newest:
+                        return  # Probably still being written; retry on the next call
+                    print(f"Error loading {path}: {str(e)}")
+                    continue
+                except OSError as e:
+                    print(f"Error loading {path}: {str(e)}")
+                    continue
+                yield sample, {'file': stem, 'records': 1}
+                continue
+
+            # Compressed segments and parquet parts are immutable: skip what was consumed
+            for index, sample in enumerate(self._records(path)):
+                if index < records:
+                    continue
+                if sample is not None:
+                    yield sample, {'file': stem, 'records': index + 1}
+
+    def _records(self, path):
+        """Every record of an immutable file, None for lines that do not parse"""
+        if self._kind(path) == 'columnar':
+            yield from self.read_file(path)
+            return
+        try:
+            with _open_text(path) as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield None
+        except (OSError, EOFError) as e:
+            # EOFError: truncated gzip stream
+            print(f"Error loading {path}: {str(e)}")
+
+    def _follow_segment(self, path, stem, records, offset):
+        """Yield the new samples of a plain segment; returns False if it no longer exists"""
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return False
+        with f:
+            if offset is not None:
+                f.seek(offset)
+            else:
+                for _ in range(records):
+                    f.readline()
+            while True:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    return True  # End of file or a line the writer has not finished
+                records += 1
+                try:
+                    sample = json.loads(line)
+                except ValueError:
+                    continue
+                yield sample, {'file': stem, 'records': records, 'offset': f.tell()}
+
+    def end_cursor(self):
+        """Cursor positioned after everything stored so far"""
+        files = self.files()
+        if not files:
+            return None
+        path = files[-1]
+        if path.endswith('.jsonl'):
+            with open(path, 'rb') as f:
+                data = f.read()
+            complete = data[:data.rfind(b'\n') + 1]
+            return {'file': self._stem(path), 'records': complete.count(b'\n'),
+                    'offset': len(complete)}
+        return {'file': self._stem(path), 'records': sum(1 for _ in self._records(path))}
+
+
+class ChangeNotifier:
+    """Wakes a tail-follower when new metrics are written.
+
+    Uses watchdog (inotify on Linux) when it is installed; otherwise wait()
+    simply sleeps, turning the caller into a poller.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._event = threading.Event()
+        self._observer = None
+        if Observer is not None:
+            handler = FileSystemEventHandler()
+            handler.on_any_event = self._on_event
+            self._observer = Observer()
+            self._observer.schedule(handler, directory, recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+
+    @property
+    def native(self):
+        return self._observer is not None
+
+    def _on_event(self, event):
+        # Ignore alert logs, cursors and other files sharing the directory
+        if os.path.basename(event.src_path).startswith(FILE_PREFIX):
+            self._event.set()
+
+    def wait(self, timeout):
+        """Block until a metrics file changes or `timeout` seconds pass"""
+        if self._observer is None:
+            time.sleep(timeout)
+            return False
+        changed = self._event.wait(timeout)
+        self._event.clear()
+        return changed
+
+    def close(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
@@ -0,0 +1,439 @@
+import argparse
+import csv
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import mysql.connector
+from bulk_insert import BulkInserter, load_db_config
+from db_pool import get_pool
+
+MIGRATIONS_DIR = 'sql'
+MIGRATIONS_TABLE = 'schema_migrations'
+
+CREATE_MIGRATIONS_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+        name VARCHAR(255) PRIMARY KEY,
+        checksum CHAR(64) NOT NULL,
+        applied_at DATETIME NOT NULL,
+        duration_ms INT NOT NULL
+    )
+"""
+
+RECORD_MIGRATION = f"""
+    INSERT INTO {MIGRATIONS_TABLE} (name, checksum, applied_at, duration_ms)
+    VALUES (%s, %s, NOW(), %s)
+    ON DUPLICATE KEY UPDATE checksum = VALUES(checksum), applied_at = NOW(), duration_ms = VALUES(duration_ms)
+"""
+
+# Held for the whole run so two runners never apply the same scripts at once
+LOCK_NAME = 'project_db.schema_migrations'
+
+_DEPENDS = re.compile(r"^(?:--|#)\s*depends:\s*(.*)$", re.I)
+_TABLE = re.compile(r"^#\s*table:\s*(\w+)\s*$", re.I)
+
+
+class Migration:
+    """One file in sql/: a .sql script or a .csv seed loaded with BulkInserter.
+
+    Dependencies come from `-- depends: a, b` lines in the leading comment
+    block (`# depends:` for CSV), naming other migrations without their
+    extension. An empty list means none. A file without the header depends
+    on the migration before it, so plain numbered scripts keep running in
+    order.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.name, extension = os.path.splitext(self.filename)
+        self.kind = extension.lstrip('.').lower()
+        self.depends = None
+        self.table = 'ClimateData'
+        self.checksum = self._checksum()
+        self._read_header()
+
+    def _checksum(self):
+        digest = hashlib.sha256()
+        with open(self.path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                # Line endings differ between checkouts; the content does not
+                digest.update(block.replace(b'\r\n', b'\n'))
+        return digest.hexdigest()
+
+    def _read_header(self):
+        with open(self.path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if not line.startswith(('--', '#')):
+                    break
+                depends = _DEPENDS.match(line)
+                if depends:
+                    self.depends = [name.strip() for name in depends.group(1).split(',') if name.strip()]
+                table = _TABLE.match(line)
+                if table:
+                    self.table = table.group(1)
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """Migrations in name order with their dependencies resolved"""
+    migrations = [Migration(os.path.join(directory, filename))
+                  for filename in sorted(os.listdir(directory))
+                  if filename.lower().endswith(('.sql', '.csv'))]
+    names = {m.name for m in migrations}
+    previous = None
+    for migration in migrations:
+        if migration.depends is None:
+            migration.depends = [previous] if previous else []
+        unknown = [name for name in migration.depends if name not in names]
+        if unknown:
+            raise ValueError(f"{migration.filename} depends on unknown migrations: {', '.join(unknown)}")
+        previous = migration.name
+    return migrations
+
+
+def select_targets(migrations, targets):
+    """The requested migrations plus everything they depend on.
+
+    A target is matched against the full name first, then against the
+    number before the first underscore (03 is 03_seed_data.sql even next to
+    03b_more_seed.csv), and only then as a prefix, which must be unique.
+    """
+    by_name = {m.name: m for m in migrations}
+    wanted = set()
+
+    def add(name):
+        if name not in wanted:
+            wanted.add(name)
+            for dependency in by_name[name].depends:
+                add(dependency)
+
+    for target in targets:
+        matches = [m.name for m in migrations if m.name == target]
+        if not matches:
+            matches = [m.name for m in migrations if m.name.startswith(target + '_')]
+        if not matches:
+            matches = [m.name for m in migrations if m.name.startswith(target)]
+        if len(matches) != 1:
+            raise ValueError(f"Migration '{target}' matches {len(matches)} files")
+        add(matches[0])
+    return [m for m in migrations if m.name in wanted]
+
+
+def split_statements(lines):
+    """Yield SQL statements from an iterable of lines, one at a time.
+
+    Understands the mysql client's DELIMITER command (for triggers and
+    procedures), quoted strings and comments. Only the current statement is
+    held in memory, so multi-gigabyte seed scripts stream through.
+    """
+    delimiter = ';'
+    buffer = []
+    quote = None
+    block_comment = False
+
+    for line in lines:
+        if not quote and not block_comment and not ''.join(buffer).strip():
+            command = line.strip()
+            if command.upper().startswith('DELIMITER '):
+                delimiter = command.split(None, 1)[1]
+                buffer = []
+                continue
+
+        i = 0
+        length = len(line)
+        start = 0
+        while i < length:
+            char = line[i]
+            if block_comment:
+                if line.startswith('*/', i):
+                    block_comment = False
+                    i += 1
+            elif quote:
+                if char == '\\' and quote != '`':
+                    i += 1
+                elif char == quote:
+                    quote = None
+            elif char in ("'", '"', '`'):
+                quote = char
+            elif line.startswith('/*', i):
+                block_comment = True
+                i += 1
+            elif line.startswith('--', i) and (i + 2 >= length or line[i + 2].isspace()) or char == '#':
+                # Line comments are dropped, so a DELIMITER after a comment is still recognised
+                buffer.append(line[start:i] + '\n')
+                start = length
+                break
+            elif line.startswith(delimiter, i):
+                buffer.append(line[start:i])
+                statement = ''.join(buffer).strip()
+                if statement:
+                    yield statement
+                buffer = []
+                i += len(delimiter)
+                start = i
+                continue
+            i += 1
+        buffer.append(line[start:])
+
+    statement = ''.join(buffer).strip()
+    if statement:
+        yield statement
+
+
+class MigrationRunner:
+    """Applies pending migrations on pooled connections, independent ones in parallel"""
+
+    def __init__(self, config, workers=4, commit_every=100, batch_size=5000, rerun_changed=False):
+        self.config = dict(config)
+        self.workers = workers
+        self.commit_every = commit_every
+        self.batch_size = batch_size
+        self.rerun_changed = rerun_changed
+        self.pool = None
+        self._print_lock = threading.Lock()
+
+    def _log(self, message):
+        with self._print_lock:
+            print(message, flush=True)
+
+    def connect(self):
+        """Create the database if needed, then the pool and the tracking table"""
+        server_config = {key: value for key, value in self.config.items() if key != 'database'}
+        conn = mysql.connector.connect(**server_config)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{self.config['database']}`")
+            cursor.close()
+        finally:
+            conn.close()
+
+        # One extra connection holds the run lock
+        self.pool = get_pool(self.config, size=self.workers + 1)
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(CREATE_MIGRATIONS_TABLE)
+            cursor.close()
+
+    def applied(self):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"SELECT name, checksum, applied_at FROM {MIGRATIONS_TABLE}")
+            rows = {row['name']: row for row in cursor.fetchall()}
+            cursor.close()
+        return rows
+
+    def plan(self, migrations):
+        """Split migrations into (pending, changed); changed ones are pending only with rerun_changed"""
+        applied = self.applied()
+        pending, changed = [], []
+        for migration in migrations:
+            row = applied.get(migration.name)
+            if row is None:
+                pending.append(migration)
+            elif row['checksum'] != migration.checksum:
+                changed.append(migration)
+                if self.rerun_changed:
+                    pending.append(migration)
+        return pending, changed
+
+    def run(self, migrations, dry_run=False):
+        """Apply pending migrations; returns {name: seconds} of the ones applied"""
+        pending, changed = self.plan(migrations)
+        if changed and not self.rerun_changed:
+            for migration in changed:
+                self._log(f"Checksum mismatch: {migration.filename} changed after it was applied")
+            raise RuntimeError("Applied migrations were modified; pass --rerun-changed to apply them again")
+        if not pending:
+            self._log("Schema is up to date")
+            return {}
+
+        pending_names = {m.name for m in pending}
+        if dry_run:
+            for wave in waves(pending):
+                self._log("Would apply in parallel: " + ', '.join(m.filename for m in wave))
+            return {}
+
+        with self.pool.connection() as lock_conn:
+            cursor = lock_conn.cursor()
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (LOCK_NAME,))
+            if cursor.fetchall()[0][0] != 1:
+                cursor.close()
+                raise RuntimeError("Another migration run holds the lock")
+            try:
+                return self._apply_all(pending, pending_names)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+                cursor.fetchall()
+                cursor.close()
+
+    def _apply_all(self, pending, pending_names):
+        done = {}
+        failed = []
+        remaining = list(pending)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while remaining or running:
+                if not failed:
+                    for migration in list(remaining):
+                        # Dependencies applied in an earlier run are not pending any more
+                        if all(d in done or d not in pending_names for d in migration.depends):
+                            remaining.remove(migration)
+                            running[executor.submit(self.apply, migration)] = migration
+                elif not running:
+                    break
+                if not running:
+                    blocked = ', '.join(m.filename for m in remaining)
+                    raise RuntimeError(f"Unresolvable dependencies: {blocked}")
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    migration = running.pop(future)
+                    try:
+                        done[migration.name] = future.result()
+                    except Exception as e:
+                        self._log(f"FAILED {migration.filename}: {e}")
+                        failed.append(migration)
+
+        if failed:
+            raise RuntimeError(f"{', '.join(m.filename for m in failed)} failed; "
+                               f"{len(done)} applied, {len(remaining)} not attempted")
+        return done
+
+    def apply(self, migration):
+        self._log(f"Applying {migration.filename}")
+        start = time.perf_counter()
+        if migration.kind == 'csv':
+            detail = self._load_csv(migration)
+        else:
+            detail = self._execute_script(migration)
+        elapsed = time.perf_counter() - start
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(RECORD_MIGRATION, (migration.name, migration.checksum, int(elapsed * 1000)))
+            conn.commit()
+            cursor.close()
+        self._log(f"Applied {migration.filename} in {elapsed:.2f}s ({detail})")
+        return elapsed
+
+    def _execute_script(self, migration):
+        statements = 0
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                with open(migration.path) as f:
+                    for statement in split_statements(f):
+                        cursor.execute(statement)
+                        if cursor.with_rows:
+                            cursor.fetchall()
+                        statements += 1
+                        # Large seed scripts commit in batches instead of one huge transaction
+                        if statements % self.commit_every == 0:
+                            conn.commit()
+                conn.commit()
+            except Exception:
+                try:
+                    conn.rollback()
+                except mysql.connector.Error:
+                    pass
+                raise
+            finally:
+                cursor.close()
+        return f"{statements} statements"
+
+    def _load_csv(self, migration):
+        with open(migration.path, newline='') as f:
+            reader = csv.reader(_csv_data(f))
+            columns = next(reader)
+            inserter = BulkInserter(self.pool, table=migration.table, columns=columns,
+                                    batch_size=self.batch_size)
+            stats = inserter.insert(reader)
+        return f"{stats['rows']:,} rows into {migration.table}, {stats['rows_per_sec']:,} rows/s"
+
+
+def _csv_data(lines):
+    """The lines of a CSV seed from its column header on.
+
+    Only the comment block above the header is skipped; a data row that
+    happens to start with '#' is loaded like any other.
+    """
+    lines = iter(lines)
+    for line in lines:
+        if line.strip() and not line.startswith('#'):
+            yield line
+            break
+    yield from lines
+
+
+def waves(migrations):
+    """Group migrations into rounds whose members can run at the same time"""
+    names = {m.name for m in migrations}
+    done = set()
+    remaining = list(migrations)
+    rounds = []
+    while remaining:
+        ready = [m for m in remaining if all(d in done or d not in names for d in m.depends)]
+        if not ready:
+            raise ValueError("Dependency cycle between: " + ', '.join(m.filename for m in remaining))
+        rounds.append(ready)
+        done.update(m.name for m in ready)
+        remaining = [m for m in remaining if m not in ready]
+    return rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending sql/ migrations")
+    parser.add_argument('targets', nargs='*',
+                        help="only these migrations (name or prefix, e.g. 03) and their dependencies")
+    parser.add_argument('--dir', default=MIGRATIONS_DIR)
+    parser.add_argument('--workers', type=int, default=4, help="migrations applied at the same time")
+    parser.add_argument('--commit-every', type=int, default=100, help="statements per transaction in scripts")
+    parser.add_argument('--batch-size', type=int, default=5000, help="rows per INSERT for CSV seeds")
+    parser.add_argument('--rerun-changed', action='store_true',
+                        help="re-apply scripts whose checksum changed since they were applied")
+    parser.add_argument('--status', action='store_true', help="list migrations and whether they are applied")
+    parser.add_argument('--dry-run', action='store_true', help="show what would run, in parallel rounds")
+    args = parser.parse_args()
+
+    try:
+        migrations = discover(args.dir)
+        if args.targets:
+            migrations = select_targets(migrations, args.targets)
+        waves(migrations)
+    except ValueError as e:
+        print(f"Invalid migrations: {e}")
+        raise SystemExit(1)
+
+    runner = MigrationRunner(load_db_config(), workers=args.workers, commit_every=args.commit_every,
+                             batch_size=args.batch_size, rerun_changed=args.rerun_changed)
+    start = time.perf_counter()
+    try:
+        runner.connect()
+        if args.status:
+            applied = runner.applied()
+            for migration in migrations:
+                row = applied.get(migration.name)
+                if row is None:
+                    state = "pending"
+                elif row['checksum'] != migration.checksum:
+                    state = f"changed since {row['applied_at']}"
+                else:
+                    state = f"applied {row['applied_at']}"
+                print(f"{migration.filename:45} {state}")
+            return
+        done = runner.run(migrations, dry_run=args.dry_run)
+    except (mysql.connector.Error, RuntimeError) as e:
+        print(f"Migration failed: {e}")
+        raise SystemExit(1)
+    if done:
+        print(f"Applied {len(done)} migrations in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
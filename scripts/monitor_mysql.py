@@ -1,134 +1,357 @@
 import mysql.connector
+import argparse
 import time
-import json
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from db_pool import get_pool
+from collectors import COLLECTORS, build_collectors
+from metrics_exporter import MetricsServer, OtlpPusher
+from metrics_store import open_store, STORE_BACKENDS
+from phase_timer import PhaseTimer, profiled
+
+TABLE_STATS_MODES = ('exact', 'catalog', 'incremental')
+
+GLOBAL_STATUS_QUERY = ("SHOW GLOBAL STATUS WHERE Variable_name IN "
+                       "('Queries', 'Slow_queries', 'Threads_connected', "
+                       "'Bytes_received', 'Bytes_sent', 'Uptime')")
+
+# Cumulative SHOW GLOBAL STATUS counters and the per-second rate stored for each
+COUNTER_RATES = {
+    'Queries': 'queries_per_sec',
+    'Slow_queries': 'slow_queries_per_sec',
+    'Bytes_received': 'bytes_received_per_sec',
+    'Bytes_sent': 'bytes_sent_per_sec'
+}
+
+PROCESSLIST_QUERY = ("SELECT COUNT(*) as count, state "
+                     "FROM information_schema.processlist "
+                     "GROUP BY state")
+
+# Sizes, estimated rows and the AUTO_INCREMENT key of every table in one round-trip
+TABLE_STATS_QUERY = """
+    SELECT
+        t.TABLE_NAME AS table_name,
+        t.TABLE_ROWS AS table_rows,
+        t.DATA_LENGTH AS data_size,
+        t.INDEX_LENGTH AS index_size,
+        c.COLUMN_NAME AS auto_increment_column
+    FROM information_schema.TABLES t
+    LEFT JOIN information_schema.COLUMNS c
+        ON c.TABLE_SCHEMA = t.TABLE_SCHEMA
+        AND c.TABLE_NAME = t.TABLE_NAME
+        AND c.EXTRA LIKE '%%auto_increment%%'
+    WHERE t.TABLE_SCHEMA = %s AND t.TABLE_TYPE = 'BASE TABLE'
+"""
+
+def new_metrics():
+    """Empty sample in the shape every consumer of monitoring_logs expects"""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'global_status': {},
+        'processes': {},
+        'tables': {}
+    }
+
+def error_metrics(error):
+    """Placeholder sample recorded when the server could not be sampled at all"""
+    metrics = new_metrics()
+    metrics['global_status'] = {
+        'Queries': '0',
+        'Slow_queries': '0',
+        'Threads_connected': '0',
+        'Bytes_received': '0',
+        'Bytes_sent': '0',
+        'Uptime': '0'
+    }
+    metrics['error'] = error
+    return metrics
+
+def _status_number(status, name):
+    try:
+        return int(status[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def counter_rates(previous, current):
+    """Per-second rates of COUNTER_RATES between two samples, or None if they cannot be compared.
+
+    When the server restarted (Uptime went backwards) or a counter went
+    backwards (FLUSH STATUS), the counters restarted from zero. The rate is
+    then the new value over the time since the reset, not a negative delta.
+    """
+    try:
+        elapsed = (datetime.fromisoformat(current['timestamp'])
+                   - datetime.fromisoformat(previous['timestamp'])).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        return None
+    if elapsed <= 0:
+        return None
+
+    before, after = previous['global_status'], current['global_status']
+    uptime_before = _status_number(before, 'Uptime')
+    uptime_after = _status_number(after, 'Uptime')
+    restarted = (uptime_before is not None and uptime_after is not None
+                 and uptime_after < uptime_before)
+
+    rates = {'interval': round(elapsed, 3), 'counter_reset': restarted}
+    for counter, rate in COUNTER_RATES.items():
+        old = _status_number(before, counter)
+        new = _status_number(after, counter)
+        if new is None or (old is None and not restarted):
+            continue
+        if restarted or new < old:
+            rates['counter_reset'] = True
+            since = min(elapsed, uptime_after) if restarted and uptime_after else elapsed
+            rates[rate] = round(new / since, 3)
+        else:
+            rates[rate] = round((new - old) / elapsed, 3)
+    return rates
+
+def table_metrics_from_catalog(row):
+    """Table entry built from one TABLE_STATS_QUERY row (estimated row count)"""
+    return {
+        'rows': int(row['table_rows'] or 0),
+        'rows_source': 'estimate',
+        'data_size': int(row['data_size'] or 0),
+        'index_size': int(row['index_size'] or 0)
+    }
 
 class MySQLMonitor:
-    def __init__(self):
-        load_dotenv('.secrets')  # Load credentials from .secrets file
-        self.config = {
-            'host': os.getenv('MYSQL_HOST', 'localhost'),
-            'user': os.getenv('MYSQL_USER', 'root'),
-            'password': os.getenv('MYSQL_PASSWORD', 'root'),
-            'database': os.getenv('MYSQL_DATABASE', 'project_db')
-        }
-        self.metrics_dir = 'monitoring_logs'
+    def __init__(self, pool_size=2, table_stats_mode='catalog', exact_count_interval=600,
+                 config=None, metrics_dir='monitoring_logs', store=None,
+                 collectors=None, time_budget=5.0, exporters=None):
+        """
+        config defaults to the MYSQL_* settings in .secrets. store is a
+        metrics_store backend; by default samples are appended to JSON Lines
+        segments in metrics_dir.
+
+        collectors names the extra metric groups from collectors.COLLECTORS
+        (InnoDB, temp tables, statement digests); None runs all of them and
+        [] none. They run on their own intervals in whatever remains of
+        `time_budget` seconds after the core status queries. The core queries
+        (status, processlist, table stats including exact recounts) always
+        run and are not cut short; their time counts against the budget, so
+        a slow core leaves less or nothing for the extra groups, but can still
+        make the sample as a whole take longer than `time_budget`.
+
+        exporters (e.g. metrics_exporter.MetricsServer, OtlpPusher) receive
+        every logged sample in addition to the store.
+
+        Every phase of a sample (pool checkout, each query, each collector
+        group, serialization, write, export) is timed by a PhaseTimer, and
+        its histograms are stored with the sample under metrics['timings'].
+
+        table_stats_mode controls how table row counts are gathered:
+        - 'exact': SELECT COUNT(*) on every table, every sample (full index scans)
+        - 'catalog': InnoDB row estimates from information_schema, with an exact
+          recount every `exact_count_interval` seconds (0 disables recounts)
+        - 'incremental': exact count once, then only rows above the cached
+          AUTO_INCREMENT high-water mark are counted; deletes are picked up
+          by the periodic recount
+        """
+        if table_stats_mode not in TABLE_STATS_MODES:
+            raise ValueError(f"table_stats_mode must be one of {TABLE_STATS_MODES}")
+        if config is None:
+            load_dotenv('.secrets')  # Load credentials from .secrets file
+            config = {
+                'host': os.getenv('MYSQL_HOST', 'localhost'),
+                'user': os.getenv('MYSQL_USER', 'root'),
+                'password': os.getenv('MYSQL_PASSWORD', 'root'),
+                'database': os.getenv('MYSQL_DATABASE', 'project_db')
+            }
+        self.config = config
+        self.metrics_dir = metrics_dir
         if not os.path.exists(self.metrics_dir):
             os.makedirs(self.metrics_dir)
+        self.store = store if store is not None else open_store(self.metrics_dir)
+        # Reuse connections across samples instead of a TCP + auth handshake every tick
+        self.pool = get_pool(self.config, size=pool_size)
+        self.table_stats_mode = table_stats_mode
+        self.exact_count_interval = exact_count_interval
+        self._last_exact_count = None
+        # table -> {'rows': exact count, 'high_water': max AUTO_INCREMENT value counted}
+        self._row_counts = {}
+        # Timestamp and global status of the last good sample, for counter rates
+        self._previous = None
+        self.time_budget = time_budget
+        self.collectors = build_collectors(collectors, time_budget=time_budget)
+        self.exporters = list(exporters or [])
+        self.timer = PhaseTimer()
 
     def connect(self):
+        """Check out a pooled connection; use as a context manager"""
+        return self.pool.connection()
+
+    def get_performance_metrics(self):
         try:
-            return mysql.connector.connect(**self.config)
+            checkout = time.perf_counter()
+            with self.connect() as conn:
+                self.timer.add('connect', time.perf_counter() - checkout)
+                return self.add_rates(self._collect_metrics(conn))
         except mysql.connector.Error as err:
-            raise Exception(f"Failed to connect to MySQL: {err}")
+            return error_metrics(f"Failed to connect to MySQL: {err}")
+        except Exception as e:
+            return error_metrics(str(e))
 
-    def get_performance_metrics(self):
+    def add_rates(self, metrics):
+        """Store per-second counter rates since the previous sample in metrics['rates'].
+
+        Failed samples are left alone, so the next good sample is compared
+        with the last good one and its rate covers the whole gap.
+        """
+        if 'error' in metrics or not metrics.get('global_status'):
+            return metrics
+        if self._previous is not None:
+            rates = counter_rates(self._previous, metrics)
+            if rates:
+                metrics['rates'] = rates
+        self._previous = {'timestamp': metrics['timestamp'],
+                          'global_status': metrics['global_status']}
+        return metrics
+
+    def _collect_metrics(self, conn):
+        deadline = time.perf_counter() + self.time_budget
+        cursor = conn.cursor(dictionary=True)
+
+        metrics = new_metrics()
+
+        # Get global status
         try:
-            conn = self.connect()
-            cursor = conn.cursor(dictionary=True)
-
-            metrics = {
-                'timestamp': datetime.now().isoformat(),
-                'global_status': {},
-                'processes': {},
-                'tables': {}
-            }
+            with self.timer.phase('global_status'):
+                cursor.execute(GLOBAL_STATUS_QUERY)
+                metrics['global_status'] = {row['Variable_name']: row['Value']
+                                            for row in cursor.fetchall()}
+        except Exception as e:
+            metrics['errors'] = metrics.get('errors', []) + [f"Global status error: {str(e)}"]
 
-            # Get global status
-            try:
-                cursor.execute("SHOW GLOBAL STATUS WHERE Variable_name IN "
-                             "('Queries', 'Slow_queries', 'Threads_connected', "
-                             "'Bytes_received', 'Bytes_sent')")
-                metrics['global_status'] = {row['Variable_name']: row['Value'] 
-                                          for row in cursor.fetchall()}
-            except Exception as e:
-                metrics['errors'] = metrics.get('errors', []) + [f"Global status error: {str(e)}"]
+        # Get process list
+        try:
+            with self.timer.phase('processlist'):
+                cursor.execute(PROCESSLIST_QUERY)
+                metrics['processes'] = {row['state']: row['count']
+                                        for row in cursor.fetchall()}
+        except Exception as e:
+            metrics['errors'] = metrics.get('errors', []) + [f"Process list error: {str(e)}"]
 
-            # Get process list
-            try:
-                cursor.execute("SELECT COUNT(*) as count, state "
-                             "FROM information_schema.processlist "
-                             "GROUP BY state")
-                metrics['processes'] = {row['state']: row['count'] 
-                                      for row in cursor.fetchall()}
-            except Exception as e:
-                metrics['errors'] = metrics.get('errors', []) + [f"Process list error: {str(e)}"]
+        # Get table metrics
+        try:
+            with self.timer.phase('table_stats'):
+                self._collect_table_metrics(cursor, metrics)
+        except Exception as e:
+            metrics['errors'] = metrics.get('errors', []) + [f"Table metrics error: {str(e)}"]
+
+        # Extra metric groups that are due, in the time left over
+        self.collectors.run(cursor, metrics, deadline, timer=self.timer)
+
+        cursor.close()
+        metrics['pool'] = self.pool.stats()
+
+        return metrics
+
+    def _collect_table_metrics(self, cursor, metrics):
+        """Fill metrics['tables'] from a single information_schema query"""
+        try:
+            # MySQL 8 caches TABLES statistics for a day by default; read them fresh
+            cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+        except mysql.connector.Error:
+            pass  # Older servers have no statistics cache
 
-            # Get table metrics
+        cursor.execute(TABLE_STATS_QUERY, (self.config['database'],))
+        tables = cursor.fetchall()
+
+        now = time.monotonic()
+        recount = self.table_stats_mode == 'exact' or (
+            self.exact_count_interval
+            and (self._last_exact_count is None
+                 or now - self._last_exact_count >= self.exact_count_interval)
+        )
+
+        for table in tables:
+            table_name = table['table_name']
+            key_column = table['auto_increment_column']
+            table_metrics = table_metrics_from_catalog(table)
             try:
-                # First, get list of tables in the database
-                cursor.execute("""
-                    SELECT TABLE_NAME 
-                    FROM information_schema.TABLES 
-                    WHERE TABLE_SCHEMA = %s
-                """, (self.config['database'],))
-                
-                tables = cursor.fetchall()
-                
-                for table in tables:
-                    table_name = table['TABLE_NAME']
-                    try:
-                        # Get row count
-                        cursor.execute(f"SELECT COUNT(*) as row_count FROM `{table_name}`")
-                        row_count = cursor.fetchone()['row_count']
-                        
-                        # Get data and index size
-                        cursor.execute("""
-                            SELECT 
-                                data_length as data_size,
-                                index_length as index_size
-                            FROM information_schema.TABLES
-                            WHERE table_schema = %s AND table_name = %s
-                        """, (self.config['database'], table_name))
-                        
-                        size_info = cursor.fetchone()
-                        
-                        metrics['tables'][table_name] = {
-                            'rows': row_count,
-                            'data_size': int(size_info['data_size'] or 0),
-                            'index_size': int(size_info['index_size'] or 0)
-                        }
-                    except Exception as e:
-                        metrics['errors'] = metrics.get('errors', []) + [
-                            f"Error getting metrics for table {table_name}: {str(e)}"
-                        ]
-                        
+                if recount or (self.table_stats_mode == 'incremental'
+                               and key_column and table_name not in self._row_counts):
+                    table_metrics['rows'] = self._count_rows(cursor, table_name, key_column)
+                    table_metrics['rows_source'] = 'exact'
+                elif self.table_stats_mode == 'incremental' and key_column:
+                    table_metrics['rows'] = self._count_new_rows(cursor, table_name, key_column)
+                    table_metrics['rows_source'] = 'incremental'
             except Exception as e:
-                metrics['errors'] = metrics.get('errors', []) + [f"Table metrics error: {str(e)}"]
+                metrics['errors'] = metrics.get('errors', []) + [
+                    f"Error getting metrics for table {table_name}: {str(e)}"
+                ]
+            metrics['tables'][table_name] = table_metrics
 
-            cursor.close()
-            conn.close()
+        if recount:
+            self._last_exact_count = now
 
-            return metrics
+    def _count_rows(self, cursor, table_name, key_column):
+        """Full COUNT(*), remembering the high-water mark for incremental counts"""
+        if not key_column:
+            cursor.execute(f"SELECT COUNT(*) AS row_count FROM `{table_name}`")
+            return cursor.fetchone()['row_count']
 
-        except Exception as e:
-            return {
-                'timestamp': datetime.now().isoformat(),
-                'global_status': {
-                    'Queries': '0',
-                    'Slow_queries': '0',
-                    'Threads_connected': '0',
-                    'Bytes_received': '0',
-                    'Bytes_sent': '0'
-                },
-                'processes': {},
-                'tables': {},
-                'error': str(e)
-            }
+        cursor.execute(f"SELECT COUNT(*) AS row_count, MAX(`{key_column}`) AS high_water "
+                       f"FROM `{table_name}`")
+        row = cursor.fetchone()
+        self._row_counts[table_name] = {
+            'rows': row['row_count'],
+            'high_water': row['high_water'] or 0
+        }
+        return row['row_count']
+
+    def _count_new_rows(self, cursor, table_name, key_column):
+        """Count only rows inserted above the cached high-water mark (a PK range scan)"""
+        cached = self._row_counts[table_name]
+        cursor.execute(f"SELECT COUNT(*) AS row_count, MAX(`{key_column}`) AS high_water "
+                       f"FROM `{table_name}` WHERE `{key_column}` > %s",
+                       (cached['high_water'],))
+        row = cursor.fetchone()
+        if row['row_count']:
+            cached['rows'] += row['row_count']
+            cached['high_water'] = row['high_water']
+        return cached['rows']
 
-    def log_metrics(self, metrics):
-        filename = os.path.join(self.metrics_dir, 
-                              f"mysql_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-        with open(filename, 'w') as f:
-            json.dump(metrics, f, indent=2)
+    def log_metrics(self, metrics, verbose=True):
+        # Written with the sample; this sample's own write is in the next one
+        metrics['timings'] = self.timer.snapshot()
+        self.store.append(metrics, timer=self.timer)
+        for exporter in self.exporters:
+            try:
+                with self.timer.phase(f"export:{type(exporter).__name__}"):
+                    exporter.update(metrics)
+            except Exception as e:
+                print(f"Exporter {type(exporter).__name__} error: {e}")
+
+        if not verbose:
+            return
             
         # Print debug information
         print("\nMetrics Summary:")
         print(f"- Global Status: {len(metrics.get('global_status', {}))} metrics")
+        if 'rates' in metrics:
+            rates = metrics['rates']
+            print(f"- Rates: {rates.get('queries_per_sec', 0):.1f} queries/s, "
+                  f"{rates.get('slow_queries_per_sec', 0):.2f} slow/s, "
+                  f"{rates.get('bytes_received_per_sec', 0):.0f} B/s in, "
+                  f"{rates.get('bytes_sent_per_sec', 0):.0f} B/s out"
+                  + (" (counter reset)" if rates['counter_reset'] else ""))
         print(f"- Processes: {len(metrics.get('processes', {}))} states")
         print(f"- Tables: {len(metrics.get('tables', {}))} tables")
+        if 'collection' in metrics:
+            collection = metrics['collection']
+            print(f"- Collectors: ran {', '.join(collection['ran']) or 'none'} "
+                  f"in {collection['elapsed_ms']:.0f} ms")
+            if collection['skipped']:
+                print(f"  * Skipped (time budget): {', '.join(collection['skipped'])}")
+        timings = metrics.get('timings')
+        if timings and timings['last_tick_ms'] is not None:
+            print(f"- Last tick: {timings['last_tick_ms']:.0f} ms"
+                  + (f" of a {timings['interval']:g}s interval" if timings['interval'] else "")
+                  + (f" ({timings['overruns']} overruns)" if timings['overruns'] else ""))
         if 'error' in metrics:
             print(f"- Error: {metrics['error']}")
         if 'errors' in metrics:
@@ -142,15 +365,85 @@ class MySQLMonitor:
         print(f"Starting MySQL monitoring (interval: {interval}s)")
         print(f"Logs will be saved in: {os.path.abspath(self.metrics_dir)}")
         
+        self.timer.interval = interval
         try:
             while True:
+                self.timer.begin()
                 metrics = self.get_performance_metrics()
                 self.log_metrics(metrics)
+                if self.timer.end() > interval:
+                    print(f"Warning: sample took {self.timer.last_tick_ms:.0f} ms, "
+                          f"longer than the {interval:g}s interval")
                 print(f"Metrics logged at: {metrics['timestamp']}")
                 time.sleep(interval)
         except KeyboardInterrupt:
             print("\nMonitoring stopped by user")
+        finally:
+            self.store.close()
+            for exporter in self.exporters:
+                exporter.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample MySQL performance metrics")
+    parser.add_argument('--interval', type=float, default=30)
+    parser.add_argument('--metrics-dir', default='monitoring_logs')
+    parser.add_argument('--table-stats', choices=TABLE_STATS_MODES, default='catalog')
+    parser.add_argument('--exact-count-interval', type=float, default=600)
+    parser.add_argument('--store', choices=STORE_BACKENDS, default='jsonl',
+                        help="json: one file per sample (legacy); jsonl: append-only segments; "
+                             "columnar: parquet parts for long retention")
+    parser.add_argument('--compression', choices=['gzip', 'zstd'],
+                        help="compress closed jsonl segments")
+    parser.add_argument('--segment-mb', type=float, default=64, help="rotate jsonl segments at this size")
+    parser.add_argument('--segment-hours', type=float, default=24, help="rotate jsonl segments at this age")
+    parser.add_argument('--collectors', default='all',
+                        help=f"comma-separated metric groups, 'all' or 'none' (available: {', '.join(COLLECTORS)})")
+    parser.add_argument('--time-budget', type=float, default=5.0,
+                        help="seconds per sample for the extra metric groups, counted from the start of the "
+                             "sample; the core status queries always run and can still exceed it")
+    parser.add_argument('--http-port', type=int,
+                        help="serve the latest sample at http://<http-host>:<port>/metrics (OpenMetrics)")
+    parser.add_argument('--http-host', default='127.0.0.1')
+    parser.add_argument('--otlp-endpoint',
+                        help="also push every sample to this OTLP/HTTP collector, e.g. http://localhost:4318")
+    parser.add_argument('--otlp-header', action='append', default=[],
+                        help="extra OTLP request header as name=value (repeatable)")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="run under cProfile and write a pstats file (for snakeviz/flameprof) on exit")
+    args = parser.parse_args()
+
+    exporters = []
+    if args.http_port is not None:
+        server = MetricsServer(args.http_host, args.http_port).start()
+        print(f"Serving metrics at http://{server.host}:{server.port}/metrics")
+        exporters.append(server)
+    if args.otlp_endpoint:
+        headers = dict(header.split('=', 1) for header in args.otlp_header)
+        exporters.append(OtlpPusher(args.otlp_endpoint, headers=headers))
+
+    collectors = None
+    if args.collectors == 'none':
+        collectors = []
+    elif args.collectors != 'all':
+        collectors = [name.strip() for name in args.collectors.split(',') if name.strip()]
+
+    options = {}
+    if args.store == 'jsonl':
+        options = {'compression': args.compression,
+                   'max_segment_bytes': int(args.segment_mb * 1024 * 1024),
+                   'max_segment_age': args.segment_hours * 3600}
+    monitor = MySQLMonitor(table_stats_mode=args.table_stats,
+                           exact_count_interval=args.exact_count_interval,
+                           metrics_dir=args.metrics_dir,
+                           store=open_store(args.metrics_dir, args.store, **options),
+                           collectors=collectors,
+                           time_budget=args.time_budget,
+                           exporters=exporters)
+    if args.profile:
+        with profiled(args.profile):
+            monitor.monitor(interval=args.interval)
+    else:
+        monitor.monitor(interval=args.interval)
 
 if __name__ == "__main__":
-    monitor = MySQLMonitor()
-    monitor.monitor(interval=30)  # Monitor every 30 seconds 
\ No newline at end of file
+    main() 
\ No newline at end of file
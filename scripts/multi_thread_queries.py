@@ -1,106 +1,622 @@
 import mysql.connector
+import argparse
+import json
+import multiprocessing
+import os
 import threading
 import time
 from datetime import datetime, timedelta
+from queue import Empty
 import random
+from db_pool import get_pool, BROKEN_CONNECTION_ERRORS
+from bulk_insert import BulkInserter, load_db_config
+from chunked_update import ChunkedUpdater, humidity_by_location, merge_chunk_stats, new_chunk_stats
+from latency import LatencyHistogram
+from query_profiler import DIGESTS_FILE, ProfiledConnection, QueryProfiler
+from result_cache import ResultCache, merge_cache_stats
 
-# Database configuration
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': 'root',
-    'database': 'project_db'
-}
+# Database configuration from .secrets (spawned worker processes read it again on import)
+DB_CONFIG = load_db_config()
+
+# One pooled connection per worker thread
+POOL_SIZE = 3
+
+# Seconds to wait for worker processes to import and reach the start barrier
+PROCESS_START_TIMEOUT = 60
+
+LOCATIONS = ['Toronto', 'Vancouver', 'Montreal', 'Calgary', 'Halifax']
+
+# Per-process cache for the aggregate in select_data; ClimateData changes invalidate it
+RESULT_CACHE = ResultCache(ttl=60)
+
+INSERT_QUERY = """
+INSERT INTO ClimateData (location, record_date, temperature, precipitation, humidity)
+VALUES (%s, %s, %s, %s, %s)
+"""
+
+SELECT_QUERY = """
+SELECT location, AVG(temperature) as avg_temp, AVG(humidity) as avg_humidity
+FROM ClimateData
+WHERE temperature > 20
+GROUP BY location
+"""
+
+UPDATE_QUERY = """
+UPDATE ClimateData
+SET humidity = %s
+WHERE location = %s
+"""
+
+def get_connection():
+    """Check out a connection from the shared pool; use as a context manager"""
+    return get_pool(DB_CONFIG, size=POOL_SIZE).connection()
+
+def generate_readings(count, locations=LOCATIONS):
+    """Yield random climate readings for today"""
+    today = datetime.now().date()
+    for _ in range(count):
+        location = random.choice(locations)
+        temperature = round(random.uniform(10, 25), 1)
+        precipitation = round(random.uniform(0, 5), 1)
+        humidity = round(random.uniform(40, 80), 1)
+        yield (location, today, temperature, precipitation, humidity)
 
 def insert_data():
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        
-        locations = ['Toronto', 'Vancouver', 'Montreal', 'Calgary', 'Halifax']
-        today = datetime.now().date()
-        
-        for _ in range(5):
-            location = random.choice(locations)
-            temperature = round(random.uniform(10, 25), 1)
-            precipitation = round(random.uniform(0, 5), 1)
-            humidity = round(random.uniform(40, 80), 1)
-            
-            query = """
-            INSERT INTO ClimateData (location, record_date, temperature, precipitation, humidity)
-            VALUES (%s, %s, %s, %s, %s)
-            """
-            cursor.execute(query, (location, today, temperature, precipitation, humidity))
-            conn.commit()
-            print(f"Inserted data for {location}")
-            
-        cursor.close()
-        conn.close()
+        readings = list(generate_readings(5))
+        # One multi-row INSERT and a single commit instead of a commit per row
+        inserter = BulkInserter(get_pool(DB_CONFIG, size=POOL_SIZE))
+        inserter.insert(readings)
+        for reading in readings:
+            print(f"Inserted data for {reading[0]}")
     except Exception as e:
         print(f"Error in insert_data: {e}")
 
 def select_data():
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        
-        query = """
-        SELECT location, AVG(temperature) as avg_temp, AVG(humidity) as avg_humidity
-        FROM ClimateData
-        WHERE temperature > 20
-        GROUP BY location
-        """
-        
-        cursor.execute(query)
-        results = cursor.fetchall()
-        
-        print("\nLocations with temperature > 20°C:")
-        for row in results:
-            print(f"Location: {row[0]}, Avg Temp: {row[1]:.1f}°C, Avg Humidity: {row[2]:.1f}%")
-            
-        cursor.close()
-        conn.close()
+        with get_connection() as conn:
+            results = RESULT_CACHE.fetchall(conn, SELECT_QUERY)
+
+            print("\nLocations with temperature > 20°C:")
+            for row in results:
+                print(f"Location: {row[0]}, Avg Temp: {row[1]:.1f}°C, Avg Humidity: {row[2]:.1f}%")
     except Exception as e:
         print(f"Error in select_data: {e}")
 
-def update_data():
+def update_data(chunk_size=None):
+    """Give every location a new humidity.
+
+    With chunk_size, all locations are updated in one walk over the primary
+    key, `chunk_size` keys per transaction, so concurrent inserts and
+    selects never wait behind a whole-location lock.
+    """
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        
-        locations = ['Toronto', 'Vancouver', 'Montreal', 'Calgary', 'Halifax']
-        
-        for location in locations:
-            new_humidity = round(random.uniform(50, 90), 1)
-            query = """
-            UPDATE ClimateData
-            SET humidity = %s
-            WHERE location = %s
-            """
-            cursor.execute(query, (new_humidity, location))
-            conn.commit()
-            print(f"Updated humidity for {location} to {new_humidity}%")
-            
-        cursor.close()
-        conn.close()
+        if chunk_size:
+            values = {location: round(random.uniform(50, 90), 1) for location in LOCATIONS}
+            set_clause, where_clause, params = humidity_by_location(values)
+            with get_connection() as conn:
+                stats = ChunkedUpdater(chunk_size=chunk_size).run(conn, set_clause, where_clause, params)
+            for location, humidity in values.items():
+                print(f"Updated humidity for {location} to {humidity}%")
+            print(f"{stats['rows']} rows in {stats['chunks']} chunks, {stats['retries']} retries, "
+                  f"max lock wait {stats['max_lock_wait_ms']:.1f} ms")
+            return
+
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            for location in LOCATIONS:
+                new_humidity = round(random.uniform(50, 90), 1)
+                cursor.execute(UPDATE_QUERY, (new_humidity, location))
+                conn.commit()
+                print(f"Updated humidity for {location} to {new_humidity}%")
+
+            cursor.close()
     except Exception as e:
         print(f"Error in update_data: {e}")
 
-def main():
-    # Create threads for each operation
-    insert_thread = threading.Thread(target=insert_data)
-    select_thread = threading.Thread(target=select_data)
-    update_thread = threading.Thread(target=update_data)
-    
-    # Start all threads
-    insert_thread.start()
-    select_thread.start()
-    update_thread.start()
-    
-    # Wait for all threads to complete
-    insert_thread.join()
-    select_thread.join()
-    update_thread.join()
+# ---------------------------------------------------------------------------
+# Benchmark harness
+# ---------------------------------------------------------------------------
+
+def op_insert(conn, rng, options):
+    """Insert `insert_batch` random readings in one transaction"""
+    today = datetime.now().date()
+    rows = [(rng.choice(LOCATIONS), today, round(rng.uniform(10, 25), 1),
+             round(rng.uniform(0, 5), 1), round(rng.uniform(40, 80), 1))
+            for _ in range(options.get('insert_batch', 1))]
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(INSERT_QUERY, rows)
+        conn.commit()
+    finally:
+        cursor.close()
+
+def op_select(conn, rng, options):
+    """Run the per-location aggregate and decode every row, through RESULT_CACHE with cache_results"""
+    if options.get('cache_results'):
+        RESULT_CACHE.fetchall(conn, SELECT_QUERY)
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute(SELECT_QUERY)
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+def op_update(conn, rng, options):
+    """Set a new humidity for one random location, in primary key chunks with update_chunk_size"""
+    humidity, location = round(rng.uniform(50, 90), 1), rng.choice(LOCATIONS)
+    if options.get('update_chunk_size'):
+        updater = ChunkedUpdater(chunk_size=options['update_chunk_size'], rng=rng)
+        return updater.run(conn, "humidity = %s", "location = %s", (humidity, location))
+    cursor = conn.cursor()
+    try:
+        cursor.execute(UPDATE_QUERY, (humidity, location))
+        conn.commit()
+    finally:
+        cursor.close()
+
+OPERATIONS = {
+    'insert': op_insert,
+    'select': op_select,
+    'update': op_update
+}
+
+def parse_weights(spec):
+    """Parse 'select=8,insert=2' into {'select': 8, 'insert': 2}"""
+    weights = {}
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        name, _, value = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}', expected one of {list(OPERATIONS)}")
+        weights[name] = float(value) if value else 1.0
+    return weights
+
+def new_results():
+    return {name: {'latency': LatencyHistogram(), 'errors': 0, 'chunks': new_chunk_stats()}
+            for name in OPERATIONS}
+
+def merge_results(target, source):
+    for name, stats in source.items():
+        target[name]['latency'].merge(stats['latency'])
+        target[name]['errors'] += stats['errors']
+        merge_chunk_stats(target[name]['chunks'], stats['chunks'])
+    return target
+
+def new_profiler(options):
+    """QueryProfiler for a benchmark run, or None when query profiling is off"""
+    if not options.get('profile_queries'):
+        return None
+    return QueryProfiler(explain_top=options.get('explain_top', 0),
+                         explain_interval=options.get('explain_interval', 60))
+
+def run_worker(choices, plan, options, profiler=None):
+    """Run one worker until its plan is exhausted and return its per-operation results.
+
+    `choices` maps operation name to weight. In open-loop mode (plan['interval']
+    set) operations start on a fixed schedule and latency is measured from the
+    intended start time, so a slow server shows up as queueing delay instead
+    of silently lowering the offered load. With a profiler, every statement
+    is also recorded under its digest.
+    """
+    rng = random.Random()
+    names = list(choices)
+    weights = [choices[name] for name in names]
+    results = new_results()
+    pool = get_pool(DB_CONFIG, size=POOL_SIZE)
+    conn = pool.acquire()
+    measured = 0
+    tick = 0
+
+    try:
+        while True:
+            if plan['interval']:
+                intended = plan['start'] + plan['offset'] + tick * plan['interval']
+                tick += 1
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                intended = time.perf_counter()
+
+            if plan['end'] is not None and intended >= plan['end']:
+                break
+
+            name = rng.choices(names, weights)[0] if len(names) > 1 else names[0]
+            ok = True
+            outcome = None
+            try:
+                outcome = OPERATIONS[name](ProfiledConnection(conn, profiler) if profiler else conn, rng, options)
+            except BROKEN_CONNECTION_ERRORS:
+                ok = False
+                pool.release(conn, broken=True)
+                # Already released; if the reacquire fails, finally must not release it again
+                conn = None
+                conn = pool.acquire()
+            except mysql.connector.Error:
+                ok = False
+                try:
+                    conn.rollback()
+                except mysql.connector.Error:
+                    pass
+            finished = time.perf_counter()
+            if profiler:
+                try:
+                    profiler.maybe_explain(conn)
+                except mysql.connector.Error:
+                    pass
+
+            # Operations started during warm-up run but are not recorded
+            if intended < plan['measure_start']:
+                continue
+            if ok:
+                results[name]['latency'].record(finished - intended)
+                if outcome:
+                    merge_chunk_stats(results[name]['chunks'], outcome)
+            else:
+                results[name]['errors'] += 1
+            measured += 1
+            if plan['count'] and measured >= plan['count']:
+                break
+    finally:
+        if conn is not None:
+            pool.release(conn)
+
+    return results
+
+def build_worker_specs(workers=None, mix=None, threads=1):
+    """Expand the CLI options into one {operation: weight} dict per worker"""
+    if mix:
+        return [dict(mix) for _ in range(threads)]
+    specs = []
+    for name, n in (workers or {}).items():
+        specs.extend({name: 1.0} for _ in range(int(n)))
+    return specs
+
+def build_plans(num_workers, duration=None, count=None, warmup=0, rate=None, start=None):
+    start = time.perf_counter() + 0.05 if start is None else start
+    measure_start = start + warmup
+    end = measure_start + duration if duration else None
+    # The target rate is shared evenly; workers are phase-shifted so requests interleave
+    interval = num_workers / rate if rate else None
+    return [{
+        'start': start,
+        'measure_start': measure_start,
+        'end': end,
+        'count': count,
+        'interval': interval,
+        'offset': interval * i / num_workers if interval else 0.0
+    } for i in range(num_workers)]
+
+def run_thread_workers(specs, plans, options, profiler=None):
+    """Run one thread per worker spec and return the merged results"""
+    global POOL_SIZE
+    POOL_SIZE = max(POOL_SIZE, len(specs))
+    if options.get('cache_results'):
+        RESULT_CACHE.ttl = options['cache_ttl']
+
+    results = new_results()
+    lock = threading.Lock()
+
+    def target(spec, plan):
+        try:
+            worker_results = run_worker(spec, plan, options, profiler)
+        except Exception as e:
+            print(f"Worker failed: {e}")
+            return
+        with lock:
+            merge_results(results, worker_results)
+
+    worker_threads = [threading.Thread(target=target, args=(spec, plan))
+                      for spec, plan in zip(specs, plans)]
+    for t in worker_threads:
+        t.start()
+    for t in worker_threads:
+        t.join()
+    return results
+
+def results_to_dict(results):
+    return {name: {'latency': stats['latency'].to_dict(), 'errors': stats['errors'], 'chunks': stats['chunks']}
+            for name, stats in results.items()}
+
+def results_from_dict(data):
+    return {name: {'latency': LatencyHistogram.from_dict(stats['latency']), 'errors': stats['errors'],
+                   'chunks': stats.get('chunks', new_chunk_stats())}
+            for name, stats in data.items()}
+
+def process_main(specs, indexes, plan_args, options, ready, go, start_time, queue):
+    """Entry point of a worker process: its own interpreter, pool and connections"""
+    try:
+        ready.wait(timeout=PROCESS_START_TIMEOUT)
+        go.wait()
+        plans = build_plans(len(specs), start=start_time.value, **plan_args)
+        profiler = new_profiler(options)
+        results = run_thread_workers([specs[i] for i in indexes],
+                                     [plans[i] for i in indexes], options, profiler)
+        queue.put({'pid': os.getpid(), 'results': results_to_dict(results), 'pool': get_pool(DB_CONFIG).stats(),
+                   'digests': profiler.to_dict() if profiler else None, 'cache': RESULT_CACHE.stats()})
+    except Exception as e:
+        queue.put({'pid': os.getpid(), 'error': f"{type(e).__name__}: {e}"})
+
+def run_process_workers(specs, plan_args, options, processes):
+    """Spread the workers over `processes` interpreters and merge what they send back.
+
+    Each process runs its share of workers as threads with its own connection
+    pool, so client-side row decoding and value generation scale past the GIL.
+    All processes wait on a barrier and then share one start time, so warm-up,
+    duration and open-loop schedules line up exactly as in thread mode.
+    A child that dies without reporting (e.g. killed by the OOM killer) is
+    counted as failed instead of blocking the parent.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    processes = max(1, min(processes, len(specs)))
+    ready = ctx.Barrier(processes + 1)
+    go = ctx.Event()
+    start_time = ctx.Value('d', 0.0)
+    queue = ctx.Queue()
+
+    children = []
+    for p in range(processes):
+        indexes = list(range(p, len(specs), processes))
+        child = ctx.Process(target=process_main,
+                            args=(specs, indexes, plan_args, options, ready, go, start_time, queue))
+        child.start()
+        children.append(child)
+
+    try:
+        ready.wait(timeout=PROCESS_START_TIMEOUT)
+    except threading.BrokenBarrierError:
+        # A child crashed or hung before the barrier; the others would wait on it forever
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.join()
+        raise RuntimeError(f"Worker processes did not start within {PROCESS_START_TIMEOUT}s")
+    start_time.value = time.perf_counter() + 0.05
+    go.set()
+
+    results = new_results()
+    pool_stats = []
+    cache_stats = []
+    profiler = new_profiler(options)
+
+    def handle(message):
+        pending.pop(message.get('pid'), None)
+        if 'error' in message:
+            print(f"Worker process failed: {message['error']}")
+            return
+        merge_results(results, results_from_dict(message['results']))
+        pool_stats.append(message['pool'])
+        cache_stats.append(message['cache'])
+        if profiler and message['digests']:
+            profiler.merge(QueryProfiler.from_dict(message['digests']))
+
+    pending = {child.pid: child for child in children}
+    while pending:
+        try:
+            handle(queue.get(timeout=1.0))
+            continue
+        except Empty:
+            pass
+        dead = [pid for pid, child in pending.items() if not child.is_alive()]
+        if not dead:
+            continue
+        # A child flushes its message before it exits; take any that raced the timeout
+        try:
+            while True:
+                handle(queue.get_nowait())
+        except Empty:
+            pass
+        for pid in dead:
+            if pid in pending:
+                print(f"Worker process {pid} exited with code {pending.pop(pid).exitcode} without results")
+    for child in children:
+        child.join()
+
+    return results, start_time.value, merge_pool_stats(pool_stats), profiler, merge_cache_stats(cache_stats)
+
+def merge_pool_stats(stats_list):
+    """Sum the per-process pool counters into one dict"""
+    merged = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if key.endswith('_max_ms'):
+                merged[key] = max(merged.get(key, 0), value)
+            elif key != 'wait_time_avg_ms':
+                merged[key] = merged.get(key, 0) + value
+    if merged.get('checkouts'):
+        merged['wait_time_avg_ms'] = round(merged['wait_time_total_ms'] / merged['checkouts'], 3)
+    merged['processes'] = len(stats_list)
+    return merged
+
+def run_benchmark(workers=None, mix=None, threads=1, duration=None, count=None,
+                  warmup=0, rate=None, insert_batch=1, backend='thread', processes=None,
+                  profile_queries=False, explain_top=0, explain_interval=60, update_chunk_size=None,
+                  cache_results=False, cache_ttl=60):
+    """Run a benchmark on thread or process workers and return the report dict.
+
+    With profile_queries, the report also holds 'query_digests': per-digest
+    calls, rows and latency, plus EXPLAIN plans for the `explain_top`
+    slowest digests. With update_chunk_size, updates walk the primary key in
+    chunks and the update entry reports their retries and lock waits. With
+    cache_results, selects go through RESULT_CACHE and the report holds its
+    hit/miss counters under 'result_cache'.
+    """
+    specs = build_worker_specs(workers, mix, threads)
+    if not specs:
+        raise ValueError("No workers configured")
+    if not duration and not count:
+        count = 5
+    plan_args = {'duration': duration, 'count': count, 'warmup': warmup, 'rate': rate}
+    options = {'insert_batch': insert_batch, 'profile_queries': profile_queries or bool(explain_top),
+               'explain_top': explain_top, 'explain_interval': explain_interval,
+               'update_chunk_size': update_chunk_size, 'cache_results': cache_results, 'cache_ttl': cache_ttl}
+
+    started_at = datetime.now().isoformat()
+    if backend == 'process':
+        processes = processes or os.cpu_count() or 1
+        results, start, pool_stats, profiler, cache_stats = run_process_workers(
+            specs, plan_args, options, processes)
+    elif backend == 'thread':
+        plans = build_plans(len(specs), **plan_args)
+        start = plans[0]['start']
+        profiler = new_profiler(options)
+        results = run_thread_workers(specs, plans, options, profiler)
+        pool_stats = get_pool(DB_CONFIG).stats()
+        cache_stats = RESULT_CACHE.stats()
+    else:
+        raise ValueError(f"Unknown backend '{backend}', expected 'thread' or 'process'")
+    elapsed = max(time.perf_counter() - (start + warmup), 1e-9)
+
+    config = {
+        'backend': backend,
+        'processes': min(processes, len(specs)) if backend == 'process' else 1,
+        'workers': len(specs),
+        'worker_specs': specs,
+        'duration': duration,
+        'count': count,
+        'warmup': warmup,
+        'rate': rate,
+        'insert_batch': insert_batch,
+        'update_chunk_size': update_chunk_size,
+        'cache_results': cache_results,
+        'cache_ttl': cache_ttl if cache_results else None
+    }
+    report = build_report(results, elapsed, config, started_at, pool_stats)
+    if cache_results:
+        report['result_cache'] = cache_stats
+    if profiler:
+        report['query_digests'] = profiler.to_dict()
+    return report
+
+def build_report(results, elapsed, config, started_at, pool_stats):
+    operations = {}
+    total = 0
+    for name, stats in results.items():
+        hist = stats['latency']
+        if not hist.count and not stats['errors']:
+            continue
+        total += hist.count
+        operations[name] = dict(
+            hist.summary(),
+            errors=stats['errors'],
+            throughput_ops_per_sec=round(hist.count / elapsed, 2),
+            histogram=hist.to_dict()
+        )
+        if stats['chunks']['runs']:
+            operations[name]['chunks'] = stats['chunks']
+    return {
+        'started_at': started_at,
+        'config': config,
+        'elapsed_seconds': round(elapsed, 3),
+        'total_ops': total,
+        'throughput_ops_per_sec': round(total / elapsed, 2),
+        'operations': operations,
+        'pool': pool_stats
+    }
+
+def print_report(report):
+    print(f"\nBenchmark finished in {report['elapsed_seconds']}s: "
+          f"{report['total_ops']} ops, {report['throughput_ops_per_sec']} ops/s")
+    print(f"{'operation':<10}{'ops':>8}{'errors':>8}{'ops/s':>10}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, op in report['operations'].items():
+        print(f"{name:<10}{op['count']:>8}{op['errors']:>8}{op['throughput_ops_per_sec']:>10}"
+              f"{op['p50_ms']:>10}{op['p95_ms']:>10}{op['p99_ms']:>10}{op['max_ms']:>10}")
+    for name, op in report['operations'].items():
+        chunks = op.get('chunks')
+        if chunks:
+            print(f"{name} chunks: {chunks['chunks']} ({chunks['rows']} rows), max {chunks['max_chunk_ms']} ms; "
+                  f"{chunks['retries']} retries ({chunks['deadlocks']} deadlocks, "
+                  f"{chunks['lock_timeouts']} lock wait timeouts); lock wait {chunks['lock_wait_ms']} ms total, "
+                  f"{chunks['max_lock_wait_ms']} ms max per chunk")
+    cache = report.get('result_cache')
+    if cache:
+        print(f"result cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_ratio']:.1%} hit ratio), "
+              f"{cache['invalidated']} invalidated, {cache['expired']} expired, {cache['evicted']} evicted")
+
+def print_digests(digests, top=5):
+    """Slowest statement digests by total time"""
+    print(f"\n{'calls':>8}{'total ms':>12}{'p50 ms':>10}{'p95 ms':>10}{'rows':>10}  query")
+    for entry in list(digests['digests'].values())[:top]:
+        summary = entry['summary']
+        print(f"{entry['calls']:>8}{entry['total_ms']:>12}{summary['p50_ms']:>10}{summary['p95_ms']:>10}"
+              f"{entry['rows']:>10}  {entry['query'][:80]}")
+        for table in entry['plan_tables'] or []:
+            print(f"{'':>52}{table['table']}: {table['access_type']} "
+                  f"(key {table['key']}, ~{table['rows_examined_per_scan']} rows)")
+
+def write_report(report, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark report written to {path}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent ClimateData load generator and benchmark")
+    parser.add_argument('--workers', default='insert=1,select=1,update=1',
+                        help="dedicated workers per operation, e.g. insert=4,select=8,update=1")
+    parser.add_argument('--mix', help="weighted operation mix, e.g. select=80,insert=15,update=5; "
+                                      "uses --threads workers instead of --workers")
+    parser.add_argument('--threads', type=int, default=4, help="worker count for --mix")
+    parser.add_argument('--backend', choices=['thread', 'process'], default='thread',
+                        help="run workers as threads in this process or spread over worker processes")
+    parser.add_argument('--processes', type=int,
+                        help="worker processes for --backend process (default: CPU count)")
+    parser.add_argument('--duration', type=float, help="measured run length in seconds")
+    parser.add_argument('--count', type=int, help="measured operations per worker (default 5)")
+    parser.add_argument('--warmup', type=float, default=0, help="seconds of unrecorded warm-up")
+    parser.add_argument('--rate', type=float, help="open-loop target rate in total ops/s")
+    parser.add_argument('--insert-batch', type=int, default=1, help="rows per insert operation")
+    parser.add_argument('--cache-results', action='store_true',
+                        help="serve selects from the client-side result cache while ClimateData is unchanged")
+    parser.add_argument('--cache-ttl', type=float, default=60, help="seconds a cached result may be served")
+    parser.add_argument('--update-chunk-size', type=int,
+                        help="run updates as primary key walks with this many keys per transaction")
+    parser.add_argument('--label', help="free-form run label, e.g. before-04-tuning")
+    parser.add_argument('--output', help="JSON report path "
+                                         "(default benchmark_results/benchmark_<timestamp>.json)")
+    parser.add_argument('--profile-queries', action='store_true',
+                        help="time every statement by digest and save the profile for the dashboard")
+    parser.add_argument('--explain-top', type=int, default=0,
+                        help="capture EXPLAIN plans for the N slowest digests (implies --profile-queries)")
+    parser.add_argument('--explain-interval', type=float, default=60,
+                        help="seconds between EXPLAIN captures")
+    parser.add_argument('--digests-output', default=os.path.join('monitoring_logs', DIGESTS_FILE),
+                        help="where to save the query digest profile")
+    args = parser.parse_args(argv)
+
+    mix = parse_weights(args.mix) if args.mix else None
+    workers = None if mix else {name: int(n) for name, n in parse_weights(args.workers).items()}
+
+    report = run_benchmark(workers=workers, mix=mix, threads=args.threads,
+                           duration=args.duration, count=args.count, warmup=args.warmup,
+                           rate=args.rate, insert_batch=args.insert_batch,
+                           backend=args.backend, processes=args.processes,
+                           profile_queries=args.profile_queries, explain_top=args.explain_top,
+                           explain_interval=args.explain_interval,
+                           update_chunk_size=args.update_chunk_size,
+                           cache_results=args.cache_results, cache_ttl=args.cache_ttl)
+    report['label'] = args.label
+    print_report(report)
+    if 'query_digests' in report:
+        print_digests(report['query_digests'])
+        QueryProfiler.from_dict(report['query_digests']).save(args.digests_output)
+        print(f"Query digest profile written to {args.digests_output}")
+
+    output = args.output or os.path.join(
+        'benchmark_results', f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    write_report(report, output)
+    if not report['total_ops']:
+        # Connection failures are only printed by the workers; do not let CI pass on an empty run
+        print("No operation completed successfully")
+        raise SystemExit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,171 @@
+import argparse
+from datetime import date
+
+import mysql.connector
+from bulk_insert import load_db_config
+from db_pool import get_pool
+
+TABLE = 'ClimateData'
+
+# Catch-all for rows beyond the pre-created months (created by sql/06)
+FUTURE_PARTITION = 'p_future'
+
+PARTITIONS_QUERY = """
+    SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound, TABLE_ROWS AS table_rows
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+    ORDER BY PARTITION_ORDINAL_POSITION
+"""
+
+# Summary tables from sql/05 keyed by month_start; dropped months must leave them too
+SUMMARY_TABLES = ('climate_monthly_summary', 'climate_summary_dirty')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def parse_bound(description):
+    """Upper bound of a RANGE COLUMNS partition ("'2025-05-01'") as a date, None for MAXVALUE"""
+    value = (description or '').strip().strip("'")
+    if not value or value.upper() == 'MAXVALUE':
+        return None
+    return date.fromisoformat(value)
+
+
+def plan_maintenance(partitions, today, ahead=3, retention_months=None):
+    """Work out which month partitions to create and which to drop.
+
+    partitions: [(name, upper bound date or None for MAXVALUE)] in order.
+    Months up to `ahead` months after today's month get a partition. With
+    retention_months, every partition whose rows all predate the first
+    retained month is dropped. The newest month partition is never dropped,
+    because MySQL cannot drop the last partition and the next month is
+    rarely expired anyway.
+    Returns (months to create, partition names to drop, cutoff date or None).
+    """
+    bounds = [bound for _, bound in partitions if bound is not None]
+    last_bound = max(bounds) if bounds else month_start(today)
+    target = add_months(month_start(today), ahead + 1)
+
+    to_create = []
+    month = last_bound
+    while month < target:
+        to_create.append(month)
+        month = add_months(month, 1)
+
+    to_drop = []
+    cutoff = None
+    if retention_months is not None:
+        cutoff = add_months(month_start(today), -retention_months)
+        month_partitions = [(name, bound) for name, bound in partitions if bound is not None]
+        for name, bound in month_partitions[:-1]:
+            if bound <= cutoff:
+                to_drop.append(name)
+    return to_create, to_drop, cutoff
+
+
+def create_statement(months, has_future):
+    definitions = [f"PARTITION {partition_name(m)} VALUES LESS THAN ('{add_months(m, 1).isoformat()}')"
+                   for m in months]
+    if has_future:
+        # Splitting an empty MAXVALUE partition is a metadata-only change
+        definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+        return f"ALTER TABLE {TABLE} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(definitions)})"
+    return f"ALTER TABLE {TABLE} ADD PARTITION ({', '.join(definitions)})"
+
+
+def drop_statement(names):
+    return f"ALTER TABLE {TABLE} DROP PARTITION {', '.join(names)}"
+
+
+class PartitionMaintainer:
+    """Pre-creates future month partitions of ClimateData and drops expired ones"""
+
+    def __init__(self, pool, ahead=3, retention_months=None, dry_run=False):
+        self.pool = pool
+        self.ahead = ahead
+        self.retention_months = retention_months
+        self.dry_run = dry_run
+
+    def partitions(self, cursor):
+        cursor.execute(PARTITIONS_QUERY, (TABLE,))
+        return [(row['name'], parse_bound(row['bound']), row['table_rows']) for row in cursor.fetchall()]
+
+    def _execute(self, cursor, statement, params=None):
+        print(("[dry run] " if self.dry_run else "") + statement)
+        if not self.dry_run:
+            cursor.execute(statement, params)
+
+    def run(self, today=None):
+        today = today or date.today()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                partitions = self.partitions(cursor)
+                if not partitions:
+                    print(f"{TABLE} is not partitioned; apply sql/06_partition_climate_data.sql first")
+                    return {'created': [], 'dropped': []}
+
+                to_create, to_drop, cutoff = plan_maintenance(
+                    [(name, bound) for name, bound, _ in partitions], today,
+                    self.ahead, self.retention_months)
+
+                future = [rows for name, _, rows in partitions if name == FUTURE_PARTITION]
+                if to_create:
+                    if future and future[0]:
+                        print(f"Warning: {FUTURE_PARTITION} holds ~{future[0]} rows; "
+                              "splitting it will copy them")
+                    self._execute(cursor, create_statement(to_create, bool(future)))
+
+                if to_drop:
+                    # Instant: the partitions' tablespaces are removed, no row-by-row DELETE
+                    self._execute(cursor, drop_statement(to_drop))
+                    self._clear_summaries(cursor, cutoff)
+                    if not self.dry_run:
+                        conn.commit()
+            finally:
+                cursor.close()
+
+        print(f"Created {len(to_create)} partitions, dropped {len(to_drop)}"
+              + (f" (rows before {cutoff})" if to_drop else ""))
+        return {'created': [partition_name(m) for m in to_create], 'dropped': to_drop}
+
+    def _clear_summaries(self, cursor, cutoff):
+        """Remove summary buckets for the dropped months (DROP PARTITION fires no triggers)"""
+        cursor.execute("SELECT TABLE_NAME AS name FROM information_schema.TABLES "
+                       "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN (%s, %s)", SUMMARY_TABLES)
+        existing = {row['name'].lower() for row in cursor.fetchall()}
+        for table in SUMMARY_TABLES:
+            if table in existing:
+                self._execute(cursor, f"DELETE FROM {table} WHERE month_start < %s", (cutoff,))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create upcoming and drop expired ClimateData partitions")
+    parser.add_argument('--ahead', type=int, default=3, help="months after the current one to pre-create")
+    parser.add_argument('--retention-months', type=int,
+                        help="drop partitions entirely older than this many months (default: keep all)")
+    parser.add_argument('--dry-run', action='store_true', help="print the statements without running them")
+    args = parser.parse_args()
+
+    maintainer = PartitionMaintainer(get_pool(load_db_config(), size=1), ahead=args.ahead,
+                                     retention_months=args.retention_months, dry_run=args.dry_run)
+    try:
+        maintainer.run()
+    except mysql.connector.Error as err:
+        print(f"Partition maintenance failed: {err}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
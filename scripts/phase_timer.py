@@ -0,0 +1,106 @@
+import cProfile
+import pstats
+import time
+from contextlib import contextmanager
+
+from latency import LatencyHistogram
+
+
+class PhaseTimer:
+    """Per-phase wall-clock timings of a periodic loop.
+
+    Each pass of the loop is a tick: begin() starts one and end() closes
+    it. Work inside a tick is wrapped in phase(name). The timer keeps each
+    phase's time in the current tick plus a LatencyHistogram of every
+    phase and of whole ticks since start. A tick that takes longer than
+    `interval` counts as an overrun. It also records the start-to-start
+    period, so a loop that sleeps a fixed interval after its work shows its
+    drift.
+    """
+
+    def __init__(self, interval=None, precision=0.01):
+        self.interval = interval
+        self.precision = precision
+        self.histograms = {}
+        self.ticks = 0
+        self.overruns = 0
+        self.last_tick_ms = None
+        self.last_period_ms = None
+        self._current = {}
+        self._tick_start = None
+
+    def record(self, name, seconds):
+        """Add a measurement to the histogram of `name` only (e.g. a lag, not part of the tick)"""
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = LatencyHistogram(self.precision)
+        hist.record(seconds)
+
+    def begin(self):
+        now = time.perf_counter()
+        if self._tick_start is not None:
+            self.last_period_ms = round((now - self._tick_start) * 1000, 3)
+        self._tick_start = now
+        self._current = {}
+
+    def end(self):
+        """Close the tick; returns its duration in seconds"""
+        if self._tick_start is None:
+            return 0.0
+        elapsed = time.perf_counter() - self._tick_start
+        self.record('tick', elapsed)
+        self.ticks += 1
+        self.last_tick_ms = round(elapsed * 1000, 3)
+        if self.interval and elapsed > self.interval:
+            self.overruns += 1
+        return elapsed
+
+    def add(self, name, seconds):
+        """Record a phase measured elsewhere (e.g. the cost of one collector group)"""
+        self.record(name, seconds)
+        self._current[name] = round(self._current.get(name, 0.0) + seconds * 1000, 3)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Timings so far, safe to serialize into a sample.
+
+        `phases_ms` covers the current tick up to now. `histograms` includes
+        every completed phase, so phases that run after the snapshot is
+        taken (such as writing the sample) show up from the next one.
+        """
+        return {
+            'phases_ms': dict(self._current),
+            'last_tick_ms': self.last_tick_ms,
+            'last_period_ms': self.last_period_ms,
+            'interval': self.interval,
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'histograms': {name: hist.summary() for name, hist in sorted(self.histograms.items())}
+        }
+
+
+@contextmanager
+def profiled(path, top=25):
+    """Run the block under cProfile and write a pstats file to `path`.
+
+    The file can be opened with pstats, snakeviz, or flameprof/gprof2dot
+    to produce a flame graph. The `top` entries by cumulative time are also
+    printed.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"\nProfile written to {path}")
+        if top:
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(top)
@@ -0,0 +1,325 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import mysql.connector
+
+from latency import LatencyHistogram
+
+# Default file name for saved profiles, next to the monitor's samples so the dashboard finds it
+DIGESTS_FILE = 'query_digests.json'
+
+_COMMENTS = re.compile(r"/\*.*?\*/|--[^\n]*", re.S)
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\?")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.I)
+_VALUE_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_LISTS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+# Statements MySQL can EXPLAIN
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|UPDATE|DELETE|INSERT|REPLACE)\b", re.I)
+
+
+def normalize_sql(sql):
+    """Reduce a statement to its digest text.
+
+    Literals and driver placeholders become '?', IN lists and multi-row
+    VALUES collapse to '(...)', and comments and extra whitespace are
+    dropped. Statements that differ only in their values therefore share
+    a digest.
+    """
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode('utf-8', 'replace')
+    text = _COMMENTS.sub(' ', sql)
+    text = _STRINGS.sub('?', text)
+    text = _PLACEHOLDERS.sub('?', text)
+    text = _NUMBERS.sub('?', text)
+    text = _VALUE_LISTS.sub('(...)', text)
+    text = _REPEATED_LISTS.sub('(...)', text)
+    return _WHITESPACE.sub(' ', text).strip().rstrip(';').strip()
+
+
+def digest_of(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def plan_tables(plan):
+    """Per-table access summary (type, key, estimated rows) from an EXPLAIN FORMAT=JSON plan"""
+    tables = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if 'table_name' in node and 'access_type' in node:
+                tables.append({
+                    'table': node['table_name'],
+                    'access_type': node['access_type'],
+                    'key': node.get('key'),
+                    'possible_keys': node.get('possible_keys'),
+                    'rows_examined_per_scan': node.get('rows_examined_per_scan'),
+                    'attached_condition': node.get('attached_condition')
+                })
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(plan)
+    return tables
+
+
+class QueryProfiler:
+    """Per-digest call counts, rows and latency histograms for client-side statements.
+
+    Wrap a connection with ProfiledConnection(conn, profiler) and every
+    statement run through its cursors is timed, including the fetch of its
+    rows. One profiler can be shared by many threads. With `explain_top` set,
+    maybe_explain() captures EXPLAIN FORMAT=JSON plans for the slowest
+    digests at most once every `explain_interval` seconds.
+    """
+
+    def __init__(self, explain_top=0, explain_interval=60):
+        self.explain_top = explain_top
+        self.explain_interval = explain_interval
+        self.digests = {}
+        self._lock = threading.Lock()
+        self._explain_lock = threading.Lock()
+        self._last_explain = None
+
+    def _entry(self, key, text):
+        entry = self.digests.get(key)
+        if entry is None:
+            entry = self.digests[key] = {
+                'query': text,
+                'example': None,
+                'params': None,
+                'calls': 0,
+                'errors': 0,
+                'rows': 0,
+                'latency': LatencyHistogram(),
+                'plan': None,
+                'plan_tables': None,
+                'plan_captured_at': None
+            }
+        return entry
+
+    def record(self, sql, seconds, rows=0, params=None, error=False):
+        text = normalize_sql(sql)
+        key = digest_of(text)
+        with self._lock:
+            entry = self._entry(key, text)
+            if entry['example'] is None:
+                # Kept in memory so EXPLAIN can run a real instance of the statement
+                entry['example'] = sql.decode('utf-8', 'replace') if isinstance(sql, (bytes, bytearray)) else sql
+                entry['params'] = params
+            entry['calls'] += 1
+            if error:
+                entry['errors'] += 1
+            else:
+                entry['latency'].record(seconds)
+                entry['rows'] += rows
+
+    def top(self, n=10):
+        """(digest, entry) pairs with the most total time, slowest first"""
+        with self._lock:
+            entries = list(self.digests.items())
+        entries.sort(key=lambda item: item[1]['latency'].total, reverse=True)
+        return entries[:n]
+
+    def maybe_explain(self, conn):
+        """Capture plans for the top digests if explain_interval has passed; never blocks"""
+        if not self.explain_top:
+            return
+        now = time.monotonic()
+        if self._last_explain is not None and now - self._last_explain < self.explain_interval:
+            return
+        if not self._explain_lock.acquire(blocking=False):
+            return  # Another thread is already capturing
+        try:
+            self._last_explain = now
+            self.explain(conn)
+        finally:
+            self._explain_lock.release()
+
+    def explain(self, conn, n=None):
+        """Run EXPLAIN FORMAT=JSON for the top `n` digests on a plain (unprofiled) connection"""
+        for _, entry in self.top(n or self.explain_top):
+            if not entry['example'] or not _EXPLAINABLE.match(entry['example']):
+                continue
+            cursor = conn.cursor()
+            try:
+                cursor.execute("EXPLAIN FORMAT=JSON " + entry['example'], entry['params'])
+                plan = json.loads(cursor.fetchone()[0])
+                entry['plan'] = plan
+                entry['plan_tables'] = plan_tables(plan)
+                entry.pop('plan_error', None)
+            except (mysql.connector.Error, TypeError, ValueError) as e:
+                entry['plan_error'] = str(e)
+            finally:
+                cursor.close()
+            entry['plan_captured_at'] = datetime.now().isoformat()
+        if conn.in_transaction:
+            conn.rollback()
+
+    def merge(self, other):
+        """Add another profiler's digests (e.g. from a worker process) into this one"""
+        for key, source in other.digests.items():
+            with self._lock:
+                entry = self._entry(key, source['query'])
+                if entry['example'] is None:
+                    entry['example'] = source['example']
+                    entry['params'] = source['params']
+                entry['calls'] += source['calls']
+                entry['errors'] += source['errors']
+                entry['rows'] += source['rows']
+                entry['latency'].merge(source['latency'])
+                if source['plan'] is not None and (entry['plan_captured_at'] or '') < source['plan_captured_at']:
+                    entry['plan'] = source['plan']
+                    entry['plan_tables'] = source['plan_tables']
+                    entry['plan_captured_at'] = source['plan_captured_at']
+        return self
+
+    def to_dict(self):
+        digests = {}
+        for key, entry in self.top(len(self.digests)):
+            digests[key] = {
+                'query': entry['query'],
+                'example': entry['example'],
+                'calls': entry['calls'],
+                'errors': entry['errors'],
+                'rows': entry['rows'],
+                'total_ms': round(entry['latency'].total * 1000, 3),
+                'summary': entry['latency'].summary(),
+                'latency': entry['latency'].to_dict(),
+                'plan': entry['plan'],
+                'plan_tables': entry['plan_tables'],
+                'plan_captured_at': entry['plan_captured_at']
+            }
+            if 'plan_error' in entry:
+                digests[key]['plan_error'] = entry['plan_error']
+        return {'generated_at': datetime.now().isoformat(), 'digests': digests}
+
+    @classmethod
+    def from_dict(cls, data):
+        profiler = cls()
+        for key, saved in data['digests'].items():
+            entry = profiler._entry(key, saved['query'])
+            entry.update({k: saved.get(k) for k in ('example', 'calls', 'errors', 'rows', 'plan',
+                                                   'plan_tables', 'plan_captured_at')})
+            entry['latency'] = LatencyHistogram.from_dict(saved['latency'])
+            if 'plan_error' in saved:
+                entry['plan_error'] = saved['plan_error']
+        return profiler
+
+    def save(self, path):
+        """Write the profile as JSON, atomically so readers never see a partial file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        os.replace(tmp, path)
+
+
+class ProfiledCursor:
+    """Cursor wrapper that reports every statement to a QueryProfiler.
+
+    A statement that returns rows is recorded once its rows are fetched (or
+    the cursor moves on). Its latency then covers execution and transfer,
+    and its row count is what the client actually received.
+    """
+
+    def __init__(self, cursor, profiler):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._pending = None  # [sql, params, seconds so far, rows so far]
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _finish(self):
+        if self._pending is not None:
+            sql, params, seconds, rows = self._pending
+            self._pending = None
+            self._profiler.record(sql, seconds, rows, params)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            result = self._cursor.execute(operation, params, *args, **kwargs)
+        except Exception:
+            self._profiler.record(operation, time.perf_counter() - start, params=params, error=True)
+            raise
+        elapsed = time.perf_counter() - start
+        if getattr(self._cursor, 'with_rows', False):
+            self._pending = [operation, params, elapsed, 0]
+        else:
+            self._profiler.record(operation, elapsed, max(self._cursor.rowcount, 0), params)
+        return result
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._finish()
+        seq_params = list(seq_params)
+        example = seq_params[0] if seq_params else None
+        start = time.perf_counter()
+        try:
+            result = self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        except Exception:
+            self._profiler.record(operation, time.perf_counter() - start, params=example, error=True)
+            raise
+        self._profiler.record(operation, time.perf_counter() - start,
+                              max(self._cursor.rowcount, 0), example)
+        return result
+
+    def _fetched(self, start, rows, done):
+        if self._pending is not None:
+            self._pending[2] += time.perf_counter() - start
+            self._pending[3] += rows
+            if done:
+                self._finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(start, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._fetched(start, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+
+class ProfiledConnection:
+    """Connection wrapper whose cursors are ProfiledCursors; everything else is passed through"""
+
+    def __init__(self, conn, profiler):
+        self._conn = conn
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return ProfiledCursor(self._conn.cursor(*args, **kwargs), self._profiler)
@@ -0,0 +1,183 @@
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Newest key and last change of a table; NOW() dates the watermark on the server's clock
+WATERMARK_QUERY = """
+    SELECT (SELECT MAX(`{key}`) FROM `{table}`),
+           (SELECT UPDATE_TIME FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s),
+           NOW()
+"""
+
+
+def cache_key(sql, params=None):
+    """Whitespace-insensitive statement text plus its parameters"""
+    return re.sub(r"\s+", " ", sql).strip(), tuple(params or ())
+
+
+def _size_of(value):
+    """Approximate memory held by a result set of tuples/dicts of scalars"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(_size_of(k) + _size_of(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return size + sum(_size_of(item) for item in value)
+    return size
+
+
+class ResultCache:
+    """Client-side read-through cache for query results.
+
+    Entries are keyed by statement and parameters. An entry is served until
+    one of these happens:
+    - its TTL passes;
+    - the LRU order evicts it to stay under `max_bytes`;
+    - a table it reads changes.
+    A table counts as changed when its newest key (MAX(record_id), which
+    catches appends) or its information_schema UPDATE_TIME (which catches
+    updates and deletes) moves. UPDATE_TIME only has second resolution, so
+    an entry filled in the same second as the last change is treated as
+    stale. Watermarks are re-read at most every `watermark_interval` seconds,
+    which bounds how stale a hit can be.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=60.0, watermark_interval=1.0, key_column='record_id'):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.watermark_interval = watermark_interval
+        self.key_column = key_column
+        self._entries = OrderedDict()
+        self._watermarks = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'invalidated': 0,
+            'evicted': 0,
+            'uncacheable': 0,
+            'watermark_checks': 0
+        }
+
+    def _watermark(self, conn, table):
+        """(max key, UPDATE_TIME, server time) of a table, re-read at most every watermark_interval"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._watermarks.get(table)
+            if cached and now - cached[0] < self.watermark_interval:
+                return cached[1]
+
+        cursor = conn.cursor()
+        try:
+            # information_schema.TABLES is cached for a day by default in MySQL 8
+            cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+            cursor.execute(WATERMARK_QUERY.format(key=self.key_column, table=table), (table,))
+            watermark = tuple(cursor.fetchone())
+            cursor.fetchall()
+        finally:
+            cursor.close()
+        with self._lock:
+            self._stats['watermark_checks'] += 1
+            self._watermarks[table] = (now, watermark)
+        return watermark
+
+    @staticmethod
+    def _still_valid(filled, current):
+        """filled: watermark when the entry was stored; current: watermark now"""
+        max_key, update_time, _ = current
+        filled_key, _, filled_at = filled
+        if max_key != filled_key:
+            return False
+        return update_time is None or update_time < filled_at
+
+    def get(self, key, watermarks):
+        """Cached rows for a key if still fresh, else None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            if time.monotonic() - entry['stored'] > self.ttl:
+                self._drop(key)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            if any(not self._still_valid(entry['watermarks'][table], watermark)
+                   for table, watermark in watermarks.items()):
+                self._drop(key)
+                self._stats['invalidated'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return list(entry['rows'])
+
+    def put(self, key, rows, watermarks):
+        size = _size_of(rows) + _size_of(key)
+        with self._lock:
+            if size > self.max_bytes:
+                # Larger than the whole cache; caching it would evict everything else
+                self._stats['uncacheable'] += 1
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {'rows': rows, 'size': size, 'stored': time.monotonic(),
+                                  'watermarks': dict(watermarks)}
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._stats['evicted'] += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry['size']
+
+    def fetchall(self, conn, sql, params=None, tables=('ClimateData',)):
+        """Rows of `sql`, from the cache when fresh, else from the server (and then cached)"""
+        watermarks = {table: self._watermark(conn, table) for table in tables}
+        key = cache_key(sql, params)
+        rows = self.get(key, watermarks)
+        if rows is not None:
+            return rows
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        self.put(key, rows, watermarks)
+        return list(rows)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._watermarks.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Snapshot of cache counters, safe to serialize into a report"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def merge_cache_stats(stats_list):
+    """Sum the per-process cache counters into one dict"""
+    merged = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if key != 'hit_ratio':
+                merged[key] = merged.get(key, 0) + value
+    lookups = merged.get('hits', 0) + merged.get('misses', 0)
+    merged['hit_ratio'] = round(merged['hits'] / lookups, 4) if lookups else 0.0
+    return merged
@@ -0,0 +1,337 @@
+import argparse
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from metrics_store import MetricsReader
+
+# SHOW GLOBAL STATUS values kept as columns
+STATUS_COLUMNS = ['Queries', 'Slow_queries', 'Threads_connected', 'Bytes_received', 'Bytes_sent']
+
+# Per-second counter rates the monitor stores under 'rates' (monitor_mysql.COUNTER_RATES)
+RATE_COLUMNS = ['queries_per_sec', 'slow_queries_per_sec', 'bytes_received_per_sec', 'bytes_sent_per_sec']
+
+# Rollup tiers from finest to coarsest: (name, pandas resample rule)
+TIERS = [('5min', '5min'), ('1h', '1h'), ('1d', '1D')]
+
+
+def frame_from_samples(samples):
+    """Build a typed, time-indexed DataFrame from raw samples in one pass.
+
+    Returns (frame, latest) where latest is the newest complete raw sample,
+    or (None, None) when no usable sample was seen.
+    """
+    timestamps = []
+    columns = {name: [] for name in STATUS_COLUMNS + RATE_COLUMNS}
+    table_sizes = []
+    latest = None
+
+    for data in samples:
+        try:
+            # Skip incomplete or invalid metrics
+            if not all(key in data for key in ['timestamp', 'global_status', 'processes', 'tables']):
+                continue
+            table_size = sum(
+                table_info.get('data_size', 0) + table_info.get('index_size', 0)
+                for table_info in data['tables'].values()
+            )
+            status = data['global_status']
+            rates = data.get('rates', {})
+            for name in STATUS_COLUMNS:
+                columns[name].append(status.get(name))
+            # The first sample after a monitor start has no rates
+            for name in RATE_COLUMNS:
+                columns[name].append(rates.get(name))
+            timestamps.append(data['timestamp'])
+            table_sizes.append(table_size)
+            if latest is None or data['timestamp'] >= latest['timestamp']:
+                latest = data
+        except Exception as e:
+            print(f"Error loading sample: {str(e)}")
+
+    if not timestamps:
+        return None, None
+    frame = pd.DataFrame(columns).apply(pd.to_numeric, errors='coerce')
+    frame['table_size'] = pd.Series(table_sizes, dtype='int64').values
+    frame.index = pd.to_datetime(pd.Index(timestamps), format='ISO8601')
+    frame.index.name = 'timestamp'
+    return frame.sort_index(), latest
+
+
+def bucketize(frame, rule):
+    """min/max/avg/last/count per metric for every `rule`-sized bucket of raw rows"""
+    grouped = frame.resample(rule)
+    parts = {
+        'min': grouped.min(),
+        'max': grouped.max(),
+        'avg': grouped.mean(),
+        'last': grouped.last(),
+        'count': grouped.count()
+    }
+    out = pd.concat({stat: part for stat, part in parts.items()}, axis=1)
+    out.columns = [f"{metric}_{stat}" for stat, metric in out.columns]
+    # resample() emits empty buckets for gaps in collection; drop them
+    counts = parts['count'].sum(axis=1)
+    return out[counts > 0]
+
+
+def _column(frame, name):
+    # Metrics added after a tier was started are missing from its older rows
+    return frame[name] if name in frame else pd.Series(np.nan, index=frame.index)
+
+
+def merge_buckets(old, new, metrics):
+    """Combine two rollups of the same buckets (e.g. a partial bucket plus new rows)"""
+    merged = pd.DataFrame(index=new.index)
+    for m in metrics:
+        old_count = _column(old, f"{m}_count").fillna(0)
+        new_count = _column(new, f"{m}_count").fillna(0)
+        count = old_count + new_count
+        merged[f"{m}_min"] = np.fmin(_column(old, f"{m}_min"), _column(new, f"{m}_min"))
+        merged[f"{m}_max"] = np.fmax(_column(old, f"{m}_max"), _column(new, f"{m}_max"))
+        merged[f"{m}_avg"] = ((_column(old, f"{m}_avg").fillna(0) * old_count
+                               + _column(new, f"{m}_avg").fillna(0) * new_count)
+                              / count.where(count > 0))
+        merged[f"{m}_last"] = _column(new, f"{m}_last").fillna(_column(old, f"{m}_last"))
+        merged[f"{m}_count"] = count
+    return merged
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling; returns the indexes to keep.
+
+    Keeps the first and last point and, for each of threshold - 2 equal
+    buckets in between, the point forming the largest triangle with the
+    previous kept point and the average of the next bucket. Peaks and dips
+    survive, which plain striding or averaging would flatten.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third corner of the triangle
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def _read_tier(buffer):
+    return pd.read_csv(buffer, index_col='timestamp', parse_dates=['timestamp'])
+
+
+class RollupStore:
+    """5-minute, 1-hour and 1-day rollups kept next to the raw metrics.
+
+    The store has its own MetricsReader cursor, so every raw sample is folded
+    in exactly once however often sync() runs. A partially filled bucket is
+    merged with later rows instead of being recomputed.
+
+    Each tier's closed buckets (all but the newest) are appended to a CSV
+    file under `directory`. The newest bucket, which may still change, is
+    kept in state.json with the cursor and each file's committed length, so
+    a sync writes only what changed. state.json is replaced atomically and
+    bytes past a file's committed length are ignored and later truncated, so
+    a crash never pairs tiers with the wrong cursor. A tier is rewritten
+    into a new file only when its columns change or late samples touch a
+    bucket that was already closed.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.state_file = os.path.join(directory, 'state.json')
+        self.cursor = None
+        self.tiers = {}
+        # Tier name -> committed file info from state.json (None: nothing written yet)
+        self._files = {}
+        # Tier name -> earliest bucket changed since the last save
+        self._dirty = {}
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, file_name):
+        return os.path.join(self.directory, file_name)
+
+    def _load(self):
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            state = {}
+        self.cursor = state.get('cursor')
+        saved = state.get('tiers')
+        for name, _ in TIERS:
+            self.tiers[name] = pd.DataFrame()
+            self._files[name] = None
+            if self.cursor is None:
+                continue
+            if saved is None:
+                # Whole-tier files of older stores; they are rewritten on the next save
+                generation = state.get('generation')
+                path = self._path(f"rollup_{name}.{generation}.csv" if generation else f"rollup_{name}.csv")
+                if os.path.exists(path):
+                    self.tiers[name] = _read_tier(path)
+                continue
+            info = saved.get(name)
+            if info is None:
+                continue
+            parts = []
+            if info['bytes']:
+                with open(self._path(info['file']), 'rb') as f:
+                    parts.append(_read_tier(io.BytesIO(f.read(info['bytes']))))
+            if info['open']:
+                parts.append(_read_tier(io.StringIO(info['open'])))
+            # A header-only part would turn every column into object dtype
+            parts = [part for part in parts if not part.empty]
+            self.tiers[name] = pd.concat(parts) if parts else pd.DataFrame()
+            self._files[name] = info
+
+    def _save_tier(self, name):
+        """Write a tier's closed buckets; returns its new state.json entry"""
+        tier = self.tiers[name]
+        if tier.empty:
+            return None
+        info = self._files.get(name)
+        closed, newest = tier.iloc[:-1], tier.iloc[-1:]
+        columns = list(tier.columns)
+        dirty = self._dirty.get(name)
+        rewrite = (info is None or columns != info['columns']
+                   or (dirty is not None and info['closed_until'] is not None
+                       and dirty <= pd.Timestamp(info['closed_until'])))
+
+        if rewrite:
+            generation = info['generation'] + 1 if info else 1
+            file_name = f"rollup_{name}.{generation}.csv"
+            data = closed.to_csv(index_label='timestamp', lineterminator='\n').encode('utf-8')
+            mode, keep = 'wb', 0
+        else:
+            generation, file_name = info['generation'], info['file']
+            if info['closed_until'] is not None:
+                closed = closed[closed.index > pd.Timestamp(info['closed_until'])]
+            data = closed.to_csv(header=False, lineterminator='\n').encode('utf-8')
+            mode, keep = 'r+b', info['bytes']
+
+        with open(self._path(file_name), mode) as f:
+            # Drop anything written after the last committed save (a crash before state.json)
+            f.truncate(keep)
+            f.seek(keep)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+
+        return {
+            'file': file_name,
+            'generation': generation,
+            'bytes': size,
+            'columns': columns,
+            'closed_until': tier.index[-2].isoformat() if len(tier) > 1 else None,
+            'open': newest.to_csv(index_label='timestamp', lineterminator='\n')
+        }
+
+    def save(self):
+        """Append closed buckets to the tier files, then commit state.json"""
+        files = {name: self._save_tier(name) for name, _ in TIERS}
+        tmp = self.state_file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'cursor': self.cursor, 'tiers': files}, f)
+        os.replace(tmp, self.state_file)
+        self._files = files
+        self._dirty = {}
+
+        # Files of rewritten tiers, and whole-tier files of older stores
+        current = {info['file'] for info in files.values() if info}
+        for file_name in os.listdir(self.directory):
+            if not file_name.startswith('rollup_') or not file_name.endswith('.csv') or file_name in current:
+                continue
+            try:
+                os.remove(self._path(file_name))
+            except FileNotFoundError:
+                pass
+
+    def update(self, frame):
+        """Fold new raw rows into every tier"""
+        metrics = list(frame.columns)
+        for name, rule in TIERS:
+            new = bucketize(frame, rule)
+            if not new.empty:
+                earliest = new.index[0]
+                dirty = self._dirty.get(name)
+                self._dirty[name] = earliest if dirty is None else min(dirty, earliest)
+            tier = self.tiers[name]
+            if tier.empty:
+                self.tiers[name] = new
+                continue
+            overlap = new.index.intersection(tier.index)
+            if len(overlap):
+                merged = merge_buckets(tier.loc[overlap], new.loc[overlap], metrics)
+                new = pd.concat([merged, new.drop(overlap)])
+                tier = tier.drop(overlap)
+            self.tiers[name] = pd.concat([tier, new]).sort_index()
+
+    def sync(self, reader):
+        """Read samples written since the last sync and update the tiers; returns the count"""
+        def samples():
+            for data, cursor in reader.follow(self.cursor):
+                self.cursor = cursor
+                yield data
+
+        frame, _ = frame_from_samples(samples())
+        if frame is None:
+            return 0
+        self.update(frame)
+        self.save()
+        return len(frame)
+
+    def select(self, raw, start=None, end=None, max_points=1000):
+        """Pick the finest tier that fits `max_points` points in [start, end].
+
+        Returns (tier name, frame). The raw tier has plain metric columns;
+        rollup tiers have <metric>_<stat> columns. If even the coarsest tier
+        is too dense, it is returned anyway and the caller should thin it
+        with lttb().
+        """
+        candidates = [('raw', raw)] + [(name, self.tiers[name]) for name, _ in TIERS]
+        picked, window = 'raw', raw
+        for name, frame in candidates:
+            if frame is None or frame.empty:
+                continue
+            picked, window = name, frame.loc[start:end]
+            if len(window) <= max_points:
+                break
+        return picked, window
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the metrics rollup tiers")
+    parser.add_argument('--logs-dir', default='monitoring_logs')
+    parser.add_argument('--rollups-dir', help="default: <logs-dir>/rollups")
+    args = parser.parse_args()
+
+    store = RollupStore(args.rollups_dir or os.path.join(args.logs_dir, 'rollups'))
+    added = store.sync(MetricsReader(args.logs_dir))
+    print(f"Folded {added} new samples into rollups: " +
+          ", ".join(f"{name}={len(store.tiers[name])} buckets" for name, _ in TIERS))
+
+
+if __name__ == "__main__":
+    main()
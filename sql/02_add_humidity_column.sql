@@ -1,3 +1,4 @@
+-- depends: 01_create_database
 USE project_db;
 
 -- Add humidity column to ClimateData table if it doesn't exist
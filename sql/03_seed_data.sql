@@ -1,3 +1,4 @@
+-- depends: 02_add_humidity_column
 USE project_db;
 
 -- Insert sample climate data
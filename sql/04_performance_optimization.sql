@@ -1,8 +1,43 @@
+-- depends: 02_add_humidity_column
 USE project_db;
 
--- Create indexes for better query performance
-CREATE INDEX idx_location_date ON ClimateData(location, record_date);
-CREATE INDEX idx_temperature ON ClimateData(temperature);
+-- Create indexes for better query performance, unless 01_create_database.sql already did
+SET @dbname = DATABASE();
+SET @tablename = "ClimateData";
+
+SET @indexname = "idx_location_date";
+SET @preparedStatement = (SELECT IF(
+  (
+    SELECT COUNT(*)
+    FROM INFORMATION_SCHEMA.STATISTICS
+    WHERE
+      TABLE_SCHEMA = @dbname
+      AND TABLE_NAME = @tablename
+      AND INDEX_NAME = @indexname
+  ) > 0,
+  "SELECT 1",
+  "CREATE INDEX idx_location_date ON ClimateData(location, record_date)"
+));
+PREPARE createIndexIfNotExists FROM @preparedStatement;
+EXECUTE createIndexIfNotExists;
+DEALLOCATE PREPARE createIndexIfNotExists;
+
+SET @indexname = "idx_temperature";
+SET @preparedStatement = (SELECT IF(
+  (
+    SELECT COUNT(*)
+    FROM INFORMATION_SCHEMA.STATISTICS
+    WHERE
+      TABLE_SCHEMA = @dbname
+      AND TABLE_NAME = @tablename
+      AND INDEX_NAME = @indexname
+  ) > 0,
+  "SELECT 1",
+  "CREATE INDEX idx_temperature ON ClimateData(temperature)"
+));
+PREPARE createIndexIfNotExists FROM @preparedStatement;
+EXECUTE createIndexIfNotExists;
+DEALLOCATE PREPARE createIndexIfNotExists;
 
 -- Analyze tables to update statistics
 ANALYZE TABLE ClimateData;
@@ -10,8 +45,8 @@ ANALYZE TABLE ClimateData;
 -- Set global variables for better performance
 SET GLOBAL max_connections = 100;
 SET GLOBAL thread_cache_size = 10;
-SET GLOBAL query_cache_size = 16777216; -- 16MB
-SET GLOBAL query_cache_type = 1;
+-- The query cache was removed in MySQL 8.0 (query_cache_size/query_cache_type no longer
+-- exist); repeated aggregate reads are cached client-side by scripts/result_cache.py.
 
 -- Create optimized views for common queries
 CREATE OR REPLACE VIEW v_climate_stats AS
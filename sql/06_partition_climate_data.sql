@@ -0,0 +1,53 @@
+-- depends: 05_climate_monthly_summary
+USE project_db;
+
+-- Range-partition ClimateData by month of record_date, if it is not partitioned yet.
+-- Each month gets its own partition, so date-range queries only read the months they
+-- ask for and retention becomes ALTER TABLE ... DROP PARTITION (see
+-- scripts/partition_maintenance.py) instead of a long DELETE.
+--
+-- MySQL requires the partitioning column in every unique key, so the primary key
+-- becomes (record_id, record_date). record_id stays AUTO_INCREMENT and unique in practice.
+-- Partitions run from the oldest row's month to three months ahead. p_future catches
+-- anything later until partition_maintenance.py splits it.
+SET @dbname = DATABASE();
+SET @tablename = "ClimateData";
+
+SET SESSION group_concat_max_len = 1048576;
+SET @first_month = (SELECT COALESCE(MIN(record_date), CURDATE()) FROM ClimateData);
+SET @first_month = CAST(@first_month AS DATE) - INTERVAL (DAYOFMONTH(@first_month) - 1) DAY;
+SET @last_month = CURDATE() - INTERVAL (DAYOFMONTH(CURDATE()) - 1) DAY + INTERVAL 3 MONTH;
+
+SET @partitions = (
+  WITH RECURSIVE months (month_start) AS (
+    SELECT CAST(@first_month AS DATE)
+    UNION ALL
+    SELECT month_start + INTERVAL 1 MONTH FROM months WHERE month_start < @last_month
+  )
+  SELECT GROUP_CONCAT(
+    CONCAT('PARTITION p', DATE_FORMAT(month_start, '%Y%m'),
+           ' VALUES LESS THAN (''', month_start + INTERVAL 1 MONTH, ''')')
+    ORDER BY month_start SEPARATOR ', ')
+  FROM months
+);
+
+SET @preparedStatement = (SELECT IF(
+  (
+    SELECT COUNT(*)
+    FROM INFORMATION_SCHEMA.PARTITIONS
+    WHERE
+      TABLE_SCHEMA = @dbname
+      AND TABLE_NAME = @tablename
+      AND PARTITION_NAME IS NOT NULL
+  ) > 0,
+  "SELECT 1",
+  CONCAT(
+    "ALTER TABLE ClimateData ",
+    "DROP PRIMARY KEY, ADD PRIMARY KEY (record_id, record_date) ",
+    "PARTITION BY RANGE COLUMNS(record_date) (",
+    @partitions, ", PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+  )
+));
+PREPARE partitionIfNotPartitioned FROM @preparedStatement;
+EXECUTE partitionIfNotPartitioned;
+DEALLOCATE PREPARE partitionIfNotPartitioned;
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from alert_rules import Rule, RuleEngine
+
+
+def test_reset_window_keeps_firing_state():
+    rule = Rule('queries', 'global_status.Queries', '>', 5, aggregate='rate', window=2)
+    assert rule.evaluate({'global_status': {'Queries': 0}}, 0) == []
+    assert rule.evaluate({'global_status': {'Queries': 1000}}, 10) == [('', 100.0, 'firing')]
+    # The counter went backwards: the window has no usable step, so nothing changes
+    assert rule.evaluate({'global_status': {'Queries': 10}}, 20) == []
+    assert rule.evaluate({'global_status': {'Queries': 20}}, 30) == [('', 1.0, 'resolved')]
+
+
+def test_engine_formats_every_change():
+    engine = RuleEngine([{'name': 'queries', 'metric': 'global_status.Queries', 'op': '>',
+                          'threshold': 5, 'aggregate': 'rate', 'window': 2}])
+    samples = [('2024-01-01T00:00:00', 0), ('2024-01-01T00:00:10', 1000),
+               ('2024-01-01T00:00:20', 10), ('2024-01-01T00:00:30', 20)]
+    alerts = [engine.evaluate({'timestamp': timestamp, 'global_status': {'Queries': queries}})
+              for timestamp, queries in samples]
+    assert alerts[0] == [] and alerts[2] == []
+    assert alerts[1][0].startswith('queries: rate(global_status.Queries) = 100')
+    assert alerts[3] == ['Resolved: queries (global_status.Queries) back to 1']
+
+
+def test_unknown_rule_keys_are_rejected():
+    with pytest.raises(ValueError, match="treshold"):
+        Rule('typo', 'global_status.Queries', '>', 5, treshold=3)
+    assert Rule('ok', 'global_status.Queries', '>', 5, **{'for': 3}).consecutive == 3
+
+
+def test_monitor_falls_back_to_shipped_rules(tmp_path):
+    from alert_monitor import AlertMonitor
+    from alert_rules import DEFAULT_RULES_FILE
+
+    with open(DEFAULT_RULES_FILE) as f:
+        shipped = json.load(f)['rules']
+    # Every shipped rule must still load, and a missing rules file must mean exactly these
+    monitor = AlertMonitor(metrics_dir=str(tmp_path), rules_file=str(tmp_path / 'missing.json'))
+    assert [rule.name for rule in monitor.rules.rules] == [rule['name'] for rule in shipped]
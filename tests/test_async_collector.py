@@ -0,0 +1,73 @@
+import asyncio
+import types
+
+import async_collector
+from async_collector import AsyncCollector
+
+
+class FakeCursor:
+    def __init__(self):
+        self.rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, params=None):
+        if 'GLOBAL STATUS' in sql:
+            self.rows = [{'Variable_name': 'Queries', 'Value': '10'}]
+        elif 'processlist' in sql:
+            self.rows = [{'state': 'executing', 'count': 1}]
+        else:
+            self.rows = []
+
+    async def fetchall(self):
+        return self.rows
+
+
+class FakeConn:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def cursor(self, cursor_class=None):
+        return FakeCursor()
+
+
+class FakePool:
+    def acquire(self):
+        return FakeConn()
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+async def create_pool(**kwargs):
+    return FakePool()
+
+
+def test_aiomysql_sample_is_timed_and_marks_collectors(tmp_path, monkeypatch):
+    fake = types.SimpleNamespace(create_pool=create_pool, DictCursor=object)
+    monkeypatch.setattr(async_collector, 'aiomysql', fake)
+    collector = AsyncCollector([('db1', {'database': 'project_db'})], driver='aiomysql',
+                               metrics_dir=str(tmp_path))
+    target = collector.targets[0]
+    target.monitor.timer.begin()
+
+    metrics = asyncio.run(collector._sample_aiomysql(target))
+
+    assert metrics['global_status'] == {'Queries': '10'}
+    phases = target.monitor.timer.snapshot()['phases_ms']
+    assert {'connect', 'global_status', 'processlist', 'table_stats'} <= set(phases)
+    groups = [group.name for group in target.monitor.collectors.groups]
+    assert groups
+    assert metrics['collection']['ran'] == []
+    assert metrics['collection']['skipped'] == {name: 'aiomysql driver' for name in groups}
+    collector.executor.shutdown()
@@ -0,0 +1,76 @@
+from contextlib import contextmanager
+
+import pytest
+
+from bulk_insert import BulkInserter
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def executemany(self, sql, rows):
+        if self.conn.fail_at is not None and len(self.conn.batches) == self.conn.fail_at:
+            raise RuntimeError("insert failed")
+        self.conn.batches.append((sql, list(rows)))
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.batches = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @contextmanager
+    def connection(self):
+        yield self.conn
+
+
+def readings(n):
+    for i in range(n):
+        yield {'location': f"loc{i}", 'record_date': '2024-01-01', 'temperature': 1.5,
+               'precipitation': 0.0, 'humidity': 50}
+
+
+def test_rows_are_batched_and_committed_every_n_batches():
+    conn = FakeConn()
+    inserter = BulkInserter(FakePool(conn), batch_size=10, commit_every=3)
+    stats = inserter.insert(readings(65))
+
+    assert [len(rows) for _, rows in conn.batches] == [10] * 6 + [5]
+    assert conn.batches[0][0].startswith("INSERT INTO `ClimateData` (`location`, `record_date`")
+    assert conn.batches[0][1][0] == ('loc0', '2024-01-01', 1.5, 0.0, 50)
+    # Two full groups of three batches, then the leftover batch
+    assert stats['rows'] == 65 and stats['batches'] == 7
+    assert stats['commits'] == conn.commits == 3
+
+
+def test_failed_batch_rolls_back_and_raises():
+    conn = FakeConn(fail_at=2)
+    inserter = BulkInserter(FakePool(conn), batch_size=5, commit_every=10)
+    with pytest.raises(RuntimeError):
+        inserter.insert(readings(50))
+    assert conn.rollbacks == 1 and conn.commits == 0
+
+
+def test_batch_settings_must_be_positive():
+    with pytest.raises(ValueError):
+        BulkInserter(FakePool(FakeConn()), batch_size=0)
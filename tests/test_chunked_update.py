@@ -0,0 +1,113 @@
+import random
+
+import mysql.connector
+import pytest
+from mysql.connector import errorcode
+
+from chunked_update import ChunkedUpdater
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        conn = self.conn
+        # Like the server with autocommit off: any statement but SET opens a transaction
+        if not sql.startswith("SET"):
+            conn.in_transaction = True
+        conn.statements.append(sql)
+        keys = conn.keys
+        if sql.startswith("SELECT @@SESSION.innodb_lock_wait_timeout"):
+            self._rows = [(conn.lock_wait_timeout,)]
+        elif sql.startswith("SET SESSION innodb_lock_wait_timeout"):
+            conn.lock_wait_timeout = params[0]
+            self._rows = []
+        elif "COALESCE(MIN" in sql:
+            self._rows = [(min(keys) - 1 if keys else 0, max(keys) if keys else 0)]
+        elif "LIMIT 1 OFFSET" in sql:
+            after, offset = params
+            following = [key for key in keys if key > after]
+            self._rows = [(following[offset],)] if offset < len(following) else []
+        elif sql.startswith("UPDATE"):
+            if conn.failures:
+                raise mysql.connector.Error(errno=conn.failures.pop(0))
+            low, high = params[-2:]
+            self.rowcount = sum(1 for key in keys if low < key <= high)
+            conn.updated.append((low, high))
+            self._rows = []
+        elif "events_statements_history" in sql:
+            self._rows = [(1.5,)]
+        else:
+            raise AssertionError(f"unexpected statement {sql}")
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, keys, failures=()):
+        self.keys = list(keys)
+        self.failures = list(failures)
+        self.in_transaction = False
+        self.lock_wait_timeout = 50
+        self.statements = []
+        self.updated = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def start_transaction(self, isolation_level=None):
+        if self.in_transaction:
+            raise mysql.connector.ProgrammingError("Transaction already in progress")
+        self.in_transaction = True
+
+    def commit(self):
+        self.in_transaction = False
+        self.commits += 1
+
+    def rollback(self):
+        self.in_transaction = False
+
+
+def test_chunks_cover_every_key_once():
+    conn = FakeConnection(range(1, 26))
+    updater = ChunkedUpdater(chunk_size=10, pause=0)
+
+    stats = updater.run(conn, "humidity = %s", params=(50.0,))
+
+    assert conn.updated == [(0, 10), (10, 20), (20, 25)]
+    assert stats['chunks'] == 3
+    assert stats['rows'] == 25
+    assert stats['lock_wait_ms'] == 4.5
+    assert not conn.in_transaction
+    # The session setting goes back to what it was
+    assert conn.lock_wait_timeout == 50
+
+
+def test_deadlock_is_retried():
+    conn = FakeConnection(range(1, 6), failures=[errorcode.ER_LOCK_DEADLOCK])
+    updater = ChunkedUpdater(chunk_size=10, base_delay=0, rng=random.Random(1))
+
+    stats = updater.run(conn, "humidity = %s", params=(50.0,))
+
+    assert stats['rows'] == 5
+    assert stats['retries'] == 1
+    assert stats['deadlocks'] == 1
+
+
+def test_other_errors_are_raised():
+    conn = FakeConnection(range(1, 6), failures=[errorcode.ER_NO_SUCH_TABLE])
+    with pytest.raises(mysql.connector.Error):
+        ChunkedUpdater(chunk_size=10).run(conn, "humidity = %s", params=(50.0,))
+    assert not conn.in_transaction
@@ -0,0 +1,46 @@
+import time
+
+from collectors import CollectorScheduler, MetricGroup, counter_delta, per_second
+
+
+class FixedGroup(MetricGroup):
+    name = 'fixed'
+    interval = 10
+
+    def collect(self, cursor, timeout_ms):
+        return {'value': 1}
+
+
+class BrokenGroup(MetricGroup):
+    name = 'broken'
+    interval = 10
+
+    def collect(self, cursor, timeout_ms):
+        return {'ratio': {}['missing']}
+
+
+def test_counter_delta_handles_resets():
+    assert counter_delta(10, 15) == 5
+    assert counter_delta(10, 3) == 3
+    assert counter_delta(None, 3) is None
+    assert per_second(10, 30, 10) == 2.0
+    assert per_second(10, 30, 0) is None
+
+
+def test_failing_group_does_not_lose_the_sample():
+    broken, fixed = BrokenGroup(), FixedGroup()
+    metrics = {'global_status': {'Queries': '1'}}
+    CollectorScheduler([broken, fixed]).run(None, metrics)
+
+    assert metrics['global_status'] == {'Queries': '1'}
+    assert metrics['collectors'] == {'fixed': {'value': 1}}
+    assert metrics['errors'] == ["Collector broken error: KeyError: 'missing'"]
+    # Failures back off like slow runs
+    assert broken.interval == 20 and fixed.interval == 10
+
+
+def test_groups_past_the_deadline_are_skipped():
+    metrics = {}
+    CollectorScheduler([FixedGroup()]).run(None, metrics, deadline=time.perf_counter() - 1)
+    assert metrics['collectors'] == {}
+    assert metrics['collection']['skipped'] == {'fixed': 'time budget'}
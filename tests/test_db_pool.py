@@ -0,0 +1,94 @@
+import threading
+import time
+
+import mysql.connector
+import pytest
+
+import db_pool
+from db_pool import ConnectionPool, PoolExhaustedError
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.revivable = True
+        self.in_transaction = False
+        self.rollbacks = 0
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise mysql.connector.errors.InterfaceError("gone")
+
+    def reconnect(self, attempts=1, delay=0):
+        if not self.revivable:
+            raise mysql.connector.errors.InterfaceError("still gone")
+        self.alive = True
+
+    def rollback(self):
+        self.in_transaction = False
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(db_pool.mysql.connector, 'connect', lambda **config: FakeConnection())
+    return ConnectionPool({'host': 'test'}, size=1, timeout=5, reconnect_delay=0)
+
+
+def test_idle_connection_is_reused(pool):
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert pool.stats()['connects'] == 1
+
+
+def test_open_transaction_is_rolled_back_on_release(pool):
+    conn = pool.acquire()
+    conn.in_transaction = True
+    pool.release(conn)
+    assert conn.rollbacks == 1
+
+
+def test_exhausted_pool_times_out(pool):
+    pool.acquire()
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire(timeout=0.05)
+    assert pool.stats()['timeouts'] == 1
+
+
+def test_waiter_is_woken_when_a_broken_connection_frees_its_slot(pool):
+    conn = pool.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(timeout=5)))
+    waiter.start()
+    time.sleep(0.1)
+    started = time.perf_counter()
+    pool.release(conn, broken=True)
+    waiter.join()
+
+    assert time.perf_counter() - started < 1
+    assert acquired and acquired[0] is not conn
+    assert conn.closed
+    stats = pool.stats()
+    assert (stats['open'], stats['in_use'], stats['discarded']) == (1, 1, 1)
+
+
+def test_dead_idle_connection_is_reconnected_or_replaced(pool):
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.alive = False
+    assert pool.acquire() is conn
+    pool.release(conn)
+
+    conn.alive = False
+    conn.revivable = False
+    replacement = pool.acquire()
+    assert replacement is not conn and conn.closed
+    stats = pool.stats()
+    assert stats['health_check_failures'] == 2
+    assert stats['reconnects'] == 2
+    assert stats['open'] == 1
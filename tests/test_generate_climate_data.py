@@ -0,0 +1,43 @@
+import csv
+from datetime import date
+
+import pandas as pd
+
+from bulk_insert import CLIMATE_COLUMNS
+from generate_climate_data import ClimateGenerator
+from migrate import _csv_data
+
+
+def generate(**kwargs):
+    options = dict(locations=25, start=date(2023, 12, 30), end=date(2024, 1, 2), per_day=2)
+    options.update(kwargs)
+    return ClimateGenerator(**options)
+
+
+def test_same_seed_same_rows():
+    first = pd.concat(generate().chunks(), ignore_index=True)
+    again = pd.concat(generate().chunks(), ignore_index=True)
+    other = pd.concat(generate(seed=7).chunks(), ignore_index=True)
+    pd.testing.assert_frame_equal(first, again)
+    assert not first['temperature'].equals(other['temperature'])
+
+
+def test_rows_cover_every_station_day_and_reading():
+    generator = generate()
+    frame = pd.concat(generator.chunks(), ignore_index=True)
+    assert list(frame.columns) == list(CLIMATE_COLUMNS)
+    assert len(frame) == generator.total_rows == 4 * 25 * 2
+    # Beyond the 20 real cities the stations are numbered copies
+    assert frame['location'].nunique() == 25 and 'Toronto 2' in set(frame['location'])
+    assert frame['humidity'].between(15, 100).all()
+    assert (frame['precipitation'] >= 0).all()
+
+
+def test_csv_seed_loads_through_the_migration_reader(tmp_path):
+    path = tmp_path / '07_seed.csv'
+    rows = generate().write_csv(str(path), header_lines=['# depends: 06_partition_climate_data',
+                                                          '# table: ClimateData'])
+    with open(path, newline='') as f:
+        reader = csv.reader(_csv_data(f))
+        assert next(reader) == list(CLIMATE_COLUMNS)
+        assert sum(1 for _ in reader) == rows
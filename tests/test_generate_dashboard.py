@@ -0,0 +1,71 @@
+import os
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+from generate_dashboard import MetricsDashboard  # noqa: E402
+from metrics_store import SegmentedLogStore  # noqa: E402
+
+
+def write_samples(directory, start, count):
+    store = SegmentedLogStore(str(directory))
+    for i in range(start, start + count):
+        store.append({'timestamp': f"2024-01-01T{i // 60:02d}:{i % 60:02d}:00",
+                      'global_status': {'Queries': str(i)}, 'processes': {}, 'tables': {}})
+    store.close()
+
+
+def test_refresh_appends_only_new_rows(tmp_path):
+    logs, cache = tmp_path / 'logs', str(tmp_path / 'cache.pkl')
+    write_samples(logs, 0, 500)
+    MetricsDashboard(str(logs), cache_file=cache)
+    full_size = os.path.getsize(cache + '.rows')
+
+    write_samples(logs, 500, 2)
+    dashboard = MetricsDashboard(str(logs), cache_file=cache)
+    assert len(dashboard.frame) == 502
+    # Only the two new rows were written
+    assert os.path.getsize(cache + '.rows') - full_size < full_size / 10
+
+    reloaded = MetricsDashboard(str(logs), cache_file=cache)
+    assert len(reloaded.frame) == 502
+    assert reloaded.frame['Queries'].is_unique
+
+
+def test_rows_written_without_a_saved_cursor_are_discarded(tmp_path):
+    logs, cache = tmp_path / 'logs', str(tmp_path / 'cache.pkl')
+    write_samples(logs, 0, 3)
+    MetricsDashboard(str(logs), cache_file=cache)
+    # A crash after appending rows but before committing the cursor
+    with open(cache + '.rows', 'ab') as f:
+        f.write(b'partial chunk')
+
+    write_samples(logs, 3, 2)
+    MetricsDashboard(str(logs), cache_file=cache)
+    dashboard = MetricsDashboard(str(logs), cache_file=cache)
+    assert list(dashboard.frame['Queries']) == [0, 1, 2, 3, 4]
+
+
+def test_samples_load_into_one_typed_sorted_frame(tmp_path):
+    store = SegmentedLogStore(str(tmp_path))
+    tables = {'ClimateData': {'data_size': 100, 'index_size': 20}, 'other': {'data_size': 5}}
+    store.append({'timestamp': '2024-01-01T00:01:00', 'processes': {}, 'tables': tables,
+                  'global_status': {'Queries': '20', 'Threads_connected': 'n/a'},
+                  'rates': {'queries_per_sec': 0.5}})
+    store.append({'timestamp': '2024-01-01T00:00:00', 'processes': {}, 'tables': {},
+                  'global_status': {'Queries': '10', 'Threads_connected': '3'}})
+    # Incomplete samples are skipped
+    store.append({'timestamp': '2024-01-01T00:02:00', 'global_status': {'Queries': '30'}})
+    store.close()
+
+    dashboard = MetricsDashboard(str(tmp_path))
+    frame = dashboard.frame
+    assert frame.index.is_monotonic_increasing
+    assert list(frame['Queries']) == [10, 20]
+    assert frame['Queries'].dtype.kind in 'if'
+    # Unparseable values and missing rates become NaN rather than raising
+    assert frame['Threads_connected'].isna().tolist() == [False, True]
+    assert frame['queries_per_sec'].isna().tolist() == [True, False]
+    assert list(frame['table_size']) == [0, 125]
+    assert dashboard.latest['timestamp'] == '2024-01-01T00:01:00'
@@ -0,0 +1,59 @@
+from index_advisor import analyze, candidate_index, parse_statement, render_migration
+
+
+def climate_schema(**indexes):
+    indexes = {name: {'columns': columns, 'unique': False} for name, columns in indexes.items()}
+    indexes['PRIMARY'] = {'columns': ['id'], 'unique': True}
+    return {'ClimateData': {'columns': ['id', 'location', 'record_date', 'temperature', 'humidity'],
+                            'rows': 100000, 'primary': ['id'], 'indexes': indexes}}
+
+
+def workload(query, calls=100, total_ms=900.0, access_types=('ALL',)):
+    return {'query': query, 'calls': calls, 'total_ms': total_ms, 'rows_sent': calls,
+            'rows_examined_per_call': None, 'access_types': list(access_types), 'source': 'profile'}
+
+
+RANGE_QUERY = ("SELECT AVG(temperature) FROM ClimateData "
+               "WHERE location = 'Oslo' AND record_date >= '2024-01-01'")
+
+
+def test_equality_then_range_then_covering_columns():
+    schema = climate_schema()
+    info = parse_statement(RANGE_QUERY, schema)
+    assert (info['equality'], info['range']) == (['location'], ['record_date'])
+    assert candidate_index(info, schema) == (['location', 'record_date', 'temperature'], True)
+
+    # Without a range the GROUP BY columns follow the equality columns
+    grouped = parse_statement("SELECT location, COUNT(*) FROM ClimateData WHERE humidity = 5 "
+                              "GROUP BY location", schema)
+    assert candidate_index(grouped, schema) == (['humidity', 'location'], True)
+    # ORs and functions on columns are not analysed as sargable predicates
+    assert parse_statement("SELECT * FROM ClimateData WHERE id = 1 OR location = 'x'", schema) is None
+    assert parse_statement("SELECT * FROM ClimateData WHERE YEAR(record_date) = 2024",
+                           schema)['unsargable'] == ['record_date']
+
+
+def test_recommendation_and_redundant_prefixes():
+    schema = climate_schema(idx_location=['location'], idx_location_date=['location', 'record_date'])
+    report = analyze([workload(RANGE_QUERY), workload("UPDATE ClimateData SET humidity = 1 WHERE id = 5",
+                                                      total_ms=100.0, access_types=())],
+                     schema, usage={('ClimateData', 'idx_location'): 0})
+
+    (rec,) = report['recommendations']
+    assert rec['name'] == 'idx_location_record_date_temperature'
+    assert rec['benefit'] == 'high' and rec['writes_per_profile'] == 100
+    redundant = {index['name']: (index['covered_by'], index['after_recommendations'])
+                 for index in report['redundant']}
+    assert redundant == {'idx_location': ('idx_location_date', False),
+                         'idx_location_date': ('idx_location_record_date_temperature', True)}
+    # Already flagged as redundant, so not reported again as unused
+    assert report['unused'] == []
+
+    sql = render_migration(report)
+    assert "CREATE INDEX idx_location_record_date_temperature ON ClimateData" in sql
+    assert '--   "DROP INDEX idx_location ON ClimateData",' in sql
+
+
+def test_existing_index_is_not_recommended_again():
+    schema = climate_schema(idx_all=['location', 'record_date', 'temperature'])
+    assert analyze([workload(RANGE_QUERY)], schema)['recommendations'] == []
@@ -0,0 +1,36 @@
+import pytest
+
+from latency import LatencyHistogram
+
+
+def test_percentiles_stay_within_precision():
+    hist = LatencyHistogram()
+    for ms in range(1, 1001):
+        hist.record(ms / 1000)
+    assert hist.count == 1000
+    assert hist.percentile(50) == pytest.approx(0.5, rel=0.01)
+    assert hist.percentile(99) == pytest.approx(0.99, rel=0.01)
+    # Clamped to the observed range
+    assert hist.percentile(0) >= hist.min and hist.percentile(100) <= hist.max
+    summary = hist.summary()
+    assert (summary['min_ms'], summary['max_ms'], summary['mean_ms']) == (1.0, 1000.0, 500.5)
+
+
+def test_merge_equals_recording_everything_in_one():
+    fast, slow, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i in range(100):
+        fast.record(0.001 * (i + 1))
+        slow.record(0.1 * (i + 1))
+        both.record(0.001 * (i + 1))
+        both.record(0.1 * (i + 1))
+    merged = fast.merge(LatencyHistogram.from_dict(slow.to_dict()))
+    assert merged.summary() == both.summary()
+    assert merged.buckets == both.buckets
+
+    with pytest.raises(ValueError):
+        merged.merge(LatencyHistogram(precision=0.05))
+
+
+def test_empty_histogram_summary():
+    assert LatencyHistogram().summary() == {'count': 0, 'mean_ms': 0.0, 'min_ms': 0.0, 'p50_ms': 0.0,
+                                            'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
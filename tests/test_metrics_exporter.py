@@ -0,0 +1,45 @@
+import urllib.request
+
+from metrics_exporter import MetricsServer, metric_families, render_openmetrics
+
+
+SAMPLE = {
+    'timestamp': '2024-01-01T00:00:00',
+    'global_status': {'Queries': '1500', 'Threads_connected': '7', 'Uptime': 'n/a'},
+    'rates': {'interval': 10.0, 'counter_reset': False, 'queries_per_sec': 50.0},
+    'processes': {'': 2, 'executing': 1},
+    'tables': {'Climate"Data': {'rows': 10, 'rows_source': 'estimate'}}
+}
+
+
+def test_sample_renders_as_openmetrics():
+    text = render_openmetrics(metric_families(SAMPLE))
+    lines = text.splitlines()
+    assert lines[-1] == '# EOF'
+    assert '# TYPE mysql_queries counter' in lines
+    assert 'mysql_queries_total 1500' in lines
+    assert 'mysql_threads_connected 7' in lines
+    assert 'mysql_queries_per_second 50.0' in lines
+    assert 'mysql_counter_reset 0' in lines
+    assert 'mysql_processlist_threads{state=""} 2' in lines
+    assert 'mysql_table_rows{table="Climate\\"Data"} 10' in lines
+    # Values that are not numbers are left out rather than rendered
+    assert 'mysql_uptime_seconds' not in text
+
+
+def test_failed_sample_only_reports_down():
+    families = metric_families({'timestamp': '2024-01-01T00:00:00', 'error': 'down',
+                                'global_status': {'Queries': '0'}})
+    assert families['mysql_up']['samples'] == [({}, 0)]
+    assert 'mysql_queries' not in families
+
+
+def test_server_serves_the_latest_sample():
+    server = MetricsServer(port=0).start()
+    try:
+        server.update(SAMPLE)
+        with urllib.request.urlopen(f"http://{server.host}:{server.port}/metrics") as response:
+            assert response.headers['Content-Type'].startswith('application/openmetrics-text')
+            assert b'mysql_queries_total 1500' in response.read()
+    finally:
+        server.close()
@@ -0,0 +1,84 @@
+import gzip
+import os
+
+from metrics_store import MetricsReader, SegmentedLogStore, compress_segment
+
+
+def write_segment(directory, count):
+    store = SegmentedLogStore(str(directory))
+    for i in range(count):
+        store.append({'timestamp': f"2024-01-01T00:00:{i:02d}", 'i': i})
+    path = store._path
+    store._file.close()
+    store._file = None
+    return path
+
+
+def test_segment_and_archive_are_read_once(tmp_path):
+    path = write_segment(tmp_path, 5)
+    # Mid-compression: the archive is in place but the segment not yet removed
+    with open(path, 'rb') as src, gzip.open(path + '.gz', 'wb') as dst:
+        dst.write(src.read())
+
+    reader = MetricsReader(str(tmp_path))
+    assert reader.files() == [path + '.gz']
+    assert [sample['i'] for sample in reader.read()] == list(range(5))
+
+
+def test_truncated_archive_does_not_raise(tmp_path):
+    path = write_segment(tmp_path, 5)
+    with open(path, 'rb') as f:
+        data = gzip.compress(f.read())
+    os.remove(path)
+    with open(path + '.gz', 'wb') as f:
+        f.write(data[:len(data) // 2])
+
+    reader = MetricsReader(str(tmp_path))
+    assert len(list(reader.read())) < 5
+    assert len(list(reader.follow(None))) < 5
+
+
+def test_compress_segment_leaves_only_the_archive(tmp_path):
+    path = write_segment(tmp_path, 3)
+    compress_segment(path, 'gzip')
+    assert os.listdir(tmp_path) == [os.path.basename(path) + '.gz']
+    assert len(list(MetricsReader(str(tmp_path)).read())) == 3
+
+
+def test_follow_stops_at_a_segment_that_vanished(tmp_path, monkeypatch):
+    old = write_segment(tmp_path, 3)
+    reader = MetricsReader(str(tmp_path))
+    cursor = None
+    for _, cursor in reader.follow(None):
+        if cursor['records'] == 1:
+            break
+
+    # The writer moves on to a new segment
+    newer = old.replace('.jsonl', '_9.jsonl')
+    with open(newer, 'w') as f:
+        f.write('{"timestamp": "2024-01-01T00:01:00", "i": 99}\n')
+    # ...and the old one is compressed between files() and open()
+    listed = reader.files()
+    monkeypatch.setattr(reader, 'files', lambda: listed)
+    compress_segment(old, 'gzip')
+    assert list(reader.follow(cursor)) == []
+
+    monkeypatch.undo()
+    assert [sample['i'] for sample, _ in reader.follow(cursor)] == [1, 2, 99]
+
+
+def test_saved_cursor_resumes_exactly_once_past_a_partial_line(tmp_path):
+    path = write_segment(tmp_path, 3)
+    with open(path, 'ab') as f:
+        f.write(b'{"timestamp": "2024-01-01T00:00:03", "i"')
+    reader = MetricsReader(str(tmp_path))
+    seen = [(sample['i'], cursor) for sample, cursor in reader.follow()]
+    assert [i for i, _ in seen] == [0, 1, 2]
+    # The half-written line is left for the next call
+    assert reader.end_cursor() == seen[-1][1]
+
+    with open(path, 'ab') as f:
+        f.write(b': 3}\n{"timestamp": "2024-01-01T00:00:04", "i": 4}\n')
+    resumed = MetricsReader(str(tmp_path))
+    assert [sample['i'] for sample, _ in resumed.follow(seen[1][1])] == [2, 3, 4]
+    assert list(resumed.follow(resumed.end_cursor())) == []
@@ -0,0 +1,50 @@
+import csv
+
+import pytest
+
+from migrate import _csv_data, discover, select_targets, split_statements
+
+
+def write(directory, name, text):
+    path = directory / name
+    path.write_text(text)
+    return path
+
+
+def test_number_selects_script_next_to_lettered_sibling(tmp_path):
+    write(tmp_path, '01_create.sql', 'CREATE TABLE t (id INT);\n')
+    write(tmp_path, '03_seed_data.sql', 'INSERT INTO t VALUES (1);\n')
+    write(tmp_path, '03b_more_seed.csv', '# depends: 01_create\n# table: t\nid\n2\n')
+    migrations = discover(str(tmp_path))
+
+    assert [m.name for m in select_targets(migrations, ['03'])] == ['01_create', '03_seed_data']
+    assert [m.name for m in select_targets(migrations, ['03b'])] == ['01_create', '03b_more_seed']
+    assert [m.name for m in select_targets(migrations, ['03_seed_data'])] == ['01_create', '03_seed_data']
+    with pytest.raises(ValueError):
+        select_targets(migrations, ['0'])
+
+
+def test_csv_keeps_hash_rows_after_header():
+    lines = ['# depends: 01_create\n', '# table: t\n', '\n', 'id,label\n', '1,#1\n', '#2,two\n']
+    rows = list(csv.reader(_csv_data(lines)))
+    assert rows == [['id', 'label'], ['1', '#1'], ['#2', 'two']]
+
+
+def test_split_statements_with_delimiter():
+    script = [
+        "-- a comment; not a statement\n",
+        "CREATE TABLE t (s VARCHAR(10) DEFAULT ';');\n",
+        "DELIMITER //\n",
+        "CREATE PROCEDURE p()\n",
+        "BEGIN\n",
+        "    SELECT 1; /* ; */ SELECT 2;\n",
+        "END//\n",
+        "DELIMITER ;\n",
+        "CALL p();\n",
+    ]
+    statements = list(split_statements(script))
+    assert len(statements) == 3
+    assert statements[0] == "CREATE TABLE t (s VARCHAR(10) DEFAULT ';')"
+    assert statements[1].startswith('CREATE PROCEDURE p()')
+    assert 'SELECT 1; /* ; */ SELECT 2;' in statements[1]
+    assert statements[2] == 'CALL p()'
@@ -0,0 +1,91 @@
+from monitor_mysql import MySQLMonitor, counter_rates, error_metrics
+
+
+def sample(timestamp, uptime, queries, slow=0):
+    return {'timestamp': timestamp, 'global_status': {
+        'Uptime': str(uptime), 'Queries': str(queries), 'Slow_queries': str(slow)}}
+
+
+def test_rates_are_per_second_deltas():
+    rates = counter_rates(sample('2024-01-01T00:00:00', 100, 1000, 2),
+                          sample('2024-01-01T00:00:10', 110, 1500, 3))
+    assert rates == {'interval': 10.0, 'counter_reset': False,
+                     'queries_per_sec': 50.0, 'slow_queries_per_sec': 0.1}
+
+
+def test_restart_rate_covers_only_the_new_uptime():
+    rates = counter_rates(sample('2024-01-01T00:00:00', 100, 1000),
+                          sample('2024-01-01T00:00:30', 5, 50))
+    assert rates['counter_reset'] is True
+    assert rates['queries_per_sec'] == 10.0
+
+
+def test_flush_status_is_a_reset_not_a_negative_rate():
+    rates = counter_rates(sample('2024-01-01T00:00:00', 100, 1000),
+                          sample('2024-01-01T00:00:10', 110, 200))
+    assert rates['counter_reset'] is True
+    assert rates['queries_per_sec'] == 20.0
+
+
+def test_out_of_order_samples_have_no_rate():
+    assert counter_rates(sample('2024-01-01T00:00:10', 110, 1500),
+                         sample('2024-01-01T00:00:10', 110, 1500)) is None
+
+
+def test_failed_sample_does_not_become_the_baseline(tmp_path):
+    monitor = MySQLMonitor(config={'database': 'project_db'}, metrics_dir=str(tmp_path),
+                           collectors=[])
+    assert 'rates' not in monitor.add_rates(sample('2024-01-01T00:00:00', 100, 1000))
+    failed = monitor.add_rates(error_metrics("down"))
+    assert 'rates' not in failed
+    # The next good sample is compared with the last good one, not the zeros
+    rates = monitor.add_rates(sample('2024-01-01T00:01:00', 160, 4000))['rates']
+    assert rates['queries_per_sec'] == 50.0 and not rates['counter_reset']
+
+
+class CatalogCursor:
+    """Answers the table stats query and COUNT(*)s over a table with keys 1..rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+        if 'information_schema.TABLES' in sql:
+            self.result = [{'table_name': 'ClimateData', 'table_rows': 90, 'data_size': 4096,
+                            'index_size': 1024, 'auto_increment_column': 'record_id'}]
+        elif 'COUNT(*)' in sql:
+            above = params[0] if params else 0
+            count = max(self.rows - above, 0)
+            self.result = [{'row_count': count, 'high_water': self.rows if count else None}]
+        else:
+            self.result = []
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0]
+
+
+def test_table_stats_modes(tmp_path):
+    monitor = MySQLMonitor(config={'database': 'project_db'}, metrics_dir=str(tmp_path),
+                           collectors=[], exact_count_interval=0)
+    cursor = CatalogCursor(rows=100)
+    metrics = {'tables': {}}
+    monitor._collect_table_metrics(cursor, metrics)
+    assert metrics['tables']['ClimateData'] == {'rows': 90, 'rows_source': 'estimate',
+                                                'data_size': 4096, 'index_size': 1024}
+    assert not any('COUNT(*)' in sql for sql in cursor.statements)
+
+    monitor.table_stats_mode = 'incremental'
+    monitor._collect_table_metrics(cursor, metrics)
+    assert metrics['tables']['ClimateData']['rows_source'] == 'exact'
+    # Later samples only count the rows above the high-water mark
+    cursor.rows = 105
+    monitor._collect_table_metrics(cursor, metrics)
+    assert metrics['tables']['ClimateData']['rows'] == 105
+    assert metrics['tables']['ClimateData']['rows_source'] == 'incremental'
+    assert 'WHERE `record_id` > %s' in cursor.statements[-1]
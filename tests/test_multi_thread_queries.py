@@ -0,0 +1,74 @@
+import os
+
+import mysql.connector
+import pytest
+
+import multi_thread_queries
+from db_pool import PoolExhaustedError
+
+
+class FakePool:
+    """Hands out one connection, then is exhausted"""
+
+    def __init__(self):
+        self.handed_out = 0
+        self.released = []
+
+    def acquire(self, timeout=None):
+        if self.handed_out:
+            raise PoolExhaustedError("exhausted")
+        self.handed_out += 1
+        return object()
+
+    def release(self, conn, broken=False):
+        self.released.append((conn, broken))
+
+
+def test_broken_connection_is_released_once_when_reacquire_fails(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(multi_thread_queries, 'get_pool', lambda *args, **kwargs: pool)
+
+    def broken(conn, rng, options):
+        raise mysql.connector.errors.OperationalError("server has gone away")
+    monkeypatch.setitem(multi_thread_queries.OPERATIONS, 'select', broken)
+
+    plan = multi_thread_queries.build_plans(1, count=1)[0]
+    with pytest.raises(PoolExhaustedError):
+        multi_thread_queries.run_worker({'select': 1}, plan, {})
+    assert len(pool.released) == 1
+    assert pool.released[0][1] is True
+
+
+def test_empty_run_exits_non_zero(monkeypatch, tmp_path):
+    report = {'started_at': '', 'config': {}, 'elapsed_seconds': 1.0, 'total_ops': 0,
+              'throughput_ops_per_sec': 0.0, 'operations': {}, 'pool': {}}
+    monkeypatch.setattr(multi_thread_queries, 'run_benchmark', lambda **kwargs: report)
+    with pytest.raises(SystemExit) as exit_info:
+        multi_thread_queries.main(['--output', str(tmp_path / 'report.json')])
+    assert exit_info.value.code == 1
+
+
+# Stand-ins for process_main; module-level so spawned children can import them
+def crash_after_start(specs, indexes, plan_args, options, ready, go, start_time, queue):
+    ready.wait()
+    go.wait()
+    os._exit(3)
+
+
+def exit_before_start(specs, indexes, plan_args, options, ready, go, start_time, queue):
+    os._exit(1)
+
+
+def test_child_dying_without_results_does_not_hang(monkeypatch):
+    monkeypatch.setattr(multi_thread_queries, 'process_main', crash_after_start)
+    results, _, pool_stats, _, _ = multi_thread_queries.run_process_workers(
+        [{'select': 1}, {'select': 1}], {'count': 1}, {}, processes=2)
+    assert sum(stats['latency'].count for stats in results.values()) == 0
+    assert pool_stats == {'processes': 0}
+
+
+def test_children_that_never_start_are_cleaned_up(monkeypatch):
+    monkeypatch.setattr(multi_thread_queries, 'process_main', exit_before_start)
+    monkeypatch.setattr(multi_thread_queries, 'PROCESS_START_TIMEOUT', 2)
+    with pytest.raises(RuntimeError, match="did not start"):
+        multi_thread_queries.run_process_workers([{'select': 1}], {'count': 1}, {}, processes=1)
@@ -0,0 +1,39 @@
+from datetime import date
+
+from partition_maintenance import (add_months, create_statement, parse_bound, partition_name,
+                                   plan_maintenance)
+
+
+def months(*pairs):
+    return [(partition_name(date(y, m, 1)), add_months(date(y, m, 1), 1)) for y, m in pairs]
+
+
+def test_bounds_and_month_arithmetic():
+    assert parse_bound("'2025-05-01'") == date(2025, 5, 1)
+    assert parse_bound('MAXVALUE') is None
+    assert add_months(date(2024, 11, 15), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_future_months_are_created_up_to_ahead():
+    partitions = months((2024, 12), (2025, 1)) + [('p_future', None)]
+    to_create, to_drop, cutoff = plan_maintenance(partitions, date(2025, 1, 20), ahead=2)
+    # p202501 ends at 2025-02-01; February and March are still missing
+    assert to_create == [date(2025, 2, 1), date(2025, 3, 1)]
+    assert to_drop == [] and cutoff is None
+    assert create_statement(to_create, True) == (
+        "ALTER TABLE ClimateData REORGANIZE PARTITION p_future INTO ("
+        "PARTITION p202502 VALUES LESS THAN ('2025-03-01'), "
+        "PARTITION p202503 VALUES LESS THAN ('2025-04-01'), "
+        "PARTITION p_future VALUES LESS THAN (MAXVALUE))")
+
+
+def test_expired_months_are_dropped_but_never_the_newest():
+    partitions = months((2024, 1), (2024, 2), (2024, 3))
+    _, to_drop, cutoff = plan_maintenance(partitions, date(2024, 6, 10), ahead=0, retention_months=3)
+    assert cutoff == date(2024, 3, 1)
+    # p202402 holds February only, all before the cutoff; p202403 is the newest
+    assert to_drop == ['p202401', 'p202402']
+
+    _, to_drop, _ = plan_maintenance(partitions, date(2025, 6, 1), ahead=0, retention_months=1)
+    assert 'p202403' not in to_drop
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+import phase_timer
+from alert_monitor import AlertMonitor
+from phase_timer import PhaseTimer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ticks_phases_and_overruns(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(phase_timer.time, 'perf_counter', clock)
+    timer = PhaseTimer(interval=1.0)
+
+    timer.begin()
+    with timer.phase('query'):
+        clock.now += 0.25
+    timer.add('query', 0.25)
+    timer.record('lag', 3.0)
+    clock.now += 0.1
+    assert timer.end() == pytest.approx(0.35)
+    snapshot = timer.snapshot()
+    assert snapshot['phases_ms'] == {'query': 500.0}
+    assert snapshot['histograms']['query']['count'] == 2
+    # record() feeds only the histogram, not the tick
+    assert 'lag' not in snapshot['phases_ms'] and snapshot['histograms']['lag']['count'] == 1
+
+    clock.now += 1.4
+    timer.begin()
+    clock.now += 1.5
+    timer.end()
+    snapshot = timer.snapshot()
+    assert snapshot['phases_ms'] == {}
+    assert (snapshot['ticks'], snapshot['overruns']) == (2, 1)
+    assert (snapshot['last_tick_ms'], snapshot['last_period_ms']) == (1500.0, 1750.0)
+
+
+def test_alert_loop_appends_one_timing_record_per_batch(tmp_path):
+    monitor = AlertMonitor(metrics_dir=str(tmp_path))
+    monitor.timer.begin()
+    monitor.process_sample({'timestamp': '2024-01-01T00:00:00', 'global_status': {},
+                            'processes': {}, 'tables': {}})
+    monitor.timer.end()
+    monitor.log_timings(1)
+    monitor.log_timings(0)
+
+    with open(monitor.timings_file) as f:
+        records = [json.loads(line) for line in f]
+    assert [record['samples'] for record in records] == [1, 0]
+    assert 'evaluate' in records[0]['phases_ms']
+    assert records[0]['histograms']['sample_lag']['count'] == 1
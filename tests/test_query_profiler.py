@@ -0,0 +1,45 @@
+from query_profiler import QueryProfiler, normalize_sql, plan_tables
+
+
+def test_statements_differing_only_in_values_share_a_digest():
+    assert normalize_sql("SELECT * FROM t WHERE id = 42 AND name = 'x'") == \
+        "SELECT * FROM t WHERE id = ? AND name = ?"
+    assert normalize_sql("SELECT * FROM t WHERE id = %s -- lookup\n") == "SELECT * FROM t WHERE id = ?"
+    assert normalize_sql("SELECT * FROM t WHERE id IN (1, 2, 3)") == \
+        normalize_sql("SELECT  *  FROM t /* hint */ WHERE id IN (%s)")
+    assert normalize_sql("INSERT INTO t (a, b) VALUES (1, 'a'), (2, 'b');") == \
+        "INSERT INTO t (a, b) VALUES (...)"
+    # Digits inside identifiers are not literals
+    assert normalize_sql(b"SELECT col1 FROM t2") == "SELECT col1 FROM t2"
+
+
+def test_record_merge_and_round_trip():
+    profiler = QueryProfiler()
+    profiler.record("SELECT * FROM t WHERE id = 1", 0.010, rows=1)
+    profiler.record("SELECT * FROM t WHERE id = 2", 0.030, rows=1)
+    profiler.record("SELECT * FROM t WHERE id = 3", 0.5, error=True)
+    other = QueryProfiler()
+    other.record("SELECT * FROM t WHERE id = %s", 0.020, rows=2, params=(4,))
+    other.record("UPDATE t SET a = 1", 0.001)
+    profiler.merge(other)
+
+    (_, entry), (_, update) = profiler.top()
+    assert entry['query'] == "SELECT * FROM t WHERE id = ?"
+    assert entry['example'] == "SELECT * FROM t WHERE id = 1"
+    assert (entry['calls'], entry['errors'], entry['rows']) == (4, 1, 4)
+    assert entry['latency'].count == 3
+    assert update['calls'] == 1
+
+    restored = QueryProfiler.from_dict(profiler.to_dict())
+    (key, saved), _ = restored.top()
+    assert key == profiler.top()[0][0]
+    assert saved['calls'] == 4
+    assert saved['latency'].summary() == entry['latency'].summary()
+
+
+def test_plan_tables_walks_nested_plans():
+    plan = {'query_block': {'nested_loop': [
+        {'table': {'table_name': 'a', 'access_type': 'ALL', 'rows_examined_per_scan': 100}},
+        {'table': {'table_name': 'b', 'access_type': 'ref', 'key': 'idx_a'}}]}}
+    assert [(t['table'], t['access_type'], t['key']) for t in plan_tables(plan)] == \
+        [('a', 'ALL', None), ('b', 'ref', 'idx_a')]
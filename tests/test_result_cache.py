@@ -0,0 +1,91 @@
+from datetime import datetime
+
+from result_cache import ResultCache, cache_key, merge_cache_stats
+
+FILLED_AT = datetime(2024, 1, 1, 12, 0, 0)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        if 'information_schema_stats_expiry' in sql:
+            self.rows = []
+        elif 'UPDATE_TIME' in sql:
+            self.rows = [(self.conn.max_key, self.conn.update_time, self.conn.now)]
+        else:
+            self.conn.queries += 1
+            self.rows = [('Oslo', self.conn.max_key)]
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self):
+        self.max_key = 10
+        self.update_time = datetime(2024, 1, 1, 11, 0, 0)
+        self.now = FILLED_AT
+        self.queries = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+SQL = "SELECT location, MAX(record_id) FROM ClimateData GROUP BY location"
+
+
+def test_hits_until_the_table_changes():
+    conn, cache = FakeConn(), ResultCache(watermark_interval=0)
+    assert cache.fetchall(conn, SQL) == [('Oslo', 10)]
+    assert cache.fetchall(conn, "SELECT location,  MAX(record_id)\nFROM ClimateData GROUP BY location") == \
+        [('Oslo', 10)]
+    assert conn.queries == 1
+
+    # An insert moves the newest key
+    conn.max_key = 11
+    assert cache.fetchall(conn, SQL) == [('Oslo', 11)]
+    assert conn.queries == 2
+
+    # An update or delete moves UPDATE_TIME past the fill time
+    conn.update_time = conn.now = datetime(2024, 1, 1, 12, 0, 5)
+    cache.fetchall(conn, SQL)
+    assert conn.queries == 3
+    # That refill happened in the same second as the change, so it is not trusted
+    conn.now = datetime(2024, 1, 1, 12, 0, 6)
+    cache.fetchall(conn, SQL)
+    cache.fetchall(conn, SQL)
+    assert conn.queries == 4
+    stats = cache.stats()
+    assert (stats['hits'], stats['invalidated']) == (2, 3)
+
+
+def test_least_recently_used_entry_is_evicted():
+    watermarks = {'ClimateData': (1, None, FILLED_AT)}
+    rows = [('x' * 100,)]
+    # Room for two entries of this size
+    cache = ResultCache(max_bytes=1000)
+    first, second, third = (cache_key(f"SELECT {i}") for i in range(3))
+    cache.put(first, rows, watermarks)
+    cache.put(second, rows, watermarks)
+    assert cache.get(first, watermarks) == rows
+    cache.put(third, rows, watermarks)
+    assert cache.get(second, watermarks) is None
+    assert cache.get(first, watermarks) == rows
+    assert cache.stats()['evicted'] == 1
+    assert cache.stats()['bytes'] <= 1000
+
+
+def test_merged_stats_recompute_the_hit_ratio():
+    merged = merge_cache_stats([{'hits': 3, 'misses': 1, 'hit_ratio': 0.75},
+                                {'hits': 0, 'misses': 4, 'hit_ratio': 0.0}])
+    assert merged == {'hits': 3, 'misses': 5, 'hit_ratio': 0.375}
@@ -0,0 +1,89 @@
+import os
+
+import pandas as pd
+
+from metrics_store import MetricsReader, SegmentedLogStore
+from rollups import RollupStore
+
+
+def raw_frame(periods):
+    index = pd.date_range('2024-01-01', periods=periods, freq='30s', name='timestamp')
+    return pd.DataFrame({'Queries': range(periods), 'queries_per_sec': 1.0}, index=index)
+
+
+def test_select_names_the_window_it_returns(tmp_path):
+    store = RollupStore(str(tmp_path))
+    raw = raw_frame(50)
+    # No tiers yet: the raw samples come back under their own name
+    assert store.select(raw, max_points=10)[0] == 'raw'
+
+    store.update(raw)
+    tier, window = store.select(raw, max_points=10)
+    assert tier == '5min'
+    assert 'Queries_avg' in window
+
+
+def write_samples(directory, start, count):
+    store = SegmentedLogStore(str(directory))
+    for i in range(start, start + count):
+        store.append({'timestamp': f"2024-01-01T00:{i:02d}:00", 'global_status': {'Queries': str(i)},
+                      'processes': {}, 'tables': {}})
+    store.close()
+
+
+def test_crash_before_state_is_saved_does_not_double_count(tmp_path, monkeypatch):
+    logs, rollups = tmp_path / 'logs', tmp_path / 'rollups'
+    write_samples(logs, 0, 3)
+    assert RollupStore(str(rollups)).sync(MetricsReader(str(logs))) == 3
+
+    write_samples(logs, 3, 3)
+    store = RollupStore(str(rollups))
+    real_replace = os.replace
+
+    def crash(src, dst):
+        if dst.endswith('state.json'):
+            raise OSError("crash")
+        real_replace(src, dst)
+    monkeypatch.setattr('rollups.os.replace', crash)
+    try:
+        store.sync(MetricsReader(str(logs)))
+    except OSError:
+        pass
+    monkeypatch.undo()
+
+    store = RollupStore(str(rollups))
+    assert store.tiers['1h']['Queries_count'].sum() == 3
+    assert store.sync(MetricsReader(str(logs))) == 3
+    store = RollupStore(str(rollups))
+    assert store.tiers['1h']['Queries_count'].sum() == 6
+    assert sorted(p.name for p in rollups.iterdir()) == [
+        'rollup_1d.1.csv', 'rollup_1h.1.csv', 'rollup_5min.1.csv', 'state.json']
+
+
+def test_sync_appends_instead_of_rewriting(tmp_path):
+    logs, rollups = tmp_path / 'logs', tmp_path / 'rollups'
+    write_samples(logs, 0, 50)
+    RollupStore(str(rollups)).sync(MetricsReader(str(logs)))
+    path = rollups / 'rollup_5min.1.csv'
+    before = path.read_bytes()
+
+    write_samples(logs, 50, 10)
+    RollupStore(str(rollups)).sync(MetricsReader(str(logs)))
+    after = path.read_bytes()
+    assert after.startswith(before) and len(after) > len(before)
+
+
+def test_incremental_and_late_syncs_match_a_single_pass(tmp_path):
+    logs, rollups, once = tmp_path / 'logs', tmp_path / 'rollups', tmp_path / 'once'
+    # Minutes 0-29, then 40-59, then a late segment with 30-39
+    for start, count in ((0, 30), (40, 20), (30, 10)):
+        write_samples(logs, start, count)
+        RollupStore(str(rollups)).sync(MetricsReader(str(logs)))
+    RollupStore(str(once)).sync(MetricsReader(str(logs)))
+
+    incremental, single = RollupStore(str(rollups)), RollupStore(str(once))
+    for name in ('5min', '1h', '1d'):
+        # *_last follows arrival order when samples come late, so only the other stats must agree
+        columns = [column for column in single.tiers[name] if not column.endswith('_last')]
+        pd.testing.assert_frame_equal(incremental.tiers[name][columns], single.tiers[name][columns],
+                                      check_freq=False)
@@ -0,0 +1,22 @@
+import os
+
+from migrate import MIGRATIONS_DIR, split_statements
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), MIGRATIONS_DIR)
+
+
+def statements(filename):
+    with open(os.path.join(SQL_DIR, filename)) as f:
+        return list(split_statements(f))
+
+
+def test_summary_refresh_reads_climate_data_without_locking():
+    script = statements('05_climate_monthly_summary.sql')
+    refresh = [s for s in script if s.startswith('CREATE PROCEDURE refresh_climate_monthly_summary')]
+    assert len(refresh) == 1
+    body = refresh[0]
+    assert body.rstrip().endswith('END')
+    # The isolation level has to be set before the transaction it applies to
+    isolation = body.index('SET TRANSACTION ISOLATION LEVEL READ COMMITTED')
+    assert isolation < body.index('START TRANSACTION') < body.index('INSERT INTO climate_summary_dirty')
+    assert any(s.startswith('CREATE EVENT IF NOT EXISTS ev_refresh_climate_monthly_summary') for s in script)